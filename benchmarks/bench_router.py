@@ -0,0 +1,87 @@
+"""Compare the embedding router against the BART zero-shot classifier.
+
+Reports per-query latency (p50/p95) for both routers and how often they agree.
+Requires the MiniLM and BART models to be available locally.
+
+    python -m benchmarks.bench_router
+"""
+
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.common import percentile
+from components.config import ROUTER_FALLBACK_MARGIN
+from components.qa_chain import zero_shot_is_medical
+from components.router import EmbeddingRouter
+from components.vectorstore import get_embeddings
+
+QUERIES = [
+    "What is the maximum daily dose of acetaminophen?",
+    "Can I drink alcohol while taking metronidazole?",
+    "What are early signs of a stroke?",
+    "How is strep throat diagnosed?",
+    "Is lisinopril safe during pregnancy?",
+    "My child has a fever of 39C, what should I do?",
+    "What is the difference between type 1 and type 2 diabetes?",
+    "How does atorvastatin lower cholesterol?",
+    "What are the side effects of sertraline?",
+    "How long should I take antibiotics for a UTI?",
+    "Good morning!",
+    "What is the tallest mountain in Europe?",
+    "Write a haiku about autumn.",
+    "How do I reverse a list in Python?",
+    "Who painted the Mona Lisa?",
+    "What's a good name for a cat?",
+    "How many days are in a leap year?",
+    "Can you summarise the plot of Hamlet?",
+    "Thanks for your help!",
+    "What is the exchange rate between euro and dollar?",
+]
+
+
+def _time(classify: Callable[[str], bool], queries: List[str]) -> Dict[str, object]:
+    classify(queries[0])  # warm-up: model load, prototype embedding
+    decisions, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        decisions.append(classify(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "decisions": decisions,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": percentile(latencies, 0.95),
+    }
+
+
+def main() -> None:
+    embeddings = get_embeddings()
+    router = EmbeddingRouter(embeddings, cache_size=0)
+    routed = EmbeddingRouter(
+        embeddings,
+        fallback=zero_shot_is_medical,
+        fallback_margin=ROUTER_FALLBACK_MARGIN,
+        cache_size=0,
+    )
+
+    results = {
+        "zero_shot": _time(zero_shot_is_medical, QUERIES),
+        "embedding": _time(router.is_medical, QUERIES),
+        "embedding+fallback": _time(routed.is_medical, QUERIES),
+    }
+
+    baseline = results["zero_shot"]["decisions"]
+    print(f"{'router':<20}{'p50 ms':>10}{'p95 ms':>10}{'agreement':>12}")
+    for name, result in results.items():
+        agreement = sum(a == b for a, b in zip(result["decisions"], baseline)) / len(
+            baseline
+        )
+        print(
+            f"{name:<20}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+            f"{agreement:>12.0%}"
+        )
+    print(f"fallback calls: {routed.fallback_calls}/{len(QUERIES)}")
+
+
+if __name__ == "__main__":
+    main()
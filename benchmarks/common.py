@@ -0,0 +1,82 @@
+import json
+import os
+import platform
+import statistics
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize(
+    latencies: List[float], elapsed: Optional[float] = None, items: Optional[int] = None
+) -> Dict[str, float]:
+    """p50/p95/p99 (ms) over ``latencies`` (seconds) plus throughput (items/s)."""
+    elapsed = elapsed if elapsed is not None else sum(latencies)
+    items = items if items is not None else len(latencies)
+    return {
+        "n": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": (statistics.fmean(latencies) * 1000) if latencies else 0.0,
+        "throughput_per_s": items / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def time_calls(fn: Callable[[Any], Any], inputs: Iterable[Any]) -> Dict[str, float]:
+    latencies = []
+    started = time.perf_counter()
+    for item in inputs:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def save_results(results: Dict[str, Any], directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    payload = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def print_results(results: Dict[str, Dict[str, float]]) -> None:
+    header = f"{'benchmark':<22}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(
+            f"{name:<22}{r['n']:>6}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+            f"{r['p99_ms']:>10.2f}{r['throughput_per_s']:>10.1f}"
+        )
+
+
+def compare_results(current: Dict[str, Dict[str, float]], baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    print(f"\nChange vs {baseline_path} (p95, throughput):")
+    for name, r in current.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        p95 = (r["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0.0
+        tput = (
+            (r["throughput_per_s"] / old["throughput_per_s"] - 1) * 100
+            if old["throughput_per_s"]
+            else 0.0
+        )
+        print(f"  {name:<22} p95 {p95:+7.1f}%   throughput {tput:+7.1f}%")
@@ -0,0 +1,99 @@
+"""Synthetic PubMed- and Drugs.com-shaped documents for offline benchmarks."""
+
+import random
+from typing import Dict, Iterator, List
+
+DRUGS = [
+    "acetaminophen", "amoxicillin", "atorvastatin", "azithromycin", "ibuprofen",
+    "levothyroxine", "lisinopril", "losartan", "metformin", "metoprolol",
+    "omeprazole", "prednisone", "sertraline", "simvastatin", "warfarin",
+    "gabapentin", "hydrochlorothiazide", "amlodipine", "albuterol", "insulin",
+]  # fmt: skip
+
+CONDITIONS = [
+    "type 2 diabetes", "hypertension", "asthma", "heart failure", "migraine",
+    "depression", "osteoarthritis", "pneumonia", "atrial fibrillation",
+    "chronic kidney disease", "hypothyroidism", "urinary tract infection",
+]  # fmt: skip
+
+SECTIONS = ["BACKGROUND", "METHODS", "RESULTS", "CONCLUSIONS"]
+
+FILLER = (
+    "patients cohort randomized placebo outcome risk dose daily weeks adverse "
+    "events efficacy safety trial significant reduction baseline follow-up "
+    "treatment clinical mg hazard ratio confidence interval adults children"
+).split()
+
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    return " ".join(rng.choice(FILLER) for _ in range(words)).capitalize() + "."
+
+
+def pubmed_document(rng: random.Random, pmid: int) -> Dict:
+    drug, condition = rng.choice(DRUGS), rng.choice(CONDITIONS)
+    title = f"Effect of {drug} on outcomes in {condition}: a randomized trial"
+    abstract = "\n".join(
+        f"{label}: {drug.capitalize()} in {condition}. "
+        + " ".join(_sentence(rng) for _ in range(rng.randint(2, 4)))
+        for label in SECTIONS
+    )
+    return {
+        "text": f"Title: {title}\nContent: {abstract}",
+        "metadata": {"source": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"},
+    }
+
+
+def drug_document(rng: random.Random, index: int) -> Dict:
+    drug = DRUGS[index % len(DRUGS)]
+    name = drug if index < len(DRUGS) else f"{drug}-{index}"
+    content = " ".join(
+        [
+            f"What is {drug}? {drug.capitalize()} is used to treat "
+            f"{rng.choice(CONDITIONS)}.",
+            f"Warnings: {_sentence(rng)}",
+            f"{drug.capitalize()} dosage: usual adult dose is "
+            f"{rng.choice([5, 10, 20, 250, 500])} mg once daily. {_sentence(rng)}",
+            f"Side effects: {_sentence(rng)} {_sentence(rng)}",
+        ]
+    )
+    return {
+        "text": f"Title: {drug.capitalize()}\nContent: {content}",
+        "metadata": {"source": f"https://www.drugs.com/{name}.html"},
+    }
+
+
+def generate_corpus(n: int, seed: int = 0, drug_share: float = 0.3) -> Iterator[Dict]:
+    rng = random.Random(seed)
+    drugs = int(n * drug_share)
+    for i in range(drugs):
+        yield drug_document(rng, i)
+    for i in range(n - drugs):
+        yield pubmed_document(rng, 38_000_000 + i)
+
+
+def generate_queries(n: int, seed: int = 1) -> Dict[str, List[str]]:
+    rng = random.Random(seed)
+    medical = [
+        rng.choice(
+            [
+                f"What is the usual dose of {rng.choice(DRUGS)}?",
+                f"What are the side effects of {rng.choice(DRUGS)}?",
+                f"Is {rng.choice(DRUGS)} effective for {rng.choice(CONDITIONS)}?",
+                f"How is {rng.choice(CONDITIONS)} treated?",
+            ]
+        )
+        for _ in range(n)
+    ]
+    general = [
+        rng.choice(
+            [
+                "Hello, how are you?",
+                "Tell me a joke about computers.",
+                "What is the capital of Italy?",
+                "Recommend a film for tonight.",
+                "How do I sort a list in Python?",
+            ]
+        )
+        for _ in range(n)
+    ]
+    return {"medical": medical, "general": general}
@@ -0,0 +1,203 @@
+"""Local stand-in for the Ollama HTTP API with configurable speed.
+
+Implements ``POST /api/generate`` (streaming and non-streaming),
+``GET /api/tags`` and ``GET /api/ps``; an empty prompt only loads the model.
+Prompt evaluation and generation are simulated with sleeps derived from
+``prompt_tokens_per_sec`` and ``tokens_per_sec``; switching to a model that is
+not loaded costs ``load_seconds`` once at most ``max_loaded_models`` models
+are resident. Loads are serialized, as in Ollama.
+A request carrying a ``context`` from an earlier response continues from it:
+only the new prompt is evaluated and the returned context extends the old one.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+class FakeOllamaServer:
+    def __init__(
+        self,
+        tokens_per_sec: float = 50.0,
+        prompt_tokens_per_sec: float = 500.0,
+        answer_tokens: int = 48,
+        load_seconds: float = 0.0,
+        max_loaded_models: int = 2,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.tokens_per_sec = tokens_per_sec
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec
+        self.answer_tokens = answer_tokens
+        self.load_seconds = load_seconds
+        self.max_loaded_models = max_loaded_models
+        self.loaded: "OrderedDict[str, None]" = OrderedDict()
+        self.model_loads = 0
+        self.requests = 0
+        self.prompt_eval_counts: List[int] = []
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-ollama", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _load(self, model: str) -> int:
+        with self._lock:
+            self.requests += 1
+            if model in self.loaded:
+                self.loaded.move_to_end(model)
+                return 0
+            self.loaded[model] = None
+            self.model_loads += 1
+            while len(self.loaded) > self.max_loaded_models:
+                self.loaded.popitem(last=False)
+        with self._load_lock:
+            time.sleep(self.load_seconds)
+        return int(self.load_seconds * 1e9)
+
+    def _tokens(self, model: str):
+        if "deepseek" in model:
+            yield "<think>"
+            yield "Considering the question."
+            yield "</think>\n\n"
+        for i in range(self.answer_tokens):
+            yield f"token{i} "
+
+    def generate(self, body: Dict[str, Any]):
+        model = body.get("model", "")
+        started = time.perf_counter_ns()
+        load_ns = self._load(model)
+
+        context = body.get("context") or []
+        prompt = body.get("prompt") or ""
+        if not prompt:
+            yield {"model": model, "response": "", "done": True, "done_reason": "load"}
+            return
+        if not context:
+            prompt = (body.get("system") or "") + prompt
+        prompt_tokens = max(1, len(prompt) // 4)
+        with self._lock:
+            self.prompt_eval_counts.append(prompt_tokens)
+        prompt_seconds = prompt_tokens / self.prompt_tokens_per_sec
+        time.sleep(prompt_seconds)
+
+        eval_started = time.perf_counter_ns()
+        eval_count = 0
+        for token in self._tokens(model):
+            time.sleep(1 / self.tokens_per_sec)
+            eval_count += 1
+            yield {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "response": token,
+                "done": False,
+            }
+
+        now = time.perf_counter_ns()
+        yield {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "response": "",
+            "done": True,
+            "done_reason": "stop",
+            "context": context + list(range(prompt_tokens + eval_count)),
+            "total_duration": now - started,
+            "load_duration": load_ns,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_seconds * 1e9),
+            "eval_count": eval_count,
+            "eval_duration": now - eval_started,
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send_json(self, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                if self.path in ("/api/tags", "/api/ps"):
+                    models = [{"name": m, "model": m} for m in server.loaded]
+                    self._send_json({"models": models})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self) -> None:
+                if self.path != "/api/generate":
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                chunks = server.generate(body)
+
+                if not body.get("stream", True):
+                    text, final = "", {}
+                    for chunk in chunks:
+                        text += chunk["response"]
+                        final = chunk
+                    self._send_json({**final, "response": text})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in chunks:
+                    line = json.dumps(chunk).encode("utf-8") + b"\n"
+                    self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--prompt-tokens-per-sec", type=float, default=500.0)
+    parser.add_argument("--load-seconds", type=float, default=0.0)
+    parser.add_argument("--max-loaded-models", type=int, default=2)
+    args = parser.parse_args()
+
+    with FakeOllamaServer(
+        tokens_per_sec=args.tokens_per_sec,
+        prompt_tokens_per_sec=args.prompt_tokens_per_sec,
+        load_seconds=args.load_seconds,
+        max_loaded_models=args.max_loaded_models,
+        port=args.port,
+    ) as fake:
+        print(f"Fake Ollama listening on {fake.url}")
+        threading.Event().wait()
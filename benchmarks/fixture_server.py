@@ -0,0 +1,104 @@
+"""Serves recorded Drugs.com / PubMed HTML fixtures for offline scraper runs.
+
+``/drug_information.html`` returns the recorded A-Z page with its link list
+extended to ``pages`` entries; every other ``/<name>.html`` returns the
+recorded monograph with ``<name>`` as its title. Each response is delayed by
+``latency`` seconds to mimic a remote host. Responses carry an ``ETag`` and
+requests with a matching ``If-None-Match`` get an empty 304.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load_fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+class FixtureServer:
+    def __init__(self, pages: int = 200, latency: float = 0.02, port: int = 0):
+        self.pages = pages
+        self.latency = latency
+        self.requests = 0
+        self.not_modified = 0
+        self._index = self._build_index(load_fixture("drug_information.html"))
+        self._drug_page = load_fixture("drug_page.html")
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _build_index(self, html: str) -> str:
+        links = "\n".join(
+            f'<li><a href="/drug-{i}.html">Drug {i}</a></li>' for i in range(self.pages)
+        )
+        return re.sub(
+            r'(<ul class="ddc-list-column-4">).*?(</ul>)',
+            lambda m: f"{m.group(1)}\n{links}\n{m.group(2)}",
+            html,
+            flags=re.DOTALL,
+        )
+
+    def page(self, path: str) -> Optional[str]:
+        if path == "/drug_information.html":
+            return self._index
+        if match := re.fullmatch(r"/([\w-]+)\.html", path):
+            return self._drug_page.replace(
+                "<h1>Metformin</h1>", f"<h1>{match.group(1)}</h1>"
+            )
+        return None
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fixture-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                server.requests += 1
+                time.sleep(server.latency)
+                body = server.page(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                etag = f'"{hashlib.sha1(data).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
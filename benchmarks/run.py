@@ -0,0 +1,349 @@
+"""Offline benchmark suite: indexing, retrieval, routing, full queries, scraping.
+
+Runs without network access: LLM calls go to a local fake Ollama server,
+documents come from a synthetic corpus, and the scraper reads recorded HTML
+fixtures from a local server. Embeddings are deterministic fakes unless
+``--real-embeddings`` is given (requires the MiniLM model).
+
+    python -m benchmarks.run --docs 2000 --queries 50
+    python -m benchmarks.run --compare benchmarks/results/bench-<timestamp>.json
+"""
+
+import argparse
+import logging
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+from unittest.mock import patch
+
+import ollama
+from bs4 import BeautifulSoup
+from langchain.chains import RetrievalQA
+from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from benchmarks.common import (
+    compare_results,
+    print_results,
+    save_results,
+    summarize,
+    time_calls,
+)
+from benchmarks.corpus import generate_corpus, generate_queries
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.fixture_server import FixtureServer, load_fixture
+from components.config import HTTP_CACHE_TTL, PARSE_WORKERS
+from components.context import ContextPackingRetriever
+from components.crawler import HostRateLimiter
+from components.data_loader import MedicalDataFetcher
+from components.embeddings import CachedEmbeddings
+from components.llm import LlamaMedLLM, OllamaLLM
+from components.parsing import (
+    Page,
+    article,
+    extract_sections,
+    parse_article,
+    parse_pages,
+)
+from components.pipeline import IngestionPipeline
+from components.qa_chain import process_query, stream_query
+from components.router import EmbeddingRouter
+from components.scheduler import ModelScheduler
+from components.vectorstore import IndexManifest
+
+Results = Dict[str, Dict[str, float]]
+
+
+def bench_indexing(
+    docs: int, workdir: Path, embeddings: Embeddings, batch_size: int
+) -> Tuple[Chroma, Dict]:
+    vectorstore = Chroma(
+        collection_name="bench",
+        embedding_function=embeddings,
+        persist_directory=str(workdir / "chroma"),
+    )
+    pipeline = IngestionPipeline(
+        vectorstore, IndexManifest(str(workdir / "manifest.json")), batch_size
+    )
+    batch_latencies: List[float] = []
+    upsert = pipeline._upsert
+
+    def timed_upsert(batches):
+        last = time.perf_counter()
+        for count in upsert(batches):
+            now = time.perf_counter()
+            batch_latencies.append(now - last)
+            last = now
+            yield count
+
+    pipeline.pipeline.stages[-1] = ("upsert", timed_upsert)
+    started = time.perf_counter()
+    indexed = pipeline.run(generate_corpus(docs))
+    result = summarize(batch_latencies, time.perf_counter() - started, indexed)
+    return vectorstore, result
+
+
+def bench_retrieval(retriever: ContextPackingRetriever, queries: List[str]) -> Dict:
+    return time_calls(retriever.invoke, queries)
+
+
+def bench_routing(embeddings: Embeddings, queries: List[str]) -> Dict:
+    router = EmbeddingRouter(embeddings, cache_size=0)
+    router.is_medical(queries[0])  # embed prototypes outside the timed loop
+    return time_calls(router.is_medical, queries)
+
+
+def bench_queries(
+    fake: FakeOllamaServer,
+    retriever: ContextPackingRetriever,
+    queries: Dict[str, List[str]],
+    classify_seconds: float,
+    sessions: int,
+) -> Results:
+    qa_chain = RetrievalQA.from_chain_type(
+        llm=LlamaMedLLM(), chain_type="stuff", retriever=retriever
+    )
+    llm_instance = OllamaLLM()
+    results: Results = {}
+
+    def classifier(medical: bool):
+        def is_medical_query(query: str) -> bool:
+            time.sleep(classify_seconds)  # stand-in for the router's model call
+            return medical
+
+        return is_medical_query
+
+    with (
+        patch.object(ollama, "generate", ollama.Client(host=fake.url).generate),
+        patch(
+            "components.llm.get_async_client",
+            return_value=ollama.AsyncClient(host=fake.url),
+        ),
+        patch("components.qa_chain.get_semantic_cache", return_value=None),
+    ):
+        for route, medical in (("medical", True), ("general", False)):
+            with patch("components.qa_chain.is_medical_query", classifier(medical)):
+                results[f"query_{route}"] = time_calls(
+                    lambda q: process_query(qa_chain, q, llm_instance), queries[route]
+                )
+
+                first_token: List[float] = []
+                for query in queries[route]:
+                    started = time.perf_counter()
+                    stream = stream_query(qa_chain, query, llm_instance)
+                    next(stream)
+                    first_token.append(time.perf_counter() - started)
+                    for _ in stream:
+                        pass
+                results[f"ttft_{route}"] = summarize(first_token)
+
+        with patch("components.qa_chain.is_medical_query", classifier(True)):
+            latencies: List[float] = []
+
+            def session(batch: List[str]) -> None:
+                for query in batch:
+                    t0 = time.perf_counter()
+                    process_query(qa_chain, query, llm_instance)
+                    latencies.append(time.perf_counter() - t0)
+
+            started = time.perf_counter()
+            threads = [
+                threading.Thread(
+                    target=session, args=(queries["medical"][i::sessions],)
+                )
+                for i in range(sessions)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results["query_concurrent"] = summarize(
+                latencies, time.perf_counter() - started
+            )
+
+    results["query_general"]["model_loads"] = fake.model_loads
+    return results
+
+
+def bench_mixed_load(fake: FakeOllamaServer, requests: int) -> Results:
+    """Concurrent alternating medllama2/deepseek-r1 calls, with and without the scheduler."""
+    results: Results = {}
+    for name, enabled in (("mixed_unscheduled", False), ("mixed_scheduled", True)):
+        scheduler = ModelScheduler(enabled=enabled)
+        models = [LlamaMedLLM(), OllamaLLM()] * (requests // 2)
+        latencies: List[float] = []
+        loads_before = fake.model_loads
+
+        def request(model) -> None:
+            t0 = time.perf_counter()
+            model.invoke("What is the usual dose of metformin?")
+            latencies.append(time.perf_counter() - t0)
+
+        with (
+            patch.object(ollama, "generate", ollama.Client(host=fake.url).generate),
+            patch("components.llm.scheduler", scheduler),
+        ):
+            started = time.perf_counter()
+            threads = [threading.Thread(target=request, args=(m,)) for m in models]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        results[name] = summarize(latencies, time.perf_counter() - started)
+        results[name]["model_loads"] = fake.model_loads - loads_before
+    return results
+
+
+def bench_scraper(pages: int, latency: float, workdir: Path) -> Results:
+    """A cold crawl, a recrawl revalidating every page, and one within the TTL."""
+    results: Results = {}
+    with (
+        FixtureServer(pages=pages, latency=latency) as server,
+        patch(
+            "components.data_loader.DRUGS_BASE_URL",
+            f"{server.url}/drug_information.html",
+        ),
+        patch("components.data_loader.DRUGS_URL", server.url),
+        patch(
+            "components.data_loader.HTTP_CACHE_PATH",
+            str(workdir / "http_cache.sqlite"),
+        ),
+    ):
+        for name, ttl in (
+            ("scraper", 0),
+            ("scraper_revalidate", 0),
+            ("scraper_cached", HTTP_CACHE_TTL),
+        ):
+            fetcher = MedicalDataFetcher()
+            fetcher.scraper.cache.ttl = ttl
+            fetcher.engine.rate_limiter = HostRateLimiter(rates={}, default_rate=0)
+            fetch = fetcher.engine.fetch
+            latencies: List[float] = []
+
+            def timed_fetch(url):
+                started = time.perf_counter()
+                try:
+                    return fetch(url)
+                finally:
+                    latencies.append(time.perf_counter() - started)
+
+            fetcher.engine.fetch = timed_fetch
+            requests, not_modified = server.requests, server.not_modified
+            started = time.perf_counter()
+            documents = fetcher.fetch_drugs()
+            results[name] = summarize(
+                latencies, time.perf_counter() - started, len(documents)
+            )
+            results[name]["not_modified"] = server.not_modified - not_modified
+            results[name]["requests"] = server.requests - requests
+            fetcher.scraper.close()
+    return results
+
+
+def bench_parsing(repeat: int, workers: int) -> Results:
+    """Serial full-tree parsing vs the strained, process-pool parse stage."""
+    pages = [
+        Page("https://www.drugs.com/metformin.html", load_fixture("drug_page.html")),
+        Page("https://pubmed.ncbi.nlm.nih.gov/1/", load_fixture("pubmed_article.html")),
+    ] * repeat
+
+    def full_tree(page: Page) -> None:
+        soup = BeautifulSoup(page.html, "html.parser")
+        title = soup.find("h1")
+        article(title.get_text(strip=True) if title else None, [], page.url)
+        extract_sections(soup)
+
+    results = {
+        "parsing_full_tree": time_calls(full_tree, pages),
+        "parsing": time_calls(lambda page: parse_article(page.html, page.url), pages),
+    }
+    # Includes starting the worker processes, as in an ingestion run
+    started = time.perf_counter()
+    parsed = sum(1 for _ in parse_pages(pages, workers=workers))
+    elapsed = time.perf_counter() - started
+    results["parse_stage"] = summarize([elapsed / parsed] * parsed, elapsed, parsed)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--prompt-tokens-per-sec", type=float, default=4000.0)
+    parser.add_argument("--load-seconds", type=float, default=0.0)
+    parser.add_argument("--max-loaded-models", type=int, default=2)
+    parser.add_argument("--mixed-requests", type=int, default=16)
+    parser.add_argument("--classify-ms", type=float, default=50.0)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--scraper-pages", type=int, default=200)
+    parser.add_argument("--scraper-latency", type=float, default=0.02)
+    parser.add_argument("--parse-repeat", type=int, default=500)
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS)
+    parser.add_argument("--real-embeddings", action="store_true")
+    parser.add_argument("--output", default="benchmarks/results")
+    parser.add_argument("--compare", help="previous results JSON to compare with")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    queries = generate_queries(args.queries)
+    results: Results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        if args.real_embeddings:
+            from components.vectorstore import get_embeddings
+
+            embeddings = get_embeddings()
+        else:
+            embeddings = CachedEmbeddings(
+                DeterministicFakeEmbedding(size=384),
+                "fake-384",
+                str(workdir / "embeddings"),
+            )
+
+        vectorstore, results["indexing"] = bench_indexing(
+            args.docs, workdir, embeddings, args.batch_size
+        )
+        retriever = ContextPackingRetriever(
+            vectorstore=vectorstore, embeddings=embeddings
+        )
+        results["retrieval"] = bench_retrieval(retriever, queries["medical"])
+        results["routing"] = bench_routing(
+            embeddings, queries["medical"] + queries["general"]
+        )
+
+        with FakeOllamaServer(
+            tokens_per_sec=args.tokens_per_sec,
+            prompt_tokens_per_sec=args.prompt_tokens_per_sec,
+            load_seconds=args.load_seconds,
+            max_loaded_models=args.max_loaded_models,
+        ) as fake:
+            results.update(
+                bench_queries(
+                    fake, retriever, queries, args.classify_ms / 1000, args.sessions
+                )
+            )
+
+        with FakeOllamaServer(
+            tokens_per_sec=args.tokens_per_sec,
+            prompt_tokens_per_sec=args.prompt_tokens_per_sec,
+            load_seconds=args.load_seconds,
+            max_loaded_models=1,
+        ) as fake:
+            results.update(bench_mixed_load(fake, args.mixed_requests))
+
+        results.update(bench_scraper(args.scraper_pages, args.scraper_latency, workdir))
+    results.update(bench_parsing(args.parse_repeat, args.parse_workers))
+
+    print_results(results)
+    print(f"\nResults written to {save_results(results, args.output)}")
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
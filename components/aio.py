@@ -0,0 +1,86 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Coroutine, Optional, TypeVar
+
+import ollama
+
+from components.config import ASYNC_EXECUTOR_WORKERS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_clients: "weakref.WeakKeyDictionary[Any, ollama.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop, starting its thread on first use.
+
+    All Streamlit sessions submit their queries to this loop, so concurrent
+    sessions share one pooled Ollama connection instead of each blocking a
+    script thread on I/O.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(
+                ThreadPoolExecutor(ASYNC_EXECUTOR_WORKERS, thread_name_prefix="aio")
+            )
+            threading.Thread(
+                target=loop.run_forever, name="aio-loop", daemon=True
+            ).start()
+            _loop = loop
+        return _loop
+
+
+def run(coro: Coroutine[Any, Any, T]) -> T:
+    """Run ``coro`` on the shared loop from synchronous code and wait for it.
+
+    The caller's context variables (e.g. the current metrics span) are
+    carried over to the task.
+    """
+    loop = get_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run() called from the shared event loop; await instead")
+
+    result: concurrent.futures.Future = concurrent.futures.Future()
+
+    def start() -> None:
+        task = asyncio.ensure_future(coro)
+
+        def done(task: asyncio.Task) -> None:
+            if task.cancelled():
+                result.cancel()
+            elif task.exception() is not None:
+                result.set_exception(task.exception())
+            else:
+                result.set_result(task.result())
+
+        task.add_done_callback(done)
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    return result.result()
+
+
+def get_async_client() -> ollama.AsyncClient:
+    """One ``AsyncClient`` (and HTTP connection pool) per running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = ollama.AsyncClient()
+    return client
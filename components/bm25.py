@@ -0,0 +1,262 @@
+import io
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, Hashable, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from components.config import BM25_B, BM25_K1, BM25_MERGE_DOCS
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its "
+    "of on or should that the this to was what when which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens without stopwords; hyphenated names stay whole."""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index held in flat numpy arrays.
+
+    Postings are stored CSR-style: the documents containing term ``t`` are
+    ``postings[offsets[t]:offsets[t + 1]]`` with their term frequencies in
+    ``frequencies`` at the same positions. Updates are merged into these
+    arrays rather than kept as Python lists, so the index stays a few bytes
+    per posting in memory and on disk.
+
+    Updates are buffered and merged once the buffer holds ``merge_docs``
+    documents or a quarter of the index, whichever is larger, or when the
+    index is searched or saved. Each merge rewrites the arrays, so growing
+    the buffer with the index keeps the cost per added document constant.
+    ``dirty`` is set until the next save.
+    """
+
+    def __init__(
+        self, k1: float = BM25_K1, b: float = BM25_B, merge_docs: int = BM25_MERGE_DOCS
+    ):
+        self.k1 = k1
+        self.b = b
+        self.merge_docs = merge_docs
+        self.dirty = False
+        self.terms: Dict[str, int] = {}
+        self.doc_ids: List[str] = []
+        self.doc_lengths = np.zeros(0, dtype=np.int32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = np.zeros(0, dtype=np.int32)
+        self.frequencies = np.zeros(0, dtype=np.uint16)
+        self._positions: Dict[str, int] = {}
+        self._pending: Dict[str, str] = {}
+        self._pending_deletes: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._merge()
+            return len(self.doc_ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            self._merge()
+            return doc_id in self._positions
+
+    def _term_ids(self) -> np.ndarray:
+        """Term id of every posting, expanded from ``offsets``."""
+        return np.repeat(
+            np.arange(len(self.offsets) - 1, dtype=np.int32), np.diff(self.offsets)
+        )
+
+    def _rebuild(
+        self,
+        keep: np.ndarray,
+        new_ids: Sequence[str],
+        new_lengths: List[int],
+        new_postings: List[Tuple[int, int, int]],
+    ) -> None:
+        """Drop documents not in ``keep`` and append the new ones."""
+        remap = np.cumsum(keep, dtype=np.int64) - 1
+        old_terms = self._term_ids()
+        alive = keep[self.postings]
+        term_ids = old_terms[alive]
+        postings = remap[self.postings[alive]].astype(np.int32)
+        frequencies = self.frequencies[alive]
+
+        first_new = int(keep.sum())
+        if new_postings:
+            added = np.asarray(new_postings, dtype=np.int64)
+            order = np.argsort(added[:, 0], kind="stable")
+            term_ids = np.concatenate([term_ids, added[order, 0].astype(np.int32)])
+            postings = np.concatenate(
+                [postings, (added[order, 1] + first_new).astype(np.int32)]
+            )
+            frequencies = np.concatenate(
+                [frequencies, np.minimum(added[order, 2], 65535).astype(np.uint16)]
+            )
+        # Both runs are already sorted by term, so the stable sort is a merge
+        order = np.argsort(term_ids, kind="stable")
+        counts = np.bincount(term_ids, minlength=len(self.terms))
+
+        self.postings = postings[order]
+        self.frequencies = frequencies[order]
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.doc_ids = [d for d, k in zip(self.doc_ids, keep) if k] + list(new_ids)
+        self.doc_lengths = np.concatenate(
+            [self.doc_lengths[keep], np.asarray(new_lengths, dtype=np.int32)]
+        )
+        self._positions = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+
+    def update(self, add: Dict[str, str], delete: Sequence[str] = ()) -> None:
+        """Index ``add`` (id → text, replacing existing ids) and remove ``delete``."""
+        with self._lock:
+            for doc_id in delete:
+                self._pending.pop(doc_id, None)
+                if doc_id in self._positions:
+                    self._pending_deletes.add(doc_id)
+            self._pending.update(add)
+            self.dirty = True
+            buffered = len(self._pending) + len(self._pending_deletes)
+            if buffered >= max(self.merge_docs, len(self.doc_ids) // 4):
+                self._merge()
+
+    def _merge(self) -> None:
+        """Merge the buffered updates into the posting arrays (lock held)."""
+        if not self._pending and not self._pending_deletes:
+            return
+        keep = np.ones(len(self.doc_ids), dtype=bool)
+        for doc_id in self._pending_deletes.union(self._pending):
+            position = self._positions.get(doc_id)
+            if position is not None:
+                keep[position] = False
+
+        new_lengths: List[int] = []
+        new_postings: List[Tuple[int, int, int]] = []
+        for i, text in enumerate(self._pending.values()):
+            tokens = tokenize(text)
+            new_lengths.append(len(tokens))
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                term_id = self.terms.setdefault(token, len(self.terms))
+                new_postings.append((term_id, i, count))
+
+        self._rebuild(keep, list(self._pending), new_lengths, new_postings)
+        self._pending = {}
+        self._pending_deletes = set()
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        self.update(dict(zip(ids, texts)))
+
+    def delete(self, ids: Sequence[str]) -> None:
+        self.update({}, ids)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """The ``k`` best ``(doc_id, score)`` pairs for ``query``, best first."""
+        with self._lock:
+            self._merge()
+        n_docs = len(self.doc_ids)
+        term_ids = {self.terms[t] for t in tokenize(query) if t in self.terms}
+        if not n_docs or not term_ids:
+            return []
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        norm = self.k1 * (
+            1 - self.b + self.b * self.doc_lengths / max(self.doc_lengths.mean(), 1)
+        )
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            if start == end:
+                continue
+            docs = self.postings[start:end]
+            tf = self.frequencies[start:end].astype(np.float32)
+            df = end - start
+            idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm[docs])
+
+        matched = np.flatnonzero(scores)
+        top = matched[np.argsort(-scores[matched], kind="stable")[:k]]
+        return [(self.doc_ids[i], float(scores[i])) for i in top]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        buffer = io.BytesIO()
+        with self._lock:
+            self._merge()
+            np.savez(
+                buffer,
+                doc_lengths=self.doc_lengths,
+                offsets=self.offsets,
+                postings=self.postings,
+                frequencies=self.frequencies,
+                header=np.frombuffer(
+                    json.dumps(
+                        {
+                            "k1": self.k1,
+                            "b": self.b,
+                            "terms": list(self.terms),
+                            "doc_ids": self.doc_ids,
+                        }
+                    ).encode("utf-8"),
+                    dtype=np.uint8,
+                ),
+            )
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load the index at ``path``; an empty index if there is none yet."""
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            header = json.loads(data["header"].tobytes().decode("utf-8"))
+            index = cls(header["k1"], header["b"])
+            index.doc_lengths = data["doc_lengths"]
+            index.offsets = data["offsets"]
+            index.postings = data["postings"]
+            index.frequencies = data["frequencies"]
+        index.terms = {term: i for i, term in enumerate(header["terms"])}
+        index.doc_ids = header["doc_ids"]
+        index._positions = {doc_id: i for i, doc_id in enumerate(index.doc_ids)}
+        return index
+
+
+_loaded: Dict[str, Tuple[int, BM25Index]] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_index(path: str) -> BM25Index:
+    """Shared read-only view of the index at ``path``, reloaded when the file changes."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = 0
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is None or cached[0] != mtime:
+            index = BM25Index.load(path)
+            logger.info(f"Loaded BM25 index with {len(index)} documents from {path}")
+            cached = _loaded[path] = (mtime, index)
+        return cached[1]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Hashable]], k: int = 60
+) -> List[Tuple[Hashable, float]]:
+    """Fuse ranked key lists: each key scores ``sum(1 / (k + rank))``, best first."""
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
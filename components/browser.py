@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from components.metrics import registry
+from components.config import (
+    REQUEST_TIMEOUT,
+    SELENIUM_ACQUIRE_TIMEOUT,
+    SELENIUM_MAX_PAGES,
+    SELENIUM_POOL_SIZE,
+    SELENIUM_REMOTE_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def remote_driver() -> Any:
+    """Headless Chrome session on the Selenium server at ``SELENIUM_REMOTE_URL``."""
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+
+    driver = webdriver.Remote(command_executor=SELENIUM_REMOTE_URL, options=options)
+    driver.set_page_load_timeout(REQUEST_TIMEOUT)
+    return driver
+
+
+@dataclass
+class _Browser:
+    driver: Any
+    pages: int = 0
+
+
+class BrowserPool:
+    """Bounded pool of reusable browser sessions for pages plain HTTP can't fetch.
+
+    At most ``size`` sessions exist at once; callers wait up to
+    ``acquire_timeout`` seconds for one. Idle sessions are health-checked
+    before reuse, and a session is recycled after ``max_pages`` pages or as
+    soon as it raises, so one crashed browser doesn't poison later fetches.
+    """
+
+    def __init__(
+        self,
+        size: int = SELENIUM_POOL_SIZE,
+        max_pages: int = SELENIUM_MAX_PAGES,
+        acquire_timeout: float = SELENIUM_ACQUIRE_TIMEOUT,
+        factory: Callable[[], Any] = remote_driver,
+    ):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.acquire_timeout = acquire_timeout
+        self.factory = factory
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle: List[_Browser] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def _healthy(browser: _Browser) -> bool:
+        try:
+            browser.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(browser: _Browser) -> None:
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing browser session: {str(e)}")
+
+    def _checkout(self) -> _Browser:
+        while True:
+            with self._lock:
+                browser = self._idle.pop() if self._idle else None
+            if browser is None:
+                registry.inc("browser_sessions_created_total")
+                return _Browser(self.factory())
+            if self._healthy(browser):
+                return browser
+            registry.inc("browser_sessions_discarded_total", reason="unhealthy")
+            self._quit(browser)
+
+    def _checkin(self, browser: _Browser) -> None:
+        if browser.pages >= self.max_pages:
+            registry.inc("browser_sessions_discarded_total", reason="recycled")
+            self._quit(browser)
+            return
+        with self._lock:
+            if not self._closed:
+                self._idle.append(browser)
+                return
+        self._quit(browser)
+
+    @contextmanager
+    def session(self) -> Iterator[Any]:
+        """Borrow a driver; raises ``TimeoutError`` if none frees up in time."""
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError("No browser session available")
+        try:
+            browser = self._checkout()
+            try:
+                yield browser.driver
+            except BaseException:
+                registry.inc("browser_sessions_discarded_total", reason="error")
+                self._quit(browser)
+                raise
+            browser.pages += 1
+            self._checkin(browser)
+        finally:
+            self._slots.release()
+
+    def fetch(self, url: str) -> str:
+        """Page source of ``url`` as rendered by a pooled browser."""
+        host = urlparse(url).netloc
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with self.session() as driver:
+                driver.get(url)
+                source = driver.page_source
+            status = "ok"
+            return source
+        finally:
+            registry.observe(
+                "browser_fetch_seconds", time.perf_counter() - started, host=host
+            )
+            registry.inc("browser_fetch_total", host=host, status=status)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for browser in idle:
+            self._quit(browser)
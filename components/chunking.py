@@ -0,0 +1,131 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from components.config import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS
+from components.context import estimate_tokens
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\"'])")
+
+
+@dataclass
+class Section:
+    heading: str
+    text: str
+
+
+def parent_id(source: str) -> str:
+    """ID shared by every chunk of the document at ``source``."""
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+
+def split_sentences(text: str, max_tokens: int) -> List[str]:
+    """Sentences of ``text``; sentences over ``max_tokens`` are split at words."""
+    pieces: List[str] = []
+    for sentence in _SENTENCE_END.split(" ".join(text.split())):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words: List[str] = []
+        for word in sentence.split():
+            if words and estimate_tokens(" ".join(words + [word])) > max_tokens:
+                pieces.append(" ".join(words))
+                words = []
+            words.append(word)
+        if words:
+            pieces.append(" ".join(words))
+    return [piece for piece in pieces if piece]
+
+
+def _line(heading: str, sentences: List[str]) -> str:
+    return (f"{heading}: " if heading else "") + " ".join(sentences)
+
+
+def chunk_sections(
+    sections: Iterable[Section],
+    max_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> List[Tuple[str, str, int]]:
+    """Split ``sections`` into ``(body, heading, overlap)`` chunks of ``max_tokens``.
+
+    Short consecutive sections share a chunk, one ``Heading: text`` line each.
+    A section that does not fit starts a new chunk once the current one is
+    half full; longer sections are split between sentences. A chunk continuing
+    a section repeats its heading and up to ``overlap_tokens`` of its last
+    sentences; ``overlap`` is the length of that repeated prefix.
+    """
+    chunks: List[Tuple[str, str, int]] = []
+    lines: List[str] = []
+    current: List[str] = []
+    heading = ""
+    first_heading: Optional[str] = None
+    overlap = used = 0
+
+    def flush() -> None:
+        body = "\n".join(lines + ([_line(heading, current)] if current else []))
+        if body:
+            chunks.append((body, first_heading or "", overlap))
+
+    for section in sections:
+        if current:
+            lines.append(_line(heading, current))
+            current = []
+        heading = section.heading
+        head_tokens = estimate_tokens(f"{heading}: ") if heading else 0
+        section_tokens = head_tokens + estimate_tokens(section.text)
+        if lines and used >= max_tokens // 2 and used + section_tokens > max_tokens:
+            # Start the section in a fresh chunk rather than splitting it
+            flush()
+            lines, first_heading, overlap, used = [], None, 0, 0
+        limit = max(1, max_tokens - head_tokens - overlap_tokens)
+        for sentence in split_sentences(section.text, limit):
+            cost = estimate_tokens(sentence) + 1 + (0 if current else head_tokens)
+            if used + cost > max_tokens and (lines or current):
+                flush()
+                carry: List[str] = []
+                for previous in reversed(current):
+                    if estimate_tokens(_line("", [previous] + carry)) > overlap_tokens:
+                        break
+                    carry.insert(0, previous)
+                lines, current, first_heading = [], carry, heading
+                overlap = len(_line(heading, carry)) + 1 if carry else 0
+                used = estimate_tokens(_line(heading, carry)) if carry else 0
+                cost = estimate_tokens(sentence) + 1 + (0 if current else head_tokens)
+            if first_heading is None:
+                first_heading = heading
+            current.append(sentence)
+            used += cost
+    flush()
+    return chunks
+
+
+def chunk_article(article: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Chunk documents for an article with ``title``, ``sections`` and ``metadata``."""
+    source = article["metadata"]["source"]
+    header = f"Title: {article.get('title') or 'No title'}"
+    chunks = chunk_sections(
+        article["sections"], max_tokens=CHUNK_TOKENS - estimate_tokens(header)
+    ) or [("Content: No content", "", 0)]
+    return [
+        {
+            "text": f"{header}\n{body}",
+            "metadata": {
+                **article["metadata"],
+                "parent_id": parent_id(source),
+                "chunk": i,
+                "section": heading,
+                "overlap": overlap,
+            },
+        }
+        for i, (body, heading, overlap) in enumerate(chunks)
+    ]
+
+
+def chunk_documents(documents: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Ingestion stage: expand articles into chunks, pass other documents through."""
+    for document in documents:
+        if "sections" in document:
+            yield from chunk_article(document)
+        else:
+            yield document
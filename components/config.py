@@ -1,9 +1,34 @@
 import logging
+import os
 
 # Logger configuration
 LOGGING_LEVEL = logging.INFO
 LOGGING_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
+# Startup configuration
+WARMUP_ENABLED = True
+
+# Metrics configuration
+METRICS_ENABLED = True
+METRICS_PORT = 9108
+METRICS_PREFIX = "medrag"
+METRICS_TRACE_PATH = "traces/requests.jsonl"
+METRICS_LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
 # HTTP Request configuration
 USER_AGENT = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
@@ -11,10 +36,51 @@ USER_AGENT = {
 
 REQUEST_TIMEOUT = 30
 
+# Crawler configuration
+CRAWLER_MAX_IN_FLIGHT = 8
+CRAWLER_MAX_RETRIES = 3
+CRAWLER_BACKOFF_BASE = 0.5
+CRAWLER_BACKOFF_MAX = 10.0
+CRAWLER_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Requests per second, per host
+CRAWLER_DEFAULT_RATE_LIMIT = 5.0
+CRAWLER_HOST_RATE_LIMITS = {
+    "eutils.ncbi.nlm.nih.gov": 3.0,
+    "pubmed.ncbi.nlm.nih.gov": 3.0,
+    "www.drugs.com": 2.0,
+}
+# Consecutive blocked (403) fetches before a host is skipped, and for how long
+CRAWLER_BREAKER_THRESHOLD = 5
+CRAWLER_BREAKER_COOLDOWN = 300.0
+
+# Browser fallback for pages plain HTTP is refused (Selenium)
+SELENIUM_REMOTE_URL = os.getenv("SELENIUM_REMOTE_URL", "http://selenium:4444/wd/hub")
+# Must not exceed the Selenium node's SE_NODE_MAX_SESSIONS
+SELENIUM_POOL_SIZE = 4
+# Pages a browser session serves before it is replaced
+SELENIUM_MAX_PAGES = 50
+SELENIUM_ACQUIRE_TIMEOUT = 60.0
+
+# On-disk HTTP response cache for scraped pages. Pages younger than the TTL are
+# served without a request, older ones are revalidated (If-None-Match /
+# If-Modified-Since). Modes: "revalidate", "offline" (cache only) or "off".
+HTTP_CACHE_PATH = "./http_cache/responses.sqlite"
+HTTP_CACHE_TTL = 24 * 3600
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "revalidate")
+
+# HTML parsing stage: worker processes and pages sent to a worker at once
+PARSE_WORKERS = os.cpu_count() or 1
+PARSE_BATCH_SIZE = 8
+
 # PubMed API configuration
 PUBMED_SEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
 PUBMED_PARAMS = {"db": "pubmed", "term": "all[sb]", "retmax": 250, "retmode": "json"}
 
+PUBMED_FETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+PUBMED_FETCH_BATCH_SIZE = 500
+# efetch responses are streamed into a buffer that spills to disk beyond this
+PUBMED_SPOOL_BYTES = 4 * 1024 * 1024
+
 PUBMED_URL_ARTICLE = "https://pubmed.ncbi.nlm.nih.gov/"
 
 # Drugs.com configuration
@@ -25,6 +91,53 @@ DRUGS_URL = "https://www.drugs.com"
 DEFAULT_MODEL_NAME = "deepseek-r1:latest"
 DEFAULT_TEMPERATURE = 0.2
 DEFAULT_TOP_P = 0.9
+# Ollama's default context window, used to budget conversation state
+DEFAULT_NUM_CTX = 2048
+
+# How long Ollama keeps a model loaded after a request
+OLLAMA_KEEP_ALIVE = "30m"
+
+# Threads for blocking work (classification, retrieval) in the async query path
+ASYNC_EXECUTOR_WORKERS = 16
+
+# Query service configuration
+SERVICE_HOST = "0.0.0.0"
+SERVICE_PORT = 8000
+SERVICE_MAX_CONCURRENT = 4
+SERVICE_MAX_QUEUE = 32
+SERVICE_QUEUE_TIMEOUT = 30.0
+# Lower value is admitted first
+SERVICE_PRIORITIES = {"interactive": 0, "batch": 1}
+# When set, the Streamlit UI sends queries to this service instead of in-process
+QUERY_SERVICE_URL = os.getenv("QUERY_SERVICE_URL")
+
+# Shared model server for the embedder and query router
+# ("unix:///path/to.sock" or "http://host:port"); in-process models when unset
+MODEL_SERVER_ADDRESS = os.getenv("MODEL_SERVER_ADDRESS")
+MODEL_SERVER_LISTEN = "unix:///tmp/medrag-models.sock"
+MODEL_SERVER_MAX_BATCH = 64
+# Seconds to wait for more requests before running a micro-batch
+MODEL_SERVER_BATCH_WAIT = 0.005
+MODEL_SERVER_TIMEOUT = 30
+
+# Conversation memory
+# Idle seconds before a session's history and token state are dropped
+CONVERSATION_TTL = 1800
+CONVERSATION_MAX_SESSIONS = 256
+CONVERSATION_MAX_TURNS = 20
+# Windowed history re-sent when a session's token state no longer fits
+CONVERSATION_HISTORY_TOKENS = 512
+
+# Model-affinity scheduler: batches requests per model to avoid model swaps
+SCHEDULER_ENABLED = True
+# Models the Ollama host can keep in memory at once (OLLAMA_MAX_LOADED_MODELS)
+SCHEDULER_RESIDENT_MODELS = 1
+# Concurrent generations per model (OLLAMA_NUM_PARALLEL)
+SCHEDULER_MAX_CONCURRENT = 2
+# Requests served for one model before yielding to waiting models
+SCHEDULER_MAX_BATCH = 8
+# Seconds a request may wait before its model preempts the current batch
+SCHEDULER_MAX_WAIT = 5.0
 
 # LlamaMed Model Configuration
 MEDLLAMA_MODEL_NAME = "medllama2:latest"
@@ -52,17 +165,173 @@ MEDLLAMA_SYSTEM_PROMPT = """You are Dr. Alex. You are a friendly and professiona
         - Provide information in a way that patients can understand
     Always detect if the input is a greeting/casual conversation or a medical query and respond appropriately. If you found the information in articles then add a link to the article"""
 
-# Retrieval QA Configuration
-QA_SEARCH_TYPE = "similarity"
-QA_SEARCH_K = 9
+# Retrieval QA Configuration ("similarity" packs by score, "mmr" by MMR)
+QA_SEARCH_TYPE = "mmr"
+QA_SEARCH_K = 5
+
+# Chunking Configuration: articles are split into section-aware chunks of
+# CHUNK_TOKENS; a chunk continuing a section repeats up to CHUNK_OVERLAP_TOKENS
+CHUNK_TOKENS = 256
+CHUNK_OVERLAP_TOKENS = 32
+
+# Context Packing Configuration
+CONTEXT_FETCH_K = 20
+CONTEXT_ANSWER_RESERVE = 512
+CONTEXT_TEMPLATE_OVERHEAD = 80
+CONTEXT_CHARS_PER_TOKEN = 3.5
+CONTEXT_MMR_LAMBDA = 0.7
+CONTEXT_DUPLICATE_THRESHOLD = 0.95
+
+# Semantic Answer Cache Configuration
+SEMANTIC_CACHE_ENABLED = True
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_TTL = 3600
+SEMANTIC_CACHE_MAX_SIZE = 512
+# Embeddings score questions that differ in one decisive word as near-identical,
+# so a hit also needs matching terms: "key_terms" compares only the terms that
+# tell medical questions apart (numbers, negations, the qualifiers below and
+# drug names by their WHO INN stem), "jaccard" needs at least
+# SEMANTIC_CACHE_MIN_JACCARD overlap of all query words, "off" uses cosine only
+SEMANTIC_CACHE_TERM_RULE = "key_terms"
+SEMANTIC_CACHE_MIN_JACCARD = 0.5
+SEMANTIC_CACHE_KEY_TERMS = frozenset(
+    "no not non without never avoid stop adult adults child children pediatric "
+    "paediatric infant infants baby newborn neonatal elderly pregnant pregnancy "
+    "breastfeeding male female overdose toxicity maximum max minimum min daily "
+    "weekly monthly oral iv intravenous topical injection kidney renal liver "
+    "hepatic".split()
+)
+SEMANTIC_CACHE_DRUG_STEMS = (
+    "afil", "azepam", "azole", "cillin", "conazole", "cycline", "dipine",
+    "dronate", "floxacin", "formin", "gliflozin", "gliptin", "glutide",
+    "lukast", "mab", "micin", "mycin", "olol", "oxacin", "parin", "prazole",
+    "pril", "profen", "sartan", "semide", "setron", "statin", "tiapine",
+    "tidine", "triptan", "vir", "xaban",
+)  # fmt: skip
 
 # Zero-Shot Classification Model
 ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
 ZERO_SHOT_LABELS = ["medical", "general"]
 ZERO_SHOT_THRESHOLD = 0.7
 
+# Query Router Configuration ("embedding" or "zero_shot")
+QUERY_ROUTER = "embedding"
+ROUTER_BART_FALLBACK = True
+ROUTER_FALLBACK_MARGIN = 0.03
+ROUTER_CACHE_SIZE = 2048
+ROUTER_PROTOTYPES = {
+    "medical": [
+        "What is the recommended dosage of ibuprofen for adults?",
+        "What are the side effects of metformin?",
+        "Can I take paracetamol with amoxicillin?",
+        "What are the symptoms of type 2 diabetes?",
+        "How is high blood pressure treated?",
+        "Is this rash a sign of an allergic reaction?",
+        "What causes chest pain after exercise?",
+        "How long does the flu last?",
+        "What does an elevated white blood cell count mean?",
+        "Which vaccines are recommended during pregnancy?",
+        "How should I manage a migraine?",
+        "What are the contraindications of warfarin?",
+    ],
+    "general": [
+        "Hello, how are you?",
+        "What is the capital of France?",
+        "Tell me a joke.",
+        "How do I write a for loop in Python?",
+        "What is the weather like today?",
+        "Recommend a good book to read.",
+        "Who won the football match yesterday?",
+        "Translate this sentence into Spanish.",
+        "What time is it in Tokyo?",
+        "Thanks, that was helpful!",
+        "Explain how a car engine works.",
+        "What should I cook for dinner tonight?",
+    ],
+}
+
+# Source Partitions: documents are tagged with the partition and document
+# type of their source host, and medical queries search only the partitions
+# they are about
+SOURCE_PARTITIONS = {
+    "www.drugs.com": {"partition": "drugs", "doc_type": "drug_monograph"},
+    "pubmed.ncbi.nlm.nih.gov": {"partition": "pubmed", "doc_type": "abstract"},
+}
+DEFAULT_PARTITION = {"partition": "other", "doc_type": "web_page"}
+PARTITION_ROUTING_ENABLED = True
+# A query that favours one partition's prototypes by this margin searches only
+# that partition (with CONTEXT_FETCH_K); others search every partition below
+# with its own k and the results are merged
+PARTITION_ROUTER_MARGIN = 0.05
+PARTITION_FETCH_K = {"drugs": 10, "pubmed": 10, "other": 5}
+PARTITION_PROTOTYPES = {
+    "drugs": [
+        "What is metformin used for?",
+        "Side effects of lisinopril",
+        "Ibuprofen dosage for adults",
+        "Can I drink alcohol while taking amoxicillin?",
+        "Atorvastatin drug interactions",
+        "How should insulin glargine be stored?",
+        "Is sertraline safe during pregnancy?",
+        "Warfarin overdose symptoms",
+    ],
+    "pubmed": [
+        "What does recent research say about vitamin D and depression?",
+        "Clinical trial results of SGLT2 inhibitors in heart failure",
+        "Meta-analysis of statin therapy for primary prevention",
+        "Mechanism of insulin resistance in obesity",
+        "Prevalence of hypertension in older adults",
+        "Outcomes of early mobilisation after hip fracture surgery",
+        "Risk factors for postoperative delirium",
+        "Efficacy of cognitive behavioural therapy for chronic pain",
+    ],
+}
+
 # Vector Store Configuration
 VECTORSTORE_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 VECTORSTORE_CACHE_FOLDER = "./embeddings_cache"
 VECTORSTORE_PERSIST_DIR = "chroma_db"
 VECTORSTORE_COLLECTION_NAME = "med_data_collection"
+EMBEDDING_CACHE_DIR = "./embeddings_cache/vectors"
+EMBEDDING_CACHE_DTYPE = "float32"
+EMBEDDING_QUERY_CACHE_SIZE = 1024
+VECTORSTORE_MANIFEST_PATH = f"{VECTORSTORE_PERSIST_DIR}/index_manifest.json"
+
+# Prebuilt index snapshots (python -m components.snapshots)
+SNAPSHOT_DIR = "snapshots"
+# Snapshot to serve: a name, "current" (follows SNAPSHOT_DIR/CURRENT and swaps
+# when it changes) or unset to serve the live index in VECTORSTORE_PERSIST_DIR
+INDEX_SNAPSHOT = os.getenv("INDEX_SNAPSHOT")
+# Seconds between checks of SNAPSHOT_DIR/CURRENT
+SNAPSHOT_POLL_INTERVAL = 30.0
+
+# Hybrid Retrieval Configuration (BM25 + vector search, fused by reciprocal rank)
+HYBRID_RETRIEVAL_ENABLED = True
+# Kept next to the manifest and updated with the collection
+BM25_INDEX_FILENAME = "bm25_index.npz"
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Updates are buffered and merged into the postings in runs of at least this
+# many documents (or a quarter of the index, if larger)
+BM25_MERGE_DOCS = 2048
+HYBRID_LEXICAL_K = 20
+HYBRID_RRF_K = 60
+
+# Near-Duplicate Detection at ingest (MinHash + LSH). With 8 bands of 8 rows,
+# pairs above ~0.77 Jaccard become candidates and DEDUP_THRESHOLD decides.
+DEDUP_ENABLED = True
+DEDUP_INDEX_FILENAME = "minhash_index.npz"
+DEDUP_NUM_PERM = 64
+DEDUP_BANDS = 8
+DEDUP_SHINGLE_SIZE = 3
+DEDUP_MIN_SHINGLES = 8
+DEDUP_THRESHOLD = 0.8
+DEDUP_SEED = 1
+
+# Streaming ingestion configuration
+INGEST_BATCH_SIZE = 64
+INGEST_QUEUE_SIZE = 8
+INGEST_PROGRESS_INTERVAL = 10.0
+# The manifest and its BM25/MinHash files are written every this many upsert
+# batches and once the run ends, not after every batch
+INGEST_CHECKPOINT_BATCHES = 50
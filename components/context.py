@@ -0,0 +1,351 @@
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from pydantic import ConfigDict
+
+from components.bm25 import load_index, reciprocal_rank_fusion
+from components.metrics import registry, span
+from components.router import PartitionRouter
+from components.config import (
+    CONTEXT_ANSWER_RESERVE,
+    CONTEXT_CHARS_PER_TOKEN,
+    CONTEXT_DUPLICATE_THRESHOLD,
+    CONTEXT_FETCH_K,
+    CONTEXT_MMR_LAMBDA,
+    CONTEXT_TEMPLATE_OVERHEAD,
+    HYBRID_LEXICAL_K,
+    HYBRID_RRF_K,
+    MEDLLAMA_NUM_CTX,
+    MEDLLAMA_SYSTEM_PROMPT,
+    QA_SEARCH_K,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, slightly pessimistic token estimate for Llama-style tokenizers."""
+    return math.ceil(len(text) / CONTEXT_CHARS_PER_TOKEN) if text else 0
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def pack_documents(
+    query_vector: np.ndarray,
+    docs: List[Document],
+    doc_vectors: np.ndarray,
+    token_budget: int,
+    max_docs: int = QA_SEARCH_K,
+    mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+    duplicate_threshold: float = CONTEXT_DUPLICATE_THRESHOLD,
+    relevance: Optional[np.ndarray] = None,
+) -> List[Document]:
+    """Greedy MMR selection of non-duplicate passages that fit ``token_budget``.
+
+    With ``mmr_lambda=1`` this reduces to picking by relevance score, which is
+    the cosine similarity to ``query_vector`` unless ``relevance`` is given.
+    """
+    if not docs:
+        return []
+
+    query_vector = _normalize(np.asarray(query_vector, dtype=np.float32))
+    doc_vectors = _normalize(np.asarray(doc_vectors, dtype=np.float32))
+    if relevance is None:
+        relevance = doc_vectors @ query_vector
+    similarity = doc_vectors @ doc_vectors.T
+    tokens = [estimate_tokens(doc.page_content) for doc in docs]
+
+    selected: List[int] = []
+    remaining = set(range(len(docs)))
+    used = 0
+
+    while remaining and len(selected) < max_docs:
+        best, best_score = None, -np.inf
+        for i in list(remaining):
+            redundancy = max((similarity[i, j] for j in selected), default=0.0)
+            if redundancy >= duplicate_threshold or used + tokens[i] > token_budget:
+                remaining.discard(i)
+                continue
+            score = mmr_lambda * relevance[i] - (1 - mmr_lambda) * redundancy
+            if score > best_score:
+                best, best_score = i, score
+        if best is None:
+            break
+        selected.append(best)
+        remaining.discard(best)
+        used += tokens[best]
+
+    return [docs[i] for i in selected]
+
+
+def _is_chunk(doc: Document) -> bool:
+    return "parent_id" in doc.metadata and "chunk" in doc.metadata
+
+
+def collapse_neighbours(docs: List[Document]) -> List[Document]:
+    """Merge chunks that are adjacent in the same parent document.
+
+    Runs of consecutive chunks (by ``parent_id`` and ``chunk`` metadata) become
+    one passage without the repeated overlap or title line, placed at the rank
+    of its best chunk. Documents without chunk metadata pass through.
+    """
+    rank = {id(doc): i for i, doc in enumerate(docs)}
+    chunked = sorted(
+        filter(_is_chunk, docs),
+        key=lambda doc: (doc.metadata["parent_id"], doc.metadata["chunk"]),
+    )
+    groups = [[doc] for doc in docs if not _is_chunk(doc)]
+    previous: Optional[Document] = None
+    for doc in chunked:
+        if (
+            previous is not None
+            and doc.metadata["parent_id"] == previous.metadata["parent_id"]
+            and doc.metadata["chunk"] == previous.metadata["chunk"] + 1
+        ):
+            groups[-1].append(doc)
+        else:
+            groups.append([doc])
+        previous = doc
+    groups.sort(key=lambda group: min(rank[id(doc)] for doc in group))
+    return [_merge_chunks(group) for group in groups]
+
+
+def _merge_chunks(group: List[Document]) -> Document:
+    if len(group) == 1:
+        return group[0]
+    text = group[0].page_content
+    for doc in group[1:]:
+        overlap = doc.metadata.get("overlap", 0)
+        body = doc.page_content.split("\n", 1)[-1]
+        text += (" " if overlap else "\n") + body[overlap:]
+    metadata = {**group[0].metadata, "chunk_end": group[-1].metadata["chunk"]}
+    return Document(page_content=text, metadata=metadata)
+
+
+class ContextPackingRetriever(BaseRetriever):
+    """Retriever that packs the best passages into the LLM's context budget.
+
+    Fetches ``fetch_k`` candidates, drops near-duplicates and selects by MMR
+    until the token budget (context window minus the answer reserve, system
+    prompt, template and question) is used up. Selected neighbouring chunks of
+    one document are then collapsed into a single passage. With a
+    ``partition_router`` candidates come only from the source partitions the
+    query is routed to, each searched with its own k and merged by distance.
+    Candidate embeddings are read back from the store rather than recomputed.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: VectorStore
+    embeddings: Embeddings
+    fetch_k: int = CONTEXT_FETCH_K
+    max_docs: int = QA_SEARCH_K
+    mmr_lambda: float = CONTEXT_MMR_LAMBDA
+    duplicate_threshold: float = CONTEXT_DUPLICATE_THRESHOLD
+    num_ctx: int = MEDLLAMA_NUM_CTX
+    answer_reserve: int = CONTEXT_ANSWER_RESERVE
+    system_prompt: str = MEDLLAMA_SYSTEM_PROMPT
+    partition_router: Optional[PartitionRouter] = None
+
+    def token_budget(self, query: str, history_tokens: int = 0) -> int:
+        """Tokens left for passages; ``history_tokens`` is kept for conversation history."""
+        return max(
+            0,
+            self.num_ctx
+            - self.answer_reserve
+            - estimate_tokens(self.system_prompt)
+            - estimate_tokens(query)
+            - CONTEXT_TEMPLATE_OVERHEAD
+            - history_tokens,
+        )
+
+    def _partitions(self, query_vector: List[float]) -> Optional[Dict[str, int]]:
+        if self.partition_router is None:
+            return None
+        partitions = self.partition_router.route(query_vector, self.fetch_k)
+        for partition in partitions:
+            registry.inc("retrieval_partition_searches_total", partition=partition)
+        return partitions
+
+    def _query(
+        self, query_vector: List[float], k: int, where: Optional[Dict] = None
+    ) -> List[Tuple[Document, float]]:
+        """The ``k`` nearest passages matching ``where``, with their distances.
+
+        A Chroma collection is queried directly, so the passages keep their
+        IDs and ``_vectors`` can read their stored embeddings back.
+        """
+        collection = getattr(self.vectorstore, "_collection", None)
+        if collection is None:
+            if where is None:
+                docs = self.vectorstore.similarity_search_by_vector(query_vector, k=k)
+                return [(doc, 0.0) for doc in docs]
+            return self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+                query_vector, k=k, filter=where
+            )
+        found = collection.query(
+            query_embeddings=[query_vector],
+            n_results=k,
+            where=where,
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            (Document(id=doc_id, page_content=text, metadata=metadata or {}), distance)
+            for doc_id, text, metadata, distance in zip(
+                found["ids"][0],
+                found["documents"][0],
+                found["metadatas"][0],
+                found["distances"][0],
+            )
+        ]
+
+    def _vector_search(
+        self, query_vector: List[float], partitions: Optional[Dict[str, int]]
+    ) -> List[Document]:
+        if partitions is None:
+            with span("vector_search", k=self.fetch_k):
+                return [doc for doc, _ in self._query(query_vector, self.fetch_k)]
+        with span(
+            "vector_search",
+            k=sum(partitions.values()),
+            partitions=",".join(partitions),
+        ):
+            scored = []
+            for partition, k in partitions.items():
+                scored += self._query(query_vector, k, {"partition": partition})
+            scored.sort(key=lambda pair: pair[1])
+            return [doc for doc, _ in scored]
+
+    def _vectors(self, docs: List[Document]) -> np.ndarray:
+        """Embeddings of ``docs``, read from the store for those with an ID.
+
+        Only passages the store did not return an embedding for are embedded.
+        """
+        ids = [doc.id for doc in docs if doc.id]
+        stored: Dict[str, Any] = {}
+        if ids:
+            found = self.vectorstore.get(ids=ids, include=["embeddings"])
+            stored = dict(zip(found["ids"], found["embeddings"]))
+        missing = [doc.page_content for doc in docs if doc.id not in stored]
+        embedded = iter(self.embeddings.embed_documents(missing) if missing else [])
+        return np.array(
+            [stored[doc.id] if doc.id in stored else next(embedded) for doc in docs],
+            dtype=np.float32,
+        )
+
+    def _candidates(
+        self, query: str, query_vector: List[float]
+    ) -> Tuple[List[Document], Optional[np.ndarray]]:
+        """Candidate passages and their relevance (``None``: cosine to the query)."""
+        return self._vector_search(query_vector, self._partitions(query_vector)), None
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: Optional[CallbackManagerForRetrieverRun] = None,
+        history_tokens: int = 0,
+        **kwargs: Any,
+    ) -> List[Document]:
+        with span("embed_query"):
+            query_vector = self.embeddings.embed_query(query)
+        candidates, relevance = self._candidates(query, query_vector)
+        if not candidates:
+            return []
+
+        with span("pack_context") as packing:
+            doc_vectors = self._vectors(candidates)
+            budget = self.token_budget(query, history_tokens)
+            packed = pack_documents(
+                np.asarray(query_vector),
+                candidates,
+                doc_vectors,
+                budget,
+                max_docs=self.max_docs,
+                mmr_lambda=self.mmr_lambda,
+                duplicate_threshold=self.duplicate_threshold,
+                relevance=relevance,
+            )
+            packed = collapse_neighbours(packed)
+            used = sum(estimate_tokens(doc.page_content) for doc in packed)
+            packing.set(candidates=len(candidates), packed=len(packed), tokens=used)
+
+        logger.info(
+            f"Packed {len(packed)}/{len(candidates)} passages into context: "
+            f"~{used}/{budget} tokens"
+        )
+        return packed
+
+
+def _passage_key(doc: Document) -> Tuple[str, str]:
+    return doc.metadata.get("source", ""), doc.page_content
+
+
+class HybridRetriever(ContextPackingRetriever):
+    """``ContextPackingRetriever`` whose candidates mix BM25 and vector search.
+
+    Rare tokens such as drug names embed poorly but are exact BM25 matches, so
+    the BM25 top ``lexical_k`` (read from ``lexical_path``) and the vector top
+    ``fetch_k`` are fused by reciprocal rank. The fused score replaces cosine
+    similarity as the relevance used for packing.
+    """
+
+    lexical_path: str
+    lexical_k: int = HYBRID_LEXICAL_K
+    rrf_k: int = HYBRID_RRF_K
+
+    def _lexical_documents(
+        self, doc_ids: List[str], partitions: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Document]:
+        # BM25 covers every partition, so drop hits outside the routed ones
+        kwargs = (
+            {"where": {"partition": {"$in": list(partitions)}}} if partitions else {}
+        )
+        found = self.vectorstore.get(
+            ids=doc_ids, include=["documents", "metadatas"], **kwargs
+        )
+        return {
+            doc_id: Document(id=doc_id, page_content=text, metadata=metadata or {})
+            for doc_id, text, metadata in zip(
+                found["ids"], found["documents"], found["metadatas"]
+            )
+        }
+
+    def _candidates(
+        self, query: str, query_vector: List[float]
+    ) -> Tuple[List[Document], Optional[np.ndarray]]:
+        partitions = self._partitions(query_vector)
+        vector_docs = self._vector_search(query_vector, partitions)
+        with span("lexical_search", k=self.lexical_k) as lexical:
+            hits = load_index(self.lexical_path).search(query, self.lexical_k)
+            by_id = (
+                self._lexical_documents([doc_id for doc_id, _ in hits], partitions)
+                if hits
+                else {}
+            )
+            lexical_docs = [by_id[doc_id] for doc_id, _ in hits if doc_id in by_id]
+            lexical.set(hits=len(lexical_docs))
+
+        passages = {_passage_key(doc): doc for doc in lexical_docs + vector_docs}
+        # Lexical ranking first, so ties go to exact term matches
+        fused = reciprocal_rank_fusion(
+            [
+                [_passage_key(doc) for doc in lexical_docs],
+                [_passage_key(doc) for doc in vector_docs],
+            ],
+            k=self.rrf_k,
+        )
+        if not fused:
+            return [], None
+        scores = np.array([score for _, score in fused], dtype=np.float32)
+        return [passages[key] for key, _ in fused], scores / scores.max()
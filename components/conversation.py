@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from components.config import (
+    CONVERSATION_MAX_SESSIONS,
+    CONVERSATION_MAX_TURNS,
+    CONVERSATION_TTL,
+)
+from components.context import estimate_tokens
+
+
+@dataclass
+class Turn:
+    question: str
+    answer: str
+
+
+@dataclass
+class Conversation:
+    """One chat session: its turns plus Ollama's token state per model.
+
+    ``contexts`` holds the ``context`` array returned by Ollama's last
+    generation for each model. Sending it back with the next prompt continues
+    from the cached KV state, so only the new prompt is prefilled.
+    """
+
+    session_id: str
+    turns: List[Turn] = field(default_factory=list)
+    contexts: Dict[str, List[int]] = field(default_factory=dict)
+    last_used: float = field(default_factory=time.monotonic)
+
+    def add_turn(self, question: str, answer: str, model: Optional[str] = None) -> None:
+        """Record a turn answered by ``model``.
+
+        Other models' token state no longer covers the whole conversation, so
+        it is dropped; their next prompt carries the history as text instead.
+        """
+        self.turns.append(Turn(question, answer))
+        del self.turns[:-CONVERSATION_MAX_TURNS]
+        self.contexts = {m: c for m, c in self.contexts.items() if m == model}
+
+    def last_question(self) -> Optional[str]:
+        return self.turns[-1].question if self.turns else None
+
+    def history(self, token_budget: int) -> str:
+        """The most recent turns that fit in ``token_budget``, oldest first."""
+        lines: List[str] = []
+        used = estimate_tokens("Previous conversation:")
+        for turn in reversed(self.turns):
+            block = f"User: {turn.question}\nAssistant: {turn.answer}"
+            used += estimate_tokens(block)
+            if used > token_budget:
+                break
+            lines.insert(0, block)
+        return "Previous conversation:\n" + "\n".join(lines) if lines else ""
+
+
+class ConversationStore:
+    """Per-session conversations, dropped after ``ttl`` idle seconds or LRU."""
+
+    def __init__(
+        self,
+        ttl: float = CONVERSATION_TTL,
+        max_sessions: int = CONVERSATION_MAX_SESSIONS,
+    ):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.ttl
+        for key in [k for k, c in self._sessions.items() if c.last_used < cutoff]:
+            del self._sessions[key]
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def get(self, session_id: str) -> Conversation:
+        now = time.monotonic()
+        with self._lock:
+            conversation = self._sessions.get(session_id)
+            if conversation is None:
+                conversation = self._sessions[session_id] = Conversation(session_id)
+            self._sessions.move_to_end(session_id)
+            conversation.last_used = now
+            self._evict(now)
+            return conversation
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+conversations = ConversationStore()
@@ -0,0 +1,313 @@
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from components.metrics import registry
+from components.config import (
+    CRAWLER_BACKOFF_BASE,
+    CRAWLER_BACKOFF_MAX,
+    CRAWLER_BREAKER_COOLDOWN,
+    CRAWLER_BREAKER_THRESHOLD,
+    CRAWLER_DEFAULT_RATE_LIMIT,
+    CRAWLER_HOST_RATE_LIMITS,
+    CRAWLER_MAX_IN_FLIGHT,
+    CRAWLER_MAX_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RetryableFetchError(Exception):
+    """Raised by a fetch function for failures worth retrying (timeouts, 429, 5xx)."""
+
+
+class BlockedFetchError(Exception):
+    """Raised by a fetch function when the host refused the page (e.g. HTTP 403).
+
+    The refusal is reported to the circuit breaker, which stops sending plain
+    requests to a host that keeps refusing them. The page itself is still
+    retried through the engine's fallback, if it has one.
+    """
+
+
+class HostRateLimiter:
+    """Spaces out requests per host so no host sees more than its configured rate."""
+
+    def __init__(
+        self,
+        rates: Optional[Dict[str, float]] = None,
+        default_rate: float = CRAWLER_DEFAULT_RATE_LIMIT,
+    ):
+        self.rates = dict(CRAWLER_HOST_RATE_LIMITS if rates is None else rates)
+        self.default_rate = default_rate
+        self._next_slot: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str) -> None:
+        host = urlparse(url).netloc
+        rate = self.rates.get(host, self.default_rate)
+        if rate <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot[host])
+            self._next_slot[host] = slot + 1.0 / rate
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class HostCircuitBreaker:
+    """Stops requests to hosts that keep blocking us.
+
+    After ``threshold`` consecutive blocked fetches a host's circuit opens and
+    its URLs are skipped for ``cooldown`` seconds. Then a single probe request
+    is let through: success closes the circuit, another block reopens it.
+    """
+
+    def __init__(
+        self,
+        threshold: int = CRAWLER_BREAKER_THRESHOLD,
+        cooldown: float = CRAWLER_BREAKER_COOLDOWN,
+    ):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._blocked: Dict[str, int] = defaultdict(int)
+        self._open_until: Dict[str, float] = {}
+        self._probing: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def allow(self, url: str) -> bool:
+        host = urlparse(url).netloc
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return True
+            if time.monotonic() < open_until or host in self._probing:
+                return False
+            self._probing.add(host)
+            return True
+
+    def record(self, url: str, blocked: bool) -> None:
+        host = urlparse(url).netloc
+        with self._lock:
+            self._probing.discard(host)
+            if not blocked:
+                self._blocked.pop(host, None)
+                if self._open_until.pop(host, None) is not None:
+                    logger.info(f"Circuit closed for {host}")
+                return
+            self._blocked[host] += 1
+            if host in self._open_until or self._blocked[host] >= self.threshold:
+                self._open_until[host] = time.monotonic() + self.cooldown
+                registry.inc("circuit_open_total", host=host)
+                logger.warning(
+                    f"Circuit open for {host} after {self._blocked[host]} blocked "
+                    f"fetches, skipping it for {self.cooldown:.0f}s"
+                )
+
+    def release(self, url: str) -> None:
+        """End a probe that was neither blocked nor successful (e.g. a timeout)."""
+        with self._lock:
+            self._probing.discard(urlparse(url).netloc)
+
+
+@dataclass
+class FetchStats:
+    """Per-source crawl counters, updated from the engine's worker threads."""
+
+    source: str
+    fetched: int = 0
+    failed: int = 0
+    blocked: int = 0
+    skipped: int = 0
+    cached: int = 0
+    rescued: int = 0
+    retries: int = 0
+    bytes: int = 0
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.fetched / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.source}: {self.fetched} fetched "
+            f"({self.cached} from cache, {self.rescued} via fallback), "
+            f"{self.failed} failed "
+            f"({self.blocked} blocked, {self.skipped} skipped), "
+            f"{self.retries} retries in {self.elapsed:.1f}s "
+            f"({self.pages_per_second:.2f} pages/s, {self.bytes / 1024:.0f} KiB)"
+        )
+
+
+class CrawlerEngine:
+    """Bounded thread-pool fetcher with per-host rate limits, retries and stats.
+
+    Every URL passed to ``fetch_all`` is fetched at most once per engine, and at
+    most ``max_in_flight`` requests are outstanding at any time. Hosts whose
+    pages keep raising ``BlockedFetchError`` are skipped while their circuit is
+    open, fallback included, so a blocking host is not crawled through a
+    browser at full rate. Blocked URLs, the half-open probe among them, are
+    retried through ``fallback`` (e.g. a browser session) if one is set; they
+    only count as blocked when the fallback fails too.
+    URLs that ``cached`` returns a body for are served without a request or
+    rate-limit wait. URLs that could not be fetched (failed, blocked or
+    skipped) are collected in ``failed``. ``fetch_seconds`` only ever times
+    the plain ``fetch``.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Optional[str]],
+        max_in_flight: int = CRAWLER_MAX_IN_FLIGHT,
+        max_retries: int = CRAWLER_MAX_RETRIES,
+        backoff_base: float = CRAWLER_BACKOFF_BASE,
+        backoff_max: float = CRAWLER_BACKOFF_MAX,
+        rate_limiter: Optional[HostRateLimiter] = None,
+        breaker: Optional[HostCircuitBreaker] = None,
+        cached: Optional[Callable[[str], Optional[str]]] = None,
+        fallback: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        self.fetch = fetch
+        self.cached = cached
+        self.fallback = fallback
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.breaker = breaker or HostCircuitBreaker()
+        self.stats: Dict[str, FetchStats] = {}
+        self.failed: Set[str] = set()
+        self._seen: Set[str] = set()
+        self._seen_lock = threading.Lock()
+
+    def _claim(self, url: str) -> bool:
+        with self._seen_lock:
+            if url in self._seen:
+                return False
+            self._seen.add(url)
+            return True
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2**attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _fetch_with_retry(self, url: str, stats: FetchStats) -> Optional[str]:
+        body = self.cached(url) if self.cached else None
+        if body is not None:
+            stats.add(cached=1)
+            return body
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow(url):
+                stats.add(skipped=1)
+                return None
+            self.rate_limiter.acquire(url)
+            started = time.perf_counter()
+            try:
+                body = self.fetch(url)
+                registry.observe(
+                    "fetch_seconds", time.perf_counter() - started, source=stats.source
+                )
+                self.breaker.record(url, blocked=False)
+                return body
+            except BlockedFetchError as e:
+                self.breaker.record(url, blocked=True)
+                return self._rescue(url, stats, e)
+            except RetryableFetchError as e:
+                self.breaker.release(url)
+                if attempt == self.max_retries:
+                    logger.error(
+                        f"Giving up on {url} after {attempt + 1} attempts: {e}"
+                    )
+                    return None
+                stats.add(retries=1)
+                delay = self._backoff(attempt)
+                logger.warning(f"Retrying {url} in {delay:.2f}s: {e}")
+                time.sleep(delay)
+            except Exception as e:
+                self.breaker.release(url)
+                logger.error(f"Error fetching {url}: {str(e)}")
+                return None
+        return None
+
+    def _rescue(self, url: str, stats: FetchStats, error: Exception) -> Optional[str]:
+        """Fetch a blocked URL through ``fallback``; count it blocked if that fails."""
+        if self.fallback is not None:
+            try:
+                body = self.fallback(url)
+            except Exception as e:
+                error = e
+            else:
+                stats.add(rescued=1)
+                return body
+        stats.add(blocked=1)
+        logger.error(f"Blocked fetching {url}: {error}")
+        return None
+
+    def fetch_all(
+        self, urls: Iterable[str], source: str
+    ) -> Iterator[Tuple[str, Optional[str]]]:
+        """Yield ``(url, body)`` pairs in completion order; body is None on failure."""
+        stats = self.stats.setdefault(source, FetchStats(source))
+        stats.finished = None
+        pending: Dict[Future, str] = {}
+        url_iter = iter(urls)
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_in_flight, thread_name_prefix=f"crawl-{source}"
+        ) as pool:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < self.max_in_flight:
+                    url = next(url_iter, None)
+                    if url is None:
+                        exhausted = True
+                        break
+                    if self._claim(url):
+                        pending[pool.submit(self._fetch_with_retry, url, stats)] = url
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    body = future.result()
+                    registry.inc(
+                        "fetch_total",
+                        source=source,
+                        status="failed" if body is None else "ok",
+                    )
+                    if body is None:
+                        stats.add(failed=1)
+                        self.failed.add(url)
+                    else:
+                        stats.add(fetched=1, bytes=len(body))
+                    yield url, body
+
+        stats.finished = time.monotonic()
+        logger.info(f"Crawl throughput - {stats.summary()}")
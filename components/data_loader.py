@@ -1,17 +1,32 @@
 import logging
-from typing import Dict, List, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
 from dataclasses import dataclass
 from functools import wraps
+from urllib.parse import urlparse
 
 import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
 
+from components.browser import BrowserPool
+from components.chunking import Section
+from components.crawler import BlockedFetchError, CrawlerEngine, RetryableFetchError
+from components.http_cache import HttpCache
+from components.metrics import registry
+from components.parsing import (
+    Page,
+    article,
+    format_text,
+    parse_article,
+    parse_drug_links,
+    parse_pages,
+)
+from components.pubmed import PubMedClient, PubMedRecord
 from components.config import (
     USER_AGENT,
     REQUEST_TIMEOUT,
-    PUBMED_PARAMS,
-    PUBMED_SEARCH_URL,
+    CRAWLER_RETRY_STATUS_CODES,
+    HTTP_CACHE_MODE,
+    HTTP_CACHE_PATH,
     PUBMED_URL_ARTICLE,
     DRUGS_BASE_URL,
     DRUGS_URL,
@@ -28,50 +43,109 @@ class Article:
 
 
 class WebScraper:
-    def __init__(self):
+    def __init__(
+        self,
+        browsers: Optional[BrowserPool] = None,
+        cache: Optional[HttpCache] = None,
+    ):
         self.session = requests.Session()
         self.session.headers.update(USER_AGENT)
-        self._driver = None
+        self.browsers = browsers or BrowserPool()
+        self._cache = cache
 
     @property
-    def driver(self):
-        if not self._driver:
-            options = webdriver.ChromeOptions()
-            options.add_argument("--headless")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-
-            self._driver = webdriver.Remote(
-                command_executor="http://selenium:4444/wd/hub", options=options
+    def cache(self) -> Optional[HttpCache]:
+        if self._cache is None and HTTP_CACHE_MODE != "off":
+            self._cache = HttpCache(HTTP_CACHE_PATH)
+        return self._cache
+
+    def close(self) -> None:
+        self.browsers.close()
+        if self._cache is not None:
+            self._cache.close()
+
+    def cached(self, url: str) -> Optional[str]:
+        """Cached page for ``url`` if it can be served without a request."""
+        cache = self.cache
+        cached = cache.fresh(url) if cache is not None else None
+        if cached is None:
+            return None
+        registry.inc("http_cache_total", result="hit")
+        return cached.body
+
+    def _fetch(self, url: str) -> Optional[str]:
+        cache = self.cache
+        cached = cache.get(url) if cache is not None else None
+        if cache is not None and cache.offline:
+            registry.inc("http_cache_total", result="hit" if cached else "miss")
+            return cached.body if cached else None
+
+        try:
+            response = self.session.get(
+                url,
+                timeout=REQUEST_TIMEOUT,
+                headers=cached.validators() if cached else None,
             )
-        return self._driver
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryableFetchError(str(e)) from e
 
-    def __del__(self):
-        if self._driver:
-            self._driver.quit()
+        if response.status_code == 304 and cached:
+            registry.inc("http_cache_total", result="revalidated")
+            cache.touch(url)
+            return cached.body
+        if response.status_code in CRAWLER_RETRY_STATUS_CODES:
+            raise RetryableFetchError(f"HTTP {response.status_code}")
+        if response.status_code == 403:
+            registry.inc("fetch_blocked_total", host=urlparse(url).netloc)
+            raise BlockedFetchError("HTTP 403")
+        if response.status_code != 200:
+            return None
+        if cache is not None:
+            registry.inc("http_cache_total", result="miss")
+            cache.put(
+                url,
+                response.text,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+            )
+        return response.text
+
+    def _fallback(self, url: str) -> Optional[str]:
+        """Render a page the host refused to plain requests in a browser session."""
+        try:
+            body = self.browsers.fetch(url)
+        except Exception as e:
+            raise BlockedFetchError(
+                f"HTTP 403, browser fallback failed: {str(e)}"
+            ) from e
+        cache = self.cache
+        if cache is not None:
+            cache.put(url, body)
+        return body
 
     def fetch_content(self, url: str) -> Optional[str]:
         try:
-            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
-            if response.status_code == 403:
-                self.driver.get(url)
-                return self.driver.page_source
-            return response.text if response.status_code == 200 else None
+            try:
+                return self.cached(url) or self._fetch(url)
+            except BlockedFetchError:
+                return self._fallback(url)
         except Exception as e:
             logger.error(f"Error fetching {url}: {str(e)}")
             return None
 
-    def parse_article(self, html: str, url: str) -> Dict[str, str]:
-        soup = BeautifulSoup(html, "html.parser")
-        return {"text": self._extract_text(soup), "metadata": {"source": url}}
+    def parse_article(self, html: str, url: str) -> Dict[str, Any]:
+        """Article document: full ``text`` plus ``title`` and ``sections`` for chunking."""
+        return parse_article(html, url)
 
-    def _extract_text(self, soup: BeautifulSoup) -> str:
-        title = soup.find("h1")
-        content = soup.find("div", class_=["abstract-content", "ddc-main-content"])
-        return (
-            f"Title: {title.get_text(strip=True) if title else 'No title'}\n"
-            f"Content: {content.get_text(strip=True)[:500] + '...' if content else 'No content'}"
-        )
+    @staticmethod
+    def article(
+        title: Optional[str], sections: List[Section], url: str
+    ) -> Dict[str, Any]:
+        return article(title, sections, url)
+
+    @staticmethod
+    def format_text(title: Optional[str], content: Optional[str]) -> str:
+        return format_text(title, content)
 
 
 def handle_exceptions(func):
@@ -89,50 +163,102 @@ def handle_exceptions(func):
 class MedicalDataFetcher:
     def __init__(self):
         self.scraper = WebScraper()
+        self.engine = CrawlerEngine(
+            self.scraper._fetch,
+            cached=self.scraper.cached,
+            fallback=self.scraper._fallback,
+        )
+        self.pubmed = PubMedClient(self.scraper.session)
+        self.parse_failed: Set[str] = set()
+        self.source_failed: Set[str] = set()
 
-    @handle_exceptions
-    def fetch_pubmed(self) -> List[Dict[str, str]]:
-        search_url = PUBMED_SEARCH_URL
-        params = PUBMED_PARAMS
+    @property
+    def failed(self) -> Set[str]:
+        """Source URLs whose documents could not be fetched or parsed in this run.
+
+        A failed PubMed batch cannot be traced back to its articles, so it
+        marks the whole PubMed host (``PUBMED_URL_ARTICLE``) as failed. So
+        does a source whose iterator raised part way through.
+        """
+        failed = self.engine.failed | self.parse_failed | self.source_failed
+        if self.pubmed.engine.failed:
+            failed.add(PUBMED_URL_ARTICLE)
+        return failed
+
+    def _iter_pages(self, urls: Iterable[str], source: str) -> Iterator[Page]:
+        for url, html in self.engine.fetch_all(urls, source):
+            if html:
+                yield Page(url, html)
+
+    def _pubmed_document(self, record: PubMedRecord) -> Dict[str, Any]:
+        return self.scraper.article(
+            record.title, record.sections, f"{PUBMED_URL_ARTICLE}{record.pmid}/"
+        )
+
+    @contextmanager
+    def _source(self, root: str) -> Iterator[None]:
+        """Log an error fetching from ``root`` and keep its indexed documents."""
+        try:
+            yield
+        except Exception as e:
+            logger.error(f"Error fetching {root}: {str(e)}")
+            self.source_failed.add(root)
+
+    def iter_pubmed(self) -> Iterator[Dict[str, str]]:
+        with self._source(PUBMED_URL_ARTICLE):
+            for record in self.pubmed.iter_articles():
+                if record.abstract:
+                    yield self._pubmed_document(record)
 
-        response = self.scraper.session.get(search_url, params=params)
-        ids = response.json().get("esearchresult", {}).get("idlist", [])
+    def iter_drug_pages(self) -> Iterator[Page]:
+        """Fetched Drugs.com monographs, left for the parse stage."""
+        root = f"{DRUGS_URL}/"
+        with self._source(root):
+            html = self.scraper.fetch_content(DRUGS_BASE_URL)
+            if not html:
+                self.source_failed.add(root)
+                return
 
-        return [
-            self.scraper.parse_article(
-                self.scraper.fetch_content(f"{PUBMED_URL_ARTICLE}{id}/"),
-                f"{PUBMED_URL_ARTICLE}{id}/",
+            yield from self._iter_pages(
+                (f"{DRUGS_URL}{href}" for href in parse_drug_links(html)), "drugs"
             )
-            for id in ids
-            if (html := self.scraper.fetch_content(f"{PUBMED_URL_ARTICLE}{id}/"))
-        ]
 
-    @handle_exceptions
-    def fetch_drugs(self) -> List[Dict[str, str]]:
-        base_url = DRUGS_BASE_URL
-        html = self.scraper.fetch_content(base_url)
-        if not html:
-            return []
+    def iter_drugs(self) -> Iterator[Dict[str, str]]:
+        return parse_pages(self.iter_drug_pages(), failed=self.parse_failed)
 
-        soup = BeautifulSoup(html, "html.parser")
-        links = soup.find("ul", class_="ddc-list-column-4").find_all("a", href=True)
+    def fetch_pubmed(self) -> List[Dict[str, str]]:
+        return list(self.iter_pubmed())
 
-        results = []
-        for link in links:
-            url = f"{DRUGS_URL}{link['href']}"
-            if content := self.scraper.fetch_content(url):
-                results.append(self.scraper.parse_article(content, url))
+    def fetch_drugs(self) -> List[Dict[str, str]]:
+        return list(self.iter_drugs())
 
-        return results
 
+def iter_medical_data(
+    parse: bool = True, failed: Optional[Set[str]] = None
+) -> Iterator[Any]:
+    """PubMed and Drugs.com documents.
 
-def fetch_medical_data() -> List[Dict[str, str]]:
+    With ``parse=False`` Drugs.com pages are yielded as unparsed ``Page``
+    items, for a pipeline that parses them in its own stage. URLs that could
+    not be fetched are added to ``failed`` once the iterator is exhausted.
+    """
     logger.info("Fetching medical data")
     fetcher = MedicalDataFetcher()
-    data = []
+    total = 0
+
+    drugs = fetcher.iter_drugs if parse else fetcher.iter_drug_pages
+    try:
+        for iter_func in [fetcher.iter_pubmed, drugs]:
+            for document in iter_func():
+                total += 1
+                yield document
+    finally:
+        fetcher.scraper.close()
+        if failed is not None:
+            failed.update(fetcher.failed)
+
+    logger.info(f"Total documents fetched: {total}")
 
-    for fetch_func in [fetcher.fetch_pubmed, fetcher.fetch_drugs]:
-        data.extend(fetch_func())
 
-    logger.info(f"Total documents fetched: {len(data)}")
-    return data
+def fetch_medical_data(failed: Optional[Set[str]] = None) -> List[Dict[str, str]]:
+    return list(iter_medical_data(failed=failed))
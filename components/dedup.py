@@ -0,0 +1,205 @@
+import io
+import json
+import os
+import threading
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from components.bm25 import tokenize
+from components.config import (
+    DEDUP_BANDS,
+    DEDUP_MIN_SHINGLES,
+    DEDUP_NUM_PERM,
+    DEDUP_SEED,
+    DEDUP_SHINGLE_SIZE,
+    DEDUP_THRESHOLD,
+)
+
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+class MinHashIndex:
+    """MinHash signatures of indexed texts, banded into an LSH table.
+
+    Each text is reduced to ``num_perm`` 32-bit minimum hashes of its word
+    shingles. Signatures are split into ``bands`` bands; texts sharing any
+    band are candidates, and a candidate whose estimated Jaccard similarity
+    reaches ``threshold`` is a near-duplicate. Lookups therefore only compare
+    against the few texts in the same buckets, not the whole corpus.
+    ``dirty`` is set by changes until the next save, so unchanged signatures
+    are not rewritten. A lock guards the index, so the ingestion pipeline can
+    add signatures in one thread while another checkpoints them.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = DEDUP_NUM_PERM,
+        bands: int = DEDUP_BANDS,
+        threshold: float = DEDUP_THRESHOLD,
+        shingle_size: int = DEDUP_SHINGLE_SIZE,
+        seed: int = DEDUP_SEED,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # a, b < 2**32 keep a * x + b within uint64 for 32-bit x
+        self._a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+        self.doc_ids: List[Optional[str]] = []
+        self.signatures: List[np.ndarray] = []
+        self._positions: Dict[str, int] = {}
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._positions)
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._positions
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash of ``text``; ``None`` if it is too short to compare reliably."""
+        words = tokenize(text)
+        count = len(words) - self.shingle_size + 1
+        if count < DEDUP_MIN_SHINGLES:
+            return None
+        shingles = {
+            zlib.crc32(" ".join(words[i : i + self.shingle_size]).encode("utf-8"))
+            for i in range(count)
+        }
+        hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+        return (permuted.min(axis=1) & _MAX_HASH).astype(np.uint32)
+
+    def _keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self.rows : (band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def query(
+        self, signature: np.ndarray, ignore_prefix: Optional[str] = None
+    ) -> Optional[Tuple[str, float]]:
+        """The most similar indexed text at or above ``threshold``, if any.
+
+        Texts whose ID starts with ``ignore_prefix`` are not matched.
+        """
+        with self._lock:
+            return self._query(signature, ignore_prefix)
+
+    def _query(
+        self, signature: np.ndarray, ignore_prefix: Optional[str]
+    ) -> Optional[Tuple[str, float]]:
+        candidates = {
+            position
+            for band, key in enumerate(self._keys(signature))
+            for position in self._buckets[band].get(key, ())
+        }
+        best: Optional[Tuple[str, float]] = None
+        for position in candidates:
+            doc_id = self.doc_ids[position]
+            if ignore_prefix and doc_id.startswith(ignore_prefix):
+                continue
+            similarity = float(np.mean(self.signatures[position] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (doc_id, similarity)
+        return best
+
+    def add(self, doc_id: str, signature: np.ndarray) -> None:
+        with self._lock:
+            self._add(doc_id, signature)
+
+    def _add(self, doc_id: str, signature: np.ndarray) -> None:
+        self._remove([doc_id])
+        position = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.signatures.append(signature)
+        self._positions[doc_id] = position
+        for band, key in enumerate(self._keys(signature)):
+            self._buckets[band].setdefault(key, []).append(position)
+        self.dirty = True
+
+    def remove(self, doc_ids: Sequence[str]) -> None:
+        with self._lock:
+            self._remove(doc_ids)
+
+    def _remove(self, doc_ids: Sequence[str]) -> None:
+        for doc_id in doc_ids:
+            position = self._positions.pop(doc_id, None)
+            if position is None:
+                continue
+            for band, key in enumerate(self._keys(self.signatures[position])):
+                self._buckets[band][key].remove(position)
+            self.doc_ids[position] = None
+            self.dirty = True
+
+    def find_or_add(
+        self, doc_id: str, text: str, ignore_prefix: Optional[str] = None
+    ) -> Optional[str]:
+        """ID of an indexed near-duplicate of ``text``, else index it and return ``None``."""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        with self._lock:
+            self._remove([doc_id])
+            match = self._query(signature, ignore_prefix)
+            if match:
+                return match[0]
+            self._add(doc_id, signature)
+            return None
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            alive = [i for i, doc_id in enumerate(self.doc_ids) if doc_id is not None]
+            signatures = (
+                np.stack([self.signatures[i] for i in alive])
+                if alive
+                else np.zeros((0, self.num_perm), dtype=np.uint32)
+            )
+            header = {
+                "num_perm": self.num_perm,
+                "bands": self.bands,
+                "threshold": self.threshold,
+                "shingle_size": self.shingle_size,
+                "seed": self.seed,
+                "doc_ids": [self.doc_ids[i] for i in alive],
+            }
+            self.dirty = False
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            signatures=signatures,
+            header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+        )
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "MinHashIndex":
+        """Load the signatures at ``path``; an empty index if there are none yet."""
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            header = json.loads(data["header"].tobytes().decode("utf-8"))
+            signatures = data["signatures"]
+        doc_ids = header.pop("doc_ids")
+        index = cls(**header)
+        for doc_id, signature in zip(doc_ids, signatures):
+            index.add(doc_id, signature)
+        index.dirty = False
+        return index
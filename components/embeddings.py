@@ -0,0 +1,224 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from components.config import (
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_DTYPE,
+    EMBEDDING_QUERY_CACHE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def text_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Append-only on-disk vector store: a memory-mapped array plus a SQLite key index.
+
+    Row ``i`` of ``vectors.bin`` holds the vector for the key mapped to ``i``.
+    Rows are allocated from a counter in SQLite inside a ``BEGIN IMMEDIATE``
+    transaction, and the vectors are written while it is held, so several
+    processes can share one store.
+    """
+
+    def __init__(self, directory: str, dtype: str = EMBEDDING_CACHE_DTYPE):
+        os.makedirs(directory, exist_ok=True)
+        self.dtype = np.dtype(dtype)
+        self.vectors_path = os.path.join(directory, f"vectors.{self.dtype.name}.bin")
+        self._db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._lock = threading.Lock()
+        self._mmap: Optional[np.memmap] = None
+        row = self._db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim: Optional[int] = int(row[0]) if row else None
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def _rows(self) -> int:
+        if not self.dim or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (self.dim * self.dtype.itemsize)
+
+    def _allocated(self) -> int:
+        row = self._db.execute("SELECT value FROM meta WHERE name = 'rows'").fetchone()
+        if row:
+            return int(row[0])
+        # Stores written before the counter existed
+        row = self._db.execute("SELECT MAX(row) FROM vectors").fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def _matrix(self, needed_rows: int) -> np.memmap:
+        if self._mmap is None or self._mmap.shape[0] < needed_rows:
+            self._mmap = np.memmap(
+                self.vectors_path,
+                dtype=self.dtype,
+                mode="r",
+                shape=(self._rows(), self.dim),
+            )
+        return self._mmap
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        if not keys or not self.dim:
+            return {}
+        with self._lock:
+            found: Dict[str, int] = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(
+                    self._db.execute(
+                        f"SELECT key, row FROM vectors WHERE key IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                )
+            if not found:
+                return {}
+            matrix = self._matrix(max(found.values()) + 1)
+            return {
+                key: matrix[row].astype(np.float32).tolist()
+                for key, row in found.items()
+            }
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        vectors = np.asarray(list(items.values()), dtype=self.dtype)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT value FROM meta WHERE name = 'dim'"
+                ).fetchone()
+                self.dim = int(row[0]) if row else vectors.shape[1]
+                first_row = self._allocated()
+                # A writer that died before committing may have left rows past
+                # the counter; they are overwritten rather than appended to.
+                mode = "r+b" if os.path.exists(self.vectors_path) else "wb"
+                with open(self.vectors_path, mode) as f:
+                    f.seek(first_row * self.dim * self.dtype.itemsize)
+                    f.write(vectors.tobytes())
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO vectors VALUES (?, ?)",
+                    [(key, first_row + i) for i, key in enumerate(items)],
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                    [("dim", str(self.dim)), ("rows", str(first_row + len(items)))],
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that skips the model for texts it has already seen.
+
+    Document vectors persist on disk keyed by model name + text hash; query
+    vectors are kept in an in-memory LRU.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        cache_dir: str = EMBEDDING_CACHE_DIR,
+        query_cache_size: int = EMBEDDING_QUERY_CACHE_SIZE,
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.query_cache_size = query_cache_size
+        self._store: Optional[EmbeddingStore] = None
+        self._queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def store(self) -> EmbeddingStore:
+        if self._store is None:
+            self._store = EmbeddingStore(
+                os.path.join(self.cache_dir, self.model_name.replace("/", "__"))
+            )
+        return self._store
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_key(self.model_name, text) for text in texts]
+        cached = self.store.get_many(list(set(keys)))
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            self.store.put_many(computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_key(self.model_name, text)
+        with self._query_lock:
+            if key in self._queries:
+                self._queries.move_to_end(key)
+                return self._queries[key]
+
+        vector = self.underlying.embed_query(text)
+
+        with self._query_lock:
+            self._queries[key] = vector
+            if len(self._queries) > self.query_cache_size:
+                self._queries.popitem(last=False)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, computing all LRU misses in one batch.
+
+        Misses go through ``embed_documents`` of the underlying model, which is
+        equivalent to ``embed_query`` for symmetric models such as MiniLM.
+        """
+        keys = [text_key(self.model_name, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        with self._query_lock:
+            for key in keys:
+                if key in self._queries:
+                    self._queries.move_to_end(key)
+                    found[key] = self._queries[key]
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            computed = dict(
+                zip(missing, self.underlying.embed_documents(list(missing.values())))
+            )
+            found.update(computed)
+            with self._query_lock:
+                self._queries.update(computed)
+                while len(self._queries) > self.query_cache_size:
+                    self._queries.popitem(last=False)
+        return [found[key] for key in keys]
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from components.config import HTTP_CACHE_MODE, HTTP_CACHE_PATH, HTTP_CACHE_TTL
+
+CACHE_MODES = ("off", "revalidate", "offline")
+
+
+@dataclass
+class CachedResponse:
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers that let the server answer 304."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """Persistent page cache: zlib-compressed bodies plus validators in SQLite.
+
+    Within ``ttl`` seconds of being fetched or revalidated a page is served
+    without a request; older pages are revalidated with ``If-None-Match`` /
+    ``If-Modified-Since``. In ``offline`` mode only cached pages are served
+    and nothing is requested.
+    """
+
+    def __init__(
+        self,
+        path: str = HTTP_CACHE_PATH,
+        ttl: float = HTTP_CACHE_TTL,
+        mode: str = HTTP_CACHE_MODE,
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"HTTP cache mode must be one of {CACHE_MODES}")
+        self.path = path
+        self.ttl = ttl
+        self.mode = mode
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, "
+            "body BLOB, etag TEXT, last_modified TEXT, fetched_at REAL)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    @property
+    def offline(self) -> bool:
+        return self.mode == "offline"
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses "
+                "WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, fetched_at = row
+        return CachedResponse(
+            zlib.decompress(body).decode("utf-8"), etag, last_modified, fetched_at
+        )
+
+    def fresh(self, url: str) -> Optional[CachedResponse]:
+        """The cached page if it may be served without asking the server."""
+        cached = self.get(url)
+        if cached and (self.offline or cached.age() < self.ttl):
+            return cached
+        return None
+
+    def put(
+        self,
+        url: str,
+        body: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (
+                    url,
+                    zlib.compress(body.encode("utf-8")),
+                    etag,
+                    last_modified,
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+
+    def touch(self, url: str) -> None:
+        """Mark ``url`` as just revalidated (the server answered 304)."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url)
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
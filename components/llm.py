@@ -1,11 +1,25 @@
 import ollama
 import logging
 import re
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 from langchain.llms.base import LLM
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.outputs import GenerationChunk
 
+from components.aio import get_async_client
+from components.context import estimate_tokens
+from components.metrics import record_ollama_stats, registry, span
+from components.conversation import conversations
+from components.scheduler import scheduler
 from components.config import (
+    CONTEXT_ANSWER_RESERVE,
+    CONVERSATION_HISTORY_TOKENS,
     DEFAULT_MODEL_NAME,
+    DEFAULT_NUM_CTX,
     DEFAULT_TEMPERATURE,
     DEFAULT_TOP_P,
     DEESEEK_SYSTEM_PROMPT,
@@ -19,6 +33,88 @@ from components.config import (
 
 logger = logging.getLogger(__name__)
 
+FALLBACK_ANSWER = "I cannot provide an answer at this time."
+
+
+class ThinkTagFilter:
+    """Incremental filter that drops <think>/<thinking>/<thought> blocks.
+
+    Text is fed chunk by chunk; tags split across chunk boundaries are held
+    back until they can be resolved. Blank lines are collapsed and the output
+    is stripped, matching the old regex filter. Unlike that filter, an
+    unclosed block (e.g. a generation cut off mid-thought) is dropped up to
+    the end of the text instead of being kept verbatim, since streamed text
+    cannot be taken back once the close tag never arrives.
+    """
+
+    OPEN_TAGS = ("<think>", "<thinking>", "<thought>")
+    CLOSE_TAGS = ("</think>", "</thinking>", "</thought>")
+    _BLANK_LINES = re.compile(r"\n\s*\n")
+
+    def __init__(self):
+        self._buffer = ""
+        self._inside = False
+        self._started = False
+        self._whitespace = ""
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+
+        text = self._whitespace + text
+        visible = text.rstrip()
+        self._whitespace = text[len(visible) :]
+        return self._BLANK_LINES.sub("\n", visible)
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        output = []
+
+        while self._buffer:
+            if self._inside:
+                ends = [
+                    (idx, tag)
+                    for tag in self.CLOSE_TAGS
+                    if (idx := self._buffer.find(tag)) != -1
+                ]
+                if not ends:
+                    keep = max(len(tag) for tag in self.CLOSE_TAGS) - 1
+                    self._buffer = self._buffer[-keep:]
+                    break
+                idx, tag = min(ends)
+                self._buffer = self._buffer[idx + len(tag) :]
+                self._inside = False
+                continue
+
+            idx = self._buffer.find("<")
+            if idx == -1:
+                output.append(self._buffer)
+                self._buffer = ""
+                break
+
+            output.append(self._buffer[:idx])
+            rest = self._buffer[idx:]
+            tag = next((t for t in self.OPEN_TAGS if rest.startswith(t)), None)
+            if tag:
+                self._buffer = rest[len(tag) :]
+                self._inside = True
+            elif any(t.startswith(rest) for t in self.OPEN_TAGS):
+                self._buffer = rest
+                break
+            else:
+                output.append("<")
+                self._buffer = rest[1:]
+
+        return self._emit("".join(output))
+
+    def flush(self) -> str:
+        tail = "" if self._inside else self._buffer
+        self._buffer = ""
+        return self._emit(tail)
+
 
 class BaseLLM(LLM):
     """Base class for Ollama LLM implementations with response filtering for deepseek :)"""
@@ -29,45 +125,238 @@ class BaseLLM(LLM):
     top_p: float
 
     def _filter_response(self, text: str) -> str:
-        text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL)
+        think_filter = ThinkTagFilter()
+        return think_filter.feed(text) + think_filter.flush()
 
-        text = re.sub(
-            r"<(think|thinking|thought)>.*?</(think|thinking|thought)>",
-            "",
-            text,
-            flags=re.DOTALL,
+    def _options(self, **kwargs: Any) -> Dict[str, Any]:
+        return {
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            **kwargs.get("options", {}),
+        }
+
+    def _log_prompt_size(self, prompt: str) -> None:
+        logger.info(
+            f"{self.__class__.__name__} prompt size: {len(prompt)} chars, "
+            f"~{estimate_tokens(self.system_prompt) + estimate_tokens(prompt)} tokens"
         )
 
-        text = re.sub(r"\n\s*\n", "\n", text)
-        text = text.strip()
+    def _num_ctx(self) -> int:
+        return DEFAULT_NUM_CTX
+
+    def _conversation_request(
+        self, prompt: str, session_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """Prompt (and Ollama ``context``) continuing ``session_id``'s conversation.
+
+        While the session's token state for this model still fits the context
+        window it is sent back as ``context``, so Ollama reuses its KV cache and
+        prefills only the new prompt. Otherwise the state is dropped and the
+        recent turns that fit are prepended to the prompt as plain text.
+        """
+        if not session_id:
+            return {"prompt": prompt}
+        conversation = conversations.get(session_id)
+        needed = (
+            estimate_tokens(self.system_prompt)
+            + estimate_tokens(prompt)
+            + CONTEXT_ANSWER_RESERVE
+        )
+        context = conversation.contexts.get(self.model_name)
+        if context and len(context) + needed <= self._num_ctx():
+            return {"prompt": prompt, "context": context}
 
-        return text
+        if context:
+            registry.inc("conversation_context_resets_total", model=self.model_name)
+        conversation.contexts.pop(self.model_name, None)
+        history = conversation.history(
+            min(CONVERSATION_HISTORY_TOKENS, self._num_ctx() - needed)
+        )
+        return {"prompt": f"{history}\n\n{prompt}" if history else prompt}
+
+    def _remember(self, session_id: Optional[str], response: Any) -> None:
+        if session_id and response.get("context"):
+            conversations.get(session_id).contexts[self.model_name] = list(
+                response["context"]
+            )
 
     def _call(
         self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any
     ) -> str:
+        self._log_prompt_size(prompt)
+        session_id = kwargs.pop("session_id", None)
         try:
-            response: Dict[str, Any] = ollama.generate(
-                model=self.model_name,
-                system=self.system_prompt,
-                prompt=prompt,
-                options={
-                    "temperature": self.temperature,
-                    "top_p": self.top_p,
-                    **kwargs.get("options", {}),
-                },
-            )
+            with (
+                scheduler.slot(self.model_name) as keep_alive,
+                span("ollama_generate", model=self.model_name),
+            ):
+                response: Dict[str, Any] = ollama.generate(
+                    model=self.model_name,
+                    system=self.system_prompt,
+                    options=self._options(**kwargs),
+                    keep_alive=keep_alive,
+                    **self._conversation_request(prompt, session_id),
+                )
+                record_ollama_stats(self.model_name, response)
+                self._remember(session_id, response)
 
             raw_response = response.get("response", "")
             filtered_response = self._filter_response(raw_response)
 
-            return filtered_response or "I cannot provide an answer at this time."
+            return filtered_response or FALLBACK_ANSWER
 
         except Exception as e:
             logger.error(
                 f"Error generating response in {self.__class__.__name__}: {str(e)}"
             )
-            return "I cannot provide an answer at this time."
+            return FALLBACK_ANSWER
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        self._log_prompt_size(prompt)
+        session_id = kwargs.pop("session_id", None)
+        try:
+            async with scheduler.aslot(self.model_name) as keep_alive:
+                with span("ollama_generate", model=self.model_name):
+                    response = await get_async_client().generate(
+                        model=self.model_name,
+                        system=self.system_prompt,
+                        options=self._options(**kwargs),
+                        keep_alive=keep_alive,
+                        **self._conversation_request(prompt, session_id),
+                    )
+                    record_ollama_stats(self.model_name, response)
+                    self._remember(session_id, response)
+
+            filtered_response = self._filter_response(response.get("response", ""))
+            return filtered_response or FALLBACK_ANSWER
+
+        except Exception as e:
+            logger.error(
+                f"Error generating response in {self.__class__.__name__}: {str(e)}"
+            )
+            return FALLBACK_ANSWER
+
+    def _record_first_token(self, started: float) -> float:
+        first_token_at = time.perf_counter()
+        registry.observe(
+            "time_to_first_token_seconds",
+            first_token_at - started,
+            model=self.model_name,
+        )
+        logger.info(
+            f"{self.__class__.__name__} time to first visible token: "
+            f"{(first_token_at - started) * 1000:.0f} ms"
+        )
+        return first_token_at
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        self._log_prompt_size(prompt)
+        session_id = kwargs.pop("session_id", None)
+        think_filter = ThinkTagFilter()
+        started = time.perf_counter()
+        first_token_at: Optional[float] = None
+
+        def emit(text: str) -> Iterator[GenerationChunk]:
+            nonlocal first_token_at
+            if not text:
+                return
+            if first_token_at is None:
+                first_token_at = self._record_first_token(started)
+            chunk = GenerationChunk(text=text)
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+        try:
+            with (
+                scheduler.slot(self.model_name) as keep_alive,
+                span("ollama_stream", model=self.model_name),
+            ):
+                for part in ollama.generate(
+                    model=self.model_name,
+                    system=self.system_prompt,
+                    options=self._options(**kwargs),
+                    keep_alive=keep_alive,
+                    stream=True,
+                    **self._conversation_request(prompt, session_id),
+                ):
+                    yield from emit(think_filter.feed(part.get("response", "")))
+                    if part.get("done"):
+                        record_ollama_stats(self.model_name, part)
+                        self._remember(session_id, part)
+                yield from emit(think_filter.flush())
+
+        except Exception as e:
+            logger.error(
+                f"Error streaming response in {self.__class__.__name__}: {str(e)}"
+            )
+
+        if first_token_at is None:
+            yield from emit(FALLBACK_ANSWER)
+
+    async def _astream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[GenerationChunk]:
+        self._log_prompt_size(prompt)
+        session_id = kwargs.pop("session_id", None)
+        think_filter = ThinkTagFilter()
+        started = time.perf_counter()
+        first_token_at: Optional[float] = None
+
+        async def emit(text: str) -> Optional[GenerationChunk]:
+            nonlocal first_token_at
+            if not text:
+                return None
+            if first_token_at is None:
+                first_token_at = self._record_first_token(started)
+            chunk = GenerationChunk(text=text)
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            return chunk
+
+        try:
+            async with scheduler.aslot(self.model_name) as keep_alive:
+                with span("ollama_stream", model=self.model_name):
+                    async for part in await get_async_client().generate(
+                        model=self.model_name,
+                        system=self.system_prompt,
+                        options=self._options(**kwargs),
+                        keep_alive=keep_alive,
+                        stream=True,
+                        **self._conversation_request(prompt, session_id),
+                    ):
+                        chunk = await emit(think_filter.feed(part.get("response", "")))
+                        if chunk:
+                            yield chunk
+                        if part.get("done"):
+                            record_ollama_stats(self.model_name, part)
+                            self._remember(session_id, part)
+                    if chunk := await emit(think_filter.flush()):
+                        yield chunk
+
+        except Exception as e:
+            logger.error(
+                f"Error streaming response in {self.__class__.__name__}: {str(e)}"
+            )
+
+        if first_token_at is None:
+            yield await emit(FALLBACK_ANSWER)
 
 
 class OllamaLLM(BaseLLM):
@@ -91,12 +380,11 @@ class LlamaMedLLM(BaseLLM):
     def _llm_type(self) -> str:
         return MEDLLAMA_MODEL_NAME
 
-    def _call(
-        self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any
-    ) -> str:
-        return super()._call(
-            prompt,
-            stop,
+    def _num_ctx(self) -> int:
+        return MEDLLAMA_NUM_CTX
+
+    def _options(self, **kwargs: Any) -> Dict[str, Any]:
+        return super()._options(
             options={
                 "num_ctx": MEDLLAMA_NUM_CTX,
                 "num_thread": MEDLLAMA_NUM_THREAD,
@@ -0,0 +1,260 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from components.config import (
+    METRICS_ENABLED,
+    METRICS_LATENCY_BUCKETS,
+    METRICS_PORT,
+    METRICS_PREFIX,
+    METRICS_TRACE_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = METRICS_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound containing the ``q`` quantile (inf if beyond)."""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class MetricsRegistry:
+    """In-process histograms and counters rendered in Prometheus text format."""
+
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            series.setdefault(key, Histogram()).observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def histogram(self, name: str, **labels: Any) -> Optional[Histogram]:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        return self._histograms.get(name, {}).get(key)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        return self._counters.get(name, {}).get(key, 0)
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        le = _format_labels(labels, ("le", repr(bound)))
+                        lines.append(f"{metric}_bucket{le} {cumulative}")
+                    le = _format_labels(labels, ("le", "+Inf"))
+                    lines.append(f"{metric}_bucket{le} {hist.count}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {hist.sum}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+@dataclass
+class Span:
+    name: str
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start: float = field(default_factory=time.time)
+    end: Optional[float] = None
+    children: List["Span"] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+_trace_lock = threading.Lock()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def write_trace(root: Span, path: Optional[str] = None) -> None:
+    path = path or METRICS_TRACE_PATH
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        line = json.dumps(root.to_dict(), default=str)
+        with _trace_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        logger.error(f"Error writing trace: {str(e)}")
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time a block as a child of the current span and record it in histograms.
+
+    The outermost span of a request is appended to the JSONL trace file with
+    its whole tree when it finishes.
+    """
+    parent = _current_span.get()
+    current = Span(name, dict(attributes))
+    if parent is not None:
+        parent.children.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set(error=str(e))
+        raise
+    finally:
+        current.end = time.time()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Generators resumed from another context (e.g. a new thread)
+            _current_span.set(parent)
+        if METRICS_ENABLED:
+            registry.observe("span_seconds", current.duration, span=name)
+            if parent is None:
+                write_trace(current)
+
+
+def record_ollama_stats(model: str, response: Any) -> None:
+    """Export Ollama's own timing fields (nanoseconds) for a finished generation."""
+    stats = {
+        key: response.get(key)
+        for key in (
+            "load_duration",
+            "prompt_eval_count",
+            "prompt_eval_duration",
+            "eval_count",
+            "eval_duration",
+            "total_duration",
+        )
+    }
+    stats = {key: value for key, value in stats.items() if value is not None}
+    if active := current_span():
+        active.set(**stats)
+    if not METRICS_ENABLED:
+        return
+
+    for key in ("load_duration", "prompt_eval_duration", "eval_duration"):
+        if key in stats:
+            seconds = stats[key] / 1e9
+            registry.observe(f"ollama_{key}_seconds", seconds, model=model)
+    for key in ("prompt_eval_count", "eval_count"):
+        if key in stats:
+            registry.inc(
+                f"ollama_{key.replace('_count', '')}_tokens_total",
+                stats[key],
+                model=model,
+            )
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT) -> Optional[ThreadingHTTPServer]:
+    """Serve ``/metrics`` from a daemon thread; safe to call on every rerun."""
+    global _server
+    if not METRICS_ENABLED:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError as e:
+                logger.error(f"Could not start metrics server on {port}: {str(e)}")
+                return None
+            threading.Thread(
+                target=_server.serve_forever, name="metrics-server", daemon=True
+            ).start()
+            logger.info(f"Metrics available at http://0.0.0.0:{port}/metrics")
+    return _server
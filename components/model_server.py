@@ -0,0 +1,341 @@
+"""Out-of-process host for the embedding model and query router.
+
+One server process loads MiniLM (and BART when the router needs it); the
+Streamlit workers, the query service and the ingestion job reach it over a
+Unix socket or localhost HTTP instead of loading their own copies.
+Concurrent requests are merged into micro-batches before hitting the models.
+
+    python -m components.model_server --listen unix:///tmp/medrag-models.sock
+    MODEL_SERVER_ADDRESS=unix:///tmp/medrag-models.sock streamlit run main.py
+"""
+
+import http.client
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from langchain_core.embeddings import Embeddings
+
+from components.config import (
+    EMBEDDING_QUERY_CACHE_SIZE,
+    MODEL_SERVER_BATCH_WAIT,
+    MODEL_SERVER_LISTEN,
+    MODEL_SERVER_MAX_BATCH,
+    MODEL_SERVER_TIMEOUT,
+    QUERY_ROUTER,
+    ROUTER_BART_FALLBACK,
+)
+from components.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Merges concurrent calls into one call of ``fn`` on the combined items.
+
+    ``fn`` maps a list of inputs to a list of outputs of the same length. The
+    first waiting call opens a window of ``max_wait`` seconds; calls arriving
+    within it (up to ``max_batch`` items) are run together and each caller
+    gets back its own slice.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        max_batch: int = MODEL_SERVER_MAX_BATCH,
+        max_wait: float = MODEL_SERVER_BATCH_WAIT,
+        name: str = "batch",
+    ):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.name = name
+        self._queue: "queue.Queue[Tuple[List[Any], Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def __call__(self, items: List[Any]) -> List[Any]:
+        if not items:
+            return []
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"microbatch-{self.name}", daemon=True
+                )
+                self._thread.start()
+        future: Future = Future()
+        self._queue.put((items, future))
+        return future.result()
+
+    def _collect(self) -> List[Tuple[List[Any], Future]]:
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items, future = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append((items, future))
+            size += len(items)
+        return pending
+
+    def _run(self) -> None:
+        while True:
+            pending = self._collect()
+            flat = [item for items, _ in pending for item in items]
+            registry.inc("model_server_batches_total", op=self.name)
+            registry.inc("model_server_items_total", len(flat), op=self.name)
+            try:
+                results = self.fn(flat)
+            except Exception as e:
+                logger.error(f"Micro-batch {self.name} failed: {str(e)}")
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for items, future in pending:
+                future.set_result(results[start : start + len(items)])
+                start += len(items)
+
+
+class _BatchedEmbeddings(Embeddings):
+    """Routes the router's embedding calls through the server's micro-batchers."""
+
+    def __init__(self, documents: MicroBatcher, queries: MicroBatcher):
+        self.documents = documents
+        self.queries = queries
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.queries([text])[0]
+
+
+class ModelServer:
+    """Serves ``/embed_documents``, ``/embed_query`` and ``/is_medical`` as JSON."""
+
+    def __init__(self, embeddings: Any, zero_shot: Optional[Callable] = None):
+        from components.router import EmbeddingRouter
+
+        self.embed_documents = MicroBatcher(
+            embeddings.embed_documents, name="embed_documents"
+        )
+        self.embed_queries = MicroBatcher(embeddings.embed_queries, name="embed_query")
+        self.zero_shot = (
+            MicroBatcher(zero_shot, name="zero_shot") if zero_shot else None
+        )
+        self.router = EmbeddingRouter(
+            _BatchedEmbeddings(self.embed_documents, self.embed_queries),
+            fallback=(
+                (lambda query: self.zero_shot([query])[0])
+                if self.zero_shot and ROUTER_BART_FALLBACK
+                else None
+            ),
+        )
+
+    def is_medical(self, query: str) -> bool:
+        if QUERY_ROUTER == "zero_shot" and self.zero_shot:
+            return self.zero_shot([query])[0]
+        return self.router.is_medical(query)
+
+    def handle(self, path: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if path == "/embed_documents":
+            return {"vectors": self.embed_documents(payload["texts"])}
+        if path == "/embed_query":
+            return {"vectors": self.embed_queries(payload["texts"])}
+        if path == "/is_medical":
+            return {"medical": [self.is_medical(q) for q in payload["queries"]]}
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                if self.path == "/health":
+                    self._send_json(200, {"status": "ok"})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                    result = server.handle(self.path, payload)
+                    if result is None:
+                        self._send_json(404, {"error": f"unknown endpoint {self.path}"})
+                    else:
+                        self._send_json(200, result)
+                except Exception as e:
+                    logger.error(f"Model server error on {self.path}: {str(e)}")
+                    self._send_json(500, {"error": str(e)})
+
+            def address_string(self) -> str:
+                return str(self.client_address or "unix")
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def serve(self, listen: str = MODEL_SERVER_LISTEN) -> socketserver.BaseServer:
+        """Bind ``listen`` and return the (not yet started) server."""
+        address = urlparse(listen)
+        if address.scheme == "unix":
+            if os.path.exists(address.path):
+                os.unlink(address.path)
+            return _ThreadingUnixHTTPServer(address.path, self._handler())
+        return ThreadingHTTPServer((address.hostname, address.port), self._handler())
+
+
+class _ThreadingUnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ModelClient:
+    """Keep-alive JSON client for a ``ModelServer``, one connection per thread."""
+
+    def __init__(self, address: str, timeout: float = MODEL_SERVER_TIMEOUT):
+        self.address = urlparse(address)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if self.address.scheme == "unix":
+                connection = _UnixHTTPConnection(self.address.path, self.timeout)
+            else:
+                connection = http.client.HTTPConnection(
+                    self.address.hostname, self.address.port, timeout=self.timeout
+                )
+            self._local.connection = connection
+        return connection
+
+    def post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        body = json.dumps(payload)
+        headers = {"Content-Type": "application/json"}
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request("POST", path, body, headers)
+                response = connection.getresponse()
+                data = json.loads(response.read())
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # Stale keep-alive connection: reconnect once
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise RuntimeError(f"Model server {path} failed: {data.get('error')}")
+        return data
+
+
+class RemoteEmbeddings(Embeddings):
+    """``Embeddings`` backed by the model server, in place of HuggingFaceEmbeddings.
+
+    Query vectors are kept in an in-memory LRU, like ``CachedEmbeddings``, so
+    a query embedded by both the cache lookup and retrieval is sent once.
+    """
+
+    def __init__(
+        self, client: ModelClient, query_cache_size: int = EMBEDDING_QUERY_CACHE_SIZE
+    ):
+        self.client = client
+        self.query_cache_size = query_cache_size
+        self._queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.post("/embed_documents", {"texts": texts})["vectors"]
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._query_lock:
+            if text in self._queries:
+                self._queries.move_to_end(text)
+                return self._queries[text]
+
+        vector = self.client.post("/embed_query", {"texts": [text]})["vectors"][0]
+
+        with self._query_lock:
+            self._queries[text] = vector
+            if len(self._queries) > self.query_cache_size:
+                self._queries.popitem(last=False)
+        return vector
+
+
+class RemoteRouter:
+    """Query router backed by the model server, in place of ``EmbeddingRouter``."""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def is_medical(self, query: str) -> bool:
+        return self.client.post("/is_medical", {"queries": [query]})["medical"][0]
+
+
+def build_server() -> ModelServer:
+    from components.qa_chain import zero_shot_batch
+    from components.vectorstore import load_embeddings
+
+    needs_bart = QUERY_ROUTER == "zero_shot" or ROUTER_BART_FALLBACK
+    return ModelServer(load_embeddings(), zero_shot_batch if needs_bart else None)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from components.config import LOGGING_FORMAT, LOGGING_LEVEL
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--listen", default=MODEL_SERVER_LISTEN)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=LOGGING_LEVEL, format=LOGGING_FORMAT, handlers=[logging.StreamHandler()]
+    )
+    model_server = build_server()
+    model_server.router.centroids  # load the embedder before accepting requests
+    httpd = model_server.serve(args.listen)
+    logger.info(f"Model server listening on {args.listen}")
+    httpd.serve_forever()
@@ -0,0 +1,198 @@
+import importlib.util
+import logging
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from components.chunking import Section
+from components.config import PARSE_BATCH_SIZE, PARSE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# lxml builds the tree in C; html.parser is the pure-Python fallback
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+CONTENT_CLASSES = frozenset({"abstract-content", "ddc-main-content"})
+
+
+@dataclass
+class Page:
+    """A fetched HTML page waiting to be parsed."""
+
+    url: str
+    html: str
+
+
+class _ArticleStrainer(SoupStrainer):
+    """Keeps only ``<h1>`` and the main content ``<div>`` (with descendants).
+
+    Scripts, navigation, ads and footers are discarded while parsing instead
+    of being built into the tree and searched afterwards.
+    """
+
+    def allow_tag_creation(
+        self, nsprefix: Optional[str], name: str, attrs: Optional[Dict[str, Any]]
+    ) -> bool:
+        if name == "h1":
+            return True
+        if name != "div" or not attrs:
+            return False
+        classes = attrs.get("class") or ""
+        if isinstance(classes, str):
+            classes = classes.split()
+        return not CONTENT_CLASSES.isdisjoint(classes)
+
+    def allow_string_creation(self, string: str) -> bool:
+        return False
+
+
+ARTICLE_STRAINER = _ArticleStrainer()
+DRUG_LINKS_STRAINER = SoupStrainer("ul", class_="ddc-list-column-4")
+
+
+def format_text(title: Optional[str], content: Optional[str]) -> str:
+    return f"Title: {title or 'No title'}\nContent: {content or 'No content'}"
+
+
+def article(title: Optional[str], sections: List[Section], url: str) -> Dict[str, Any]:
+    return {
+        "text": format_text(
+            title,
+            "\n".join(
+                f"{s.heading}: {s.text}" if s.heading else s.text for s in sections
+            ),
+        ),
+        "title": title or "",
+        "sections": sections,
+        "metadata": {"source": url},
+    }
+
+
+def extract_sections(soup: BeautifulSoup) -> List[Section]:
+    """Split the main content at Drugs.com headings and abstract sub-titles."""
+    content = soup.find("div", class_=list(CONTENT_CLASSES))
+    if not content:
+        return []
+
+    sections = [Section("", "")]
+    for elem in content.find_all(["h2", "h3", "h4", "p", "li"]):
+        if elem.find_parent(["p", "li"]):
+            continue
+        if elem.name in ("h2", "h3", "h4"):
+            sections.append(Section(elem.get_text(" ", strip=True), ""))
+            continue
+        label = elem.find("strong", class_="sub-title")
+        if label:
+            sections.append(Section(label.get_text(strip=True).rstrip(":"), ""))
+            label.extract()
+        text = elem.get_text(" ", strip=True)
+        sections[-1].text = f"{sections[-1].text} {text}".strip()
+    return [section for section in sections if section.text]
+
+
+def parse_article(html: str, url: str) -> Dict[str, Any]:
+    """Article document: full ``text`` plus ``title`` and ``sections`` for chunking."""
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=ARTICLE_STRAINER)
+    title = soup.find("h1")
+    return article(
+        title.get_text(strip=True) if title else None, extract_sections(soup), url
+    )
+
+
+def parse_drug_links(html: str) -> List[str]:
+    """``href`` of every link in the Drugs.com A-Z list."""
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=DRUG_LINKS_STRAINER)
+    links = soup.find("ul", class_="ddc-list-column-4")
+    return [link["href"] for link in links.find_all("a", href=True)] if links else []
+
+
+def _parse_batch(pages: List[Page]) -> List[Dict[str, Any]]:
+    return [parse_article(page.html, page.url) for page in pages]
+
+
+def _parse_each(
+    pages: List[Page], failed: Optional[Set[str]]
+) -> Iterator[Dict[str, Any]]:
+    """Parse ``pages`` in this process one by one, recording those that fail."""
+    for page in pages:
+        try:
+            yield parse_article(page.html, page.url)
+        except Exception as e:
+            logger.error(f"Error parsing {page.url}: {str(e)}")
+            if failed is not None:
+                failed.add(page.url)
+
+
+def _batches(items: Iterator[Any], size: int) -> Iterator[List[Any]]:
+    """Group consecutive ``Page`` items; any other item is its own batch."""
+    pages: List[Page] = []
+    for item in items:
+        if not isinstance(item, Page):
+            if pages:
+                yield pages
+                pages = []
+            yield [item]
+            continue
+        pages.append(item)
+        if len(pages) >= size:
+            yield pages
+            pages = []
+    if pages:
+        yield pages
+
+
+def parse_pages(
+    items: Iterable[Any],
+    workers: int = PARSE_WORKERS,
+    batch_size: int = PARSE_BATCH_SIZE,
+    failed: Optional[Set[str]] = None,
+) -> Iterator[Any]:
+    """Ingestion stage: parse ``Page`` items into articles, pass others through.
+
+    Pages are parsed ``batch_size`` at a time in a pool of ``workers``
+    processes, so parsing is not bound to the fetching thread's core. At most
+    ``2 * workers`` batches are outstanding; articles are yielded in
+    completion order. A batch the pool fails on (e.g. a crashed worker) is
+    parsed again in this process; URLs of pages that still cannot be parsed
+    are added to ``failed``, so their indexed documents are not pruned.
+    """
+    if workers <= 1:
+        for batch in _batches(iter(items), batch_size):
+            if isinstance(batch[0], Page):
+                yield from _parse_each(batch, failed)
+            else:
+                yield from batch
+        return
+
+    pending: Dict[Future, List[Page]] = {}
+    batches = _batches(iter(items), batch_size)
+    # Spawned workers are safe to start from the pipeline's threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < 2 * workers:
+                batch = next(batches, None)
+                if batch is None:
+                    exhausted = True
+                elif isinstance(batch[0], Page):
+                    pending[pool.submit(_parse_batch, batch)] = batch
+                else:
+                    yield from batch
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = pending.pop(future)
+                try:
+                    documents = future.result()
+                except Exception as e:
+                    logger.error(
+                        f"Error parsing {len(batch)} pages in a worker, "
+                        f"parsing them here instead: {str(e)}"
+                    )
+                    documents = _parse_each(batch, failed)
+                yield from documents
@@ -0,0 +1,346 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from langchain_community.vectorstores import Chroma
+
+from components.config import (
+    INGEST_BATCH_SIZE,
+    INGEST_CHECKPOINT_BATCHES,
+    INGEST_PROGRESS_INTERVAL,
+    INGEST_QUEUE_SIZE,
+)
+from components.chunking import chunk_documents
+from components.parsing import parse_pages
+from components.metrics import registry
+from components.vectorstore import (
+    IndexManifest,
+    document_id,
+    find_duplicates,
+    load_manifest,
+    merge_duplicates,
+    prune_documents,
+    upsert_documents,
+)
+
+logger = logging.getLogger(__name__)
+
+StageFn = Callable[[Iterator[Any]], Iterator[Any]]
+
+_DONE = object()
+
+
+class _Stopped(Exception):
+    pass
+
+
+@dataclass
+class StageStats:
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+
+    def summary(self) -> str:
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return (
+            f"{self.name}: {self.items_in} in / {self.items_out} out ({elapsed:.1f}s)"
+        )
+
+
+class Pipeline:
+    """Runs generator stages in their own threads, linked by bounded queues.
+
+    A full queue blocks the upstream stage, so at most ``queue_size`` items are
+    buffered between any two stages regardless of how large the source is.
+    """
+
+    def __init__(
+        self, stages: List[Tuple[str, StageFn]], queue_size: int = INGEST_QUEUE_SIZE
+    ):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats: Dict[str, StageStats] = {}
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def _put(self, q: queue.Queue, item: Any) -> None:
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _drain(self, q: queue.Queue, stats: Optional[StageStats]) -> Iterator[Any]:
+        while True:
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if item is _DONE:
+                return
+            if stats:
+                stats.items_in += 1
+            yield item
+
+    def _run_stage(
+        self,
+        items: Iterable[Any],
+        out: queue.Queue,
+        stats: StageStats,
+    ) -> None:
+        try:
+            for item in items:
+                self._put(out, item)
+                stats.items_out += 1
+        except _Stopped:
+            pass
+        except BaseException as e:
+            logger.error(f"Pipeline stage {stats.name} failed: {str(e)}")
+            self._errors.append(e)
+            self._stop.set()
+        finally:
+            stats.finished = time.monotonic()
+            try:
+                self._put(out, _DONE)
+            except _Stopped:
+                pass
+
+    def progress(self) -> str:
+        return ", ".join(stats.summary() for stats in self.stats.values())
+
+    def run(self, source: Iterable[Any]) -> Iterator[Any]:
+        queues = [
+            queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)
+        ]
+        self._stop.clear()
+        self._errors = []
+        self.stats = {"source": StageStats("source")}
+        threads = [
+            threading.Thread(
+                target=self._run_stage,
+                args=(source, queues[0], self.stats["source"]),
+                name="pipeline-source",
+                daemon=True,
+            )
+        ]
+        for i, (name, fn) in enumerate(self.stages):
+            stats = self.stats[name] = StageStats(name)
+            threads.append(
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(fn(self._drain(queues[i], stats)), queues[i + 1], stats),
+                    name=f"pipeline-{name}",
+                    daemon=True,
+                )
+            )
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            yield from self._drain(queues[-1], None)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+
+def _batched(size: int) -> StageFn:
+    def stage(items: Iterator[Any]) -> Iterator[List[Any]]:
+        batch: List[Any] = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    return stage
+
+
+class IngestionPipeline:
+    """Streams documents into the vector store in pipelined stages.
+
+    Stages: parse → chunk → batch → select → dedup → embed → upsert. Fetched
+    ``Page`` items are parsed in a process pool; other documents pass straight
+    through to chunking. Each batch is searchable as soon as its upsert stage
+    finishes. Documents already in the manifest are skipped before embedding,
+    and near-duplicates of indexed documents are not embedded but merged into
+    their canonical document's sources; vanished documents are pruned once the
+    source is exhausted. The manifest is checkpointed every
+    ``checkpoint_batches`` batches and at the end, so per-batch cost does not
+    grow with the index; documents upserted after the last checkpoint of an
+    interrupted run are simply upserted again by the next one.
+    """
+
+    def __init__(
+        self,
+        vectorstore: Chroma,
+        manifest: Optional[IndexManifest] = None,
+        batch_size: int = INGEST_BATCH_SIZE,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        checkpoint_batches: int = INGEST_CHECKPOINT_BATCHES,
+    ):
+        self.vectorstore = vectorstore
+        self.manifest = manifest or load_manifest(vectorstore)
+        self.batch_size = batch_size
+        self.checkpoint_batches = max(1, checkpoint_batches)
+        self.seen_ids: Set[str] = set()
+        self.hosts: Set[str] = set()
+        self.parse_failed: Set[str] = set()
+        self.skipped = 0
+        self.duplicates = 0
+        self.pipeline = Pipeline(self._stages(), queue_size=queue_size)
+
+    def _stages(self) -> List[Tuple[str, StageFn]]:
+        return [
+            ("parse", self._parse),
+            ("chunk", chunk_documents),
+            ("batch", _batched(self.batch_size)),
+            ("select", self._select),
+            ("dedup", self._dedup),
+            ("embed", self._embed),
+            ("upsert", self._upsert),
+        ]
+
+    def _parse(self, items: Iterator[Any]) -> Iterator[Any]:
+        return parse_pages(items, failed=self.parse_failed)
+
+    def _select(self, batches: Iterator[List[Dict]]) -> Iterator[List[Tuple]]:
+        for batch in batches:
+            selected = []
+            for doc in batch:
+                doc_id = document_id(doc)
+                if doc_id in self.seen_ids:
+                    continue
+                self.seen_ids.add(doc_id)
+                self.hosts.add(urlparse(doc["metadata"]["source"]).netloc)
+                if (
+                    doc_id in self.manifest.entries
+                    or doc_id in self.manifest.duplicates
+                ):
+                    self.skipped += 1
+                else:
+                    selected.append((doc_id, doc))
+            if selected:
+                yield selected
+
+    def _dedup(self, batches: Iterator[List[Tuple]]) -> Iterator[List[Tuple]]:
+        for batch in batches:
+            checked = find_duplicates(self.manifest, batch)
+            self.duplicates += sum(1 for _, _, canonical in checked if canonical)
+            yield checked
+
+    def _embed(self, batches: Iterator[List[Tuple]]) -> Iterator[Tuple]:
+        embedding_function = self.vectorstore.embeddings
+        for batch in batches:
+            texts = [doc["text"] for _, doc, canonical in batch if not canonical]
+            started = time.perf_counter()
+            embeddings = embedding_function.embed_documents(texts) if texts else []
+            registry.observe(
+                "ingest_stage_seconds", time.perf_counter() - started, stage="embed"
+            )
+            yield batch, embeddings
+
+    def _upsert(self, batches: Iterator[Tuple]) -> Iterator[int]:
+        last_report = time.monotonic()
+        for n, (batch, embeddings) in enumerate(batches, start=1):
+            started = time.perf_counter()
+            kept = [(doc_id, doc) for doc_id, doc, canonical in batch if not canonical]
+            if kept:
+                upsert_documents(
+                    self.vectorstore,
+                    self.manifest,
+                    [doc_id for doc_id, _ in kept],
+                    [doc for _, doc in kept],
+                    embeddings=embeddings,
+                    save=False,
+                )
+            merge_duplicates(
+                self.vectorstore,
+                self.manifest,
+                [item for item in batch if item[2]],
+                save=False,
+            )
+            if n % self.checkpoint_batches == 0:
+                self.manifest.save()
+            registry.observe(
+                "ingest_stage_seconds", time.perf_counter() - started, stage="upsert"
+            )
+            registry.inc("ingested_documents_total", len(kept))
+            if time.monotonic() - last_report >= INGEST_PROGRESS_INTERVAL:
+                logger.info(f"Ingestion progress - {self.pipeline.progress()}")
+                last_report = time.monotonic()
+            yield len(kept)
+
+    def run(
+        self,
+        documents: Iterable[Dict],
+        prune: bool = True,
+        failed: Optional[Set[str]] = None,
+    ) -> int:
+        """Ingest ``documents`` and prune what vanished from the hosts seen.
+
+        ``failed`` holds source URLs that must not be pruned; it is read only
+        once ``documents`` is exhausted, so a crawler may fill it as it goes.
+        Pages the parse stage could not parse are kept as well.
+        """
+        logger.info("Starting streaming ingestion")
+        try:
+            indexed = sum(self.pipeline.run(documents))
+        finally:
+            self.manifest.save()
+
+        vanished: List[str] = []
+        if prune and self.seen_ids:
+            vanished = prune_documents(
+                self.vectorstore,
+                self.manifest,
+                self.seen_ids,
+                self.hosts,
+                self.parse_failed.union(failed or ()),
+            )
+
+        logger.info(f"Ingestion finished - {self.pipeline.progress()}")
+        logger.info(
+            f"Successfully indexed {indexed} documents "
+            f"({self.skipped} unchanged, {self.duplicates} near-duplicates, "
+            f"{len(vanished)} deleted)"
+        )
+        return indexed
+
+
+def ingest(
+    vectorstore: Chroma,
+    documents: Iterable[Dict],
+    prune: bool = True,
+    failed: Optional[Set[str]] = None,
+) -> int:
+    return IngestionPipeline(vectorstore).run(documents, prune=prune, failed=failed)
+
+
+if __name__ == "__main__":
+    from components.config import LOGGING_FORMAT, LOGGING_LEVEL
+    from components.data_loader import iter_medical_data
+    from components.vectorstore import init_vectorstore
+
+    logging.basicConfig(level=LOGGING_LEVEL, format=LOGGING_FORMAT)
+    failed: Set[str] = set()
+    ingest(
+        init_vectorstore(), iter_medical_data(parse=False, failed=failed), failed=failed
+    )
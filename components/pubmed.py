@@ -0,0 +1,178 @@
+import json
+import logging
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from tempfile import SpooledTemporaryFile
+from typing import IO, Iterator, List, Optional
+from urllib.parse import urlencode
+
+import requests
+
+from components.chunking import Section
+from components.crawler import CrawlerEngine, RetryableFetchError
+from components.config import (
+    CRAWLER_RETRY_STATUS_CODES,
+    PUBMED_FETCH_BATCH_SIZE,
+    PUBMED_FETCH_URL,
+    PUBMED_PARAMS,
+    PUBMED_SEARCH_URL,
+    PUBMED_SPOOL_BYTES,
+    REQUEST_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PubMedRecord:
+    pmid: str
+    title: str
+    abstract: str
+    sections: List[Section] = field(default_factory=list)
+
+
+def _text(elem: Optional[ET.Element]) -> str:
+    return "".join(elem.itertext()).strip() if elem is not None else ""
+
+
+def parse_efetch(stream: IO[bytes]) -> Iterator[PubMedRecord]:
+    """Incrementally parse an efetch XML payload, one PubmedArticle at a time."""
+    context = ET.iterparse(stream, events=("start", "end"))
+    _, root = next(context)
+
+    for event, elem in context:
+        if event != "end" or elem.tag != "PubmedArticle":
+            continue
+
+        sections = []
+        for part in elem.iterfind(".//Abstract/AbstractText"):
+            text = _text(part)
+            if text:
+                sections.append(Section(part.get("Label") or "", text))
+
+        yield PubMedRecord(
+            pmid=_text(elem.find(".//MedlineCitation/PMID")),
+            title=_text(elem.find(".//ArticleTitle")),
+            abstract="\n".join(
+                f"{s.heading}: {s.text}" if s.heading else s.text for s in sections
+            ),
+            sections=sections,
+        )
+        root.clear()
+
+
+class Download(SpooledTemporaryFile):
+    """A response body held in memory up to ``PUBMED_SPOOL_BYTES``, then on disk.
+
+    ``len()`` is the number of bytes downloaded, for the crawler's stats.
+    """
+
+    size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class PubMedClient:
+    """Bulk PubMed source built on E-utilities esearch (history server) + efetch."""
+
+    def __init__(
+        self,
+        session: requests.Session,
+        batch_size: int = PUBMED_FETCH_BATCH_SIZE,
+        engine: Optional[CrawlerEngine] = None,
+    ):
+        self.session = session
+        self.batch_size = batch_size
+        self.engine = engine or CrawlerEngine(self._fetch_xml)
+
+    def _fetch_xml(self, url: str) -> Optional[Download]:
+        """Stream the response for ``url`` into a ``Download``, rewound for reading.
+
+        The whole body is downloaded inside the crawler's retry loop, so a
+        connection dropped mid-transfer is retried like any other failure.
+        """
+        try:
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT, stream=True)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryableFetchError(str(e)) from e
+
+        try:
+            if response.status_code in CRAWLER_RETRY_STATUS_CODES:
+                raise RetryableFetchError(f"HTTP {response.status_code}")
+            if response.status_code != 200:
+                return None
+            body = Download(max_size=PUBMED_SPOOL_BYTES)
+            try:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    body.write(chunk)
+                    body.size += len(chunk)
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ) as e:
+                body.close()
+                raise RetryableFetchError(str(e)) from e
+            body.seek(0)
+            return body
+        finally:
+            response.close()
+
+    def search(self) -> dict:
+        """esearch result for ``PUBMED_PARAMS``, fetched through the crawler engine.
+
+        An empty dict if the search failed; the engine then lists its URL in
+        ``failed``.
+        """
+        params = {**PUBMED_PARAMS, "usehistory": "y", "retmax": 0}
+        url = f"{PUBMED_SEARCH_URL}?{urlencode(params)}"
+        body = dict(self.engine.fetch_all([url], "pubmed-search")).get(url)
+        if body is None:
+            logger.error("PubMed search failed")
+            return {}
+        with body:
+            return json.load(body).get("esearchresult", {})
+
+    def iter_articles(
+        self, retmax: int = PUBMED_PARAMS["retmax"]
+    ) -> Iterator[PubMedRecord]:
+        result = self.search()
+        total = min(int(result.get("count", 0)), retmax)
+        logger.info(f"PubMed search matched {result.get('count', 0)}, fetching {total}")
+
+        batch_urls = (
+            f"{PUBMED_FETCH_URL}?"
+            + urlencode(
+                {
+                    "db": PUBMED_PARAMS["db"],
+                    "WebEnv": result["webenv"],
+                    "query_key": result["querykey"],
+                    "retstart": start,
+                    "retmax": min(self.batch_size, total - start),
+                    "retmode": "xml",
+                    "rettype": "abstract",
+                }
+            )
+            for start in range(0, total, self.batch_size)
+        )
+
+        # A truncated, empty or <ERROR> batch counts as a failed fetch, so
+        # its articles are kept in the index rather than pruned.
+        for url, body in self.engine.fetch_all(batch_urls, "pubmed"):
+            records = 0
+            if body:
+                try:
+                    with body:
+                        for record in parse_efetch(body):
+                            records += 1
+                            yield record
+                except ET.ParseError as e:
+                    logger.error(f"Invalid efetch batch {url}: {e}")
+                    self.engine.failed.add(url)
+                    continue
+            elif body is not None:
+                body.close()
+            if not records:
+                logger.warning(f"Empty efetch batch: {url}")
+                self.engine.failed.add(url)
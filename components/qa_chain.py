@@ -1,36 +1,256 @@
+import asyncio
 import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Any,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
 import streamlit as st
-from typing import Dict, Any
 from langchain.chains import RetrievalQA
+from langchain_core.documents import Document
+from langchain_core.prompts import format_document
+
+from langchain_core.embeddings import Embeddings
 
-from .llm import LlamaMedLLM, OllamaLLM
-from .vectorstore import init_vectorstore
-from transformers import pipeline
+from . import aio
+from .bm25 import tokenize
+from .context import ContextPackingRetriever, HybridRetriever
+from .conversation import Conversation, conversations
+from .metrics import Span, span
+from .llm import FALLBACK_ANSWER, LlamaMedLLM, OllamaLLM
+from .router import EmbeddingRouter, PartitionRouter
+from .vectorstore import (
+    IndexManifest,
+    get_embeddings,
+    index_version,
+    init_vectorstore,
+)
 from components.config import (
+    CONVERSATION_HISTORY_TOKENS,
+    HYBRID_RETRIEVAL_ENABLED,
+    INDEX_SNAPSHOT,
+    PARTITION_ROUTING_ENABLED,
+    MEDLLAMA_MODEL_NAME,
+    MODEL_SERVER_ADDRESS,
     QA_SEARCH_TYPE,
     QA_SEARCH_K,
+    QUERY_ROUTER,
+    ROUTER_BART_FALLBACK,
+    SEMANTIC_CACHE_DRUG_STEMS,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_KEY_TERMS,
+    SEMANTIC_CACHE_MAX_SIZE,
+    SEMANTIC_CACHE_MIN_JACCARD,
+    SEMANTIC_CACHE_TERM_RULE,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL,
     ZERO_SHOT_LABELS,
     ZERO_SHOT_MODEL,
     ZERO_SHOT_THRESHOLD,
     DEFAULT_MODEL_NAME,
+    CONTEXT_MMR_LAMBDA,
+    VECTORSTORE_MANIFEST_PATH,
 )
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _CacheEntry:
+    model_name: str
+    terms: FrozenSet[str]
+    vector: np.ndarray
+    response: Dict[str, Any]
+    created: float
+
+
+def key_terms(terms: Iterable[str]) -> FrozenSet[str]:
+    """The terms that tell medical questions apart.
+
+    Numbers, negations, qualifiers such as "pediatric" or "overdose"
+    (``SEMANTIC_CACHE_KEY_TERMS``) and drug names, recognised by their INN
+    stem (``SEMANTIC_CACHE_DRUG_STEMS``).
+    """
+    return frozenset(
+        term
+        for term in terms
+        if term in SEMANTIC_CACHE_KEY_TERMS
+        or any(c.isdigit() for c in term)
+        or term.endswith(SEMANTIC_CACHE_DRUG_STEMS)
+    )
+
+
+def terms_match(a: FrozenSet[str], b: FrozenSet[str], rule: str) -> bool:
+    """Whether queries with words ``a`` and ``b`` may share a cached answer."""
+    if rule == "key_terms":
+        return key_terms(a) == key_terms(b)
+    if rule == "jaccard":
+        union = a | b
+        return not union or len(a & b) / len(union) >= SEMANTIC_CACHE_MIN_JACCARD
+    return True
+
+
+class SemanticCache:
+    """Answer cache keyed by query embedding and model name.
+
+    A lookup hits when a cached query for the same model has cosine
+    similarity of at least ``threshold`` and its words match under
+    ``term_rule`` (see ``terms_match``). Embeddings alone score queries like
+    "adult dose" and "pediatric dose" as near-identical; the term rule keeps
+    such a query from getting the answer to a different medical question,
+    while cosine still decides between paraphrases. Entries
+    expire after ``ttl`` seconds, the least recently used entry is evicted
+    beyond ``max_size``, and everything is dropped when ``version_fn`` reports
+    that the vector store changed.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        max_size: int = SEMANTIC_CACHE_MAX_SIZE,
+        version_fn: Callable[[], int] = index_version,
+        term_rule: str = SEMANTIC_CACHE_TERM_RULE,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.term_rule = term_rule
+        self.ttl = ttl
+        self.max_size = max_size
+        self.version_fn = version_fn
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._next_id = 0
+        self._version = version_fn()
+        self._lock = threading.Lock()
+
+    def _vector(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self) -> None:
+        version = self.version_fn()
+        if version != self._version:
+            logger.info("Vector store changed, clearing semantic cache")
+            self._entries.clear()
+            self._version = version
+
+        cutoff = time.monotonic() - self.ttl
+        for key in [k for k, e in self._entries.items() if e.created < cutoff]:
+            del self._entries[key]
+
+    def get(self, query: str, model_name: str) -> Optional[Dict[str, Any]]:
+        hit = self.lookup(query, [model_name])
+        return hit[1] if hit else None
+
+    def lookup(
+        self, query: str, model_names: Iterable[str]
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Best cached ``(model_name, response)`` for any of ``model_names``."""
+        terms = frozenset(tokenize(query))
+        vector = self._vector(query)
+        model_names = set(model_names)
+        with self._lock:
+            self._expire()
+            candidates = [
+                (key, entry)
+                for key, entry in self._entries.items()
+                if entry.model_name in model_names
+                and terms_match(entry.terms, terms, self.term_rule)
+            ]
+            if candidates:
+                similarities = np.stack([e.vector for _, e in candidates]) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.model_name, entry.response
+            self.misses += 1
+            return None
+
+    def put(self, query: str, model_name: str, response: Dict[str, Any]) -> None:
+        vector = self._vector(query)
+        with self._lock:
+            self._entries[self._next_id] = _CacheEntry(
+                model_name,
+                frozenset(tokenize(query)),
+                vector,
+                response,
+                time.monotonic(),
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+@st.cache_resource(show_spinner=False)
+def get_semantic_cache() -> Optional[SemanticCache]:
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if INDEX_SNAPSHOT:
+        from .snapshots import serving
+
+        return SemanticCache(get_embeddings(), version_fn=serving.version)
+    return SemanticCache(get_embeddings())
+
+
+def build_retriever(
+    vectorstore: Any, manifest_path: str = VECTORSTORE_MANIFEST_PATH
+) -> ContextPackingRetriever:
+    options = dict(
+        vectorstore=vectorstore,
+        embeddings=get_embeddings(),
+        max_docs=QA_SEARCH_K,
+        mmr_lambda=CONTEXT_MMR_LAMBDA if QA_SEARCH_TYPE == "mmr" else 1.0,
+        partition_router=(
+            PartitionRouter(get_embeddings()) if PARTITION_ROUTING_ENABLED else None
+        ),
+    )
+    if HYBRID_RETRIEVAL_ENABLED:
+        return HybridRetriever(
+            lexical_path=IndexManifest(manifest_path).lexical_path, **options
+        )
+    return ContextPackingRetriever(**options)
+
+
 @st.cache_resource(show_spinner=False)
 def init_qa_chain() -> RetrievalQA:
     logger.info("Initializing QA chain for medical queries")
     try:
         llm = LlamaMedLLM()
-        vectorstore = init_vectorstore()
+        if INDEX_SNAPSHOT:
+            from .snapshots import serving
+
+            retriever = serving.load(INDEX_SNAPSHOT, build_retriever)
+            if INDEX_SNAPSHOT == "current":
+                serving.watch()
+        else:
+            retriever = build_retriever(init_vectorstore())
 
         qa_chain = RetrievalQA.from_chain_type(
             llm=llm,
             chain_type="stuff",
-            retriever=vectorstore.as_retriever(
-                search_type=QA_SEARCH_TYPE, search_kwargs={"k": QA_SEARCH_K}
-            ),
+            retriever=retriever,
             return_source_documents=False,
             verbose=True,
         )
@@ -45,35 +265,298 @@ def init_qa_chain() -> RetrievalQA:
 
 @st.cache_resource(show_spinner=False)
 def get_zero_shot_classifier():
+    from transformers import pipeline
+
     return pipeline("zero-shot-classification", model=ZERO_SHOT_MODEL)
 
 
-def is_medical_query(query: str, threshold: float = ZERO_SHOT_THRESHOLD) -> bool:
+def _zero_shot_decision(result: Dict[str, Any], threshold: float) -> bool:
+    return (
+        result["labels"][0] == ZERO_SHOT_LABELS[0] and result["scores"][0] >= threshold
+    )
+
+
+def zero_shot_is_medical(query: str, threshold: float = ZERO_SHOT_THRESHOLD) -> bool:
 
     classifier = get_zero_shot_classifier()
     candidate_labels = ZERO_SHOT_LABELS
     result = classifier(query, candidate_labels)
-    if result["labels"][0] == ZERO_SHOT_LABELS[0] and result["scores"][0] >= threshold:
-        return True
-    return False
+    return _zero_shot_decision(result, threshold)
 
 
-def process_query(
-    qa_chain: Any, user_input: str, llm_instance: OllamaLLM
+def zero_shot_batch(
+    queries: List[str], threshold: float = ZERO_SHOT_THRESHOLD
+) -> List[bool]:
+    """``zero_shot_is_medical`` for several queries in one pipeline call."""
+    results = get_zero_shot_classifier()(queries, ZERO_SHOT_LABELS)
+    if isinstance(results, dict):
+        results = [results]
+    return [_zero_shot_decision(result, threshold) for result in results]
+
+
+@st.cache_resource(show_spinner=False)
+def get_query_router() -> EmbeddingRouter:
+    if MODEL_SERVER_ADDRESS:
+        from .model_server import ModelClient, RemoteRouter
+
+        return RemoteRouter(ModelClient(MODEL_SERVER_ADDRESS))
+    return EmbeddingRouter(
+        get_embeddings(),
+        fallback=zero_shot_is_medical if ROUTER_BART_FALLBACK else None,
+    )
+
+
+def is_medical_query(query: str, threshold: float = ZERO_SHOT_THRESHOLD) -> bool:
+    if MODEL_SERVER_ADDRESS:
+        # The model server applies QUERY_ROUTER itself
+        return get_query_router().is_medical(query)
+    if QUERY_ROUTER == "zero_shot":
+        return zero_shot_is_medical(query, threshold)
+    return get_query_router().is_medical(query)
+
+
+async def _aretrieve(
+    qa_chain: RetrievalQA, user_input: str, history_tokens: int = 0
+) -> List[Document]:
+    # Follow-ups leave room in the context window for the conversation history
+    kwargs = {"history_tokens": history_tokens} if history_tokens else {}
+    with span("retrieve"):
+        return await asyncio.to_thread(qa_chain.retriever.invoke, user_input, **kwargs)
+
+
+def _discard(task: asyncio.Task) -> None:
+    """Drop a speculative task's result, including any exception it raises."""
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+def _conversation(session_id: Optional[str]) -> Optional[Conversation]:
+    return conversations.get(session_id) if session_id else None
+
+
+def _follow_up(conversation: Optional[Conversation]) -> bool:
+    """Whether the answer depends on earlier turns (and so must not be cached)."""
+    return bool(conversation and conversation.turns)
+
+
+def _record_turn(
+    conversation: Optional[Conversation],
+    user_input: str,
+    answer: str,
+    model_name: str,
+    sources: Optional[List[Document]] = None,
+) -> None:
+    cache = get_semantic_cache()
+    if answer == FALLBACK_ANSWER:
+        return
+    if cache and not _follow_up(conversation):
+        cache.put(user_input, model_name, {"answer": answer, "sources": sources or []})
+    if conversation:
+        conversation.add_turn(user_input, answer, model_name)
+
+
+def _record_cached_turn(
+    conversation: Optional[Conversation],
+    user_input: str,
+    cached: Dict[str, Any],
+    model_name: str,
+) -> None:
+    """Record a turn served from the answer cache, without caching it again."""
+    logger.info(f"Semantic cache hit ({get_semantic_cache().stats()})")
+    if conversation:
+        conversation.add_turn(user_input, cached["answer"], model_name)
+
+
+async def _aroute(
+    qa_chain: RetrievalQA,
+    user_input: str,
+    llm_instance: OllamaLLM,
+    root: Span,
+    conversation: Optional[Conversation] = None,
+) -> Tuple[bool, str, Optional[Dict[str, Any]], List[Document], str]:
+    """Check the answer cache, then classify the query, retrieving speculatively.
+
+    The cache is looked up first, for either model, so a hit skips routing
+    and retrieval entirely; the model it was answered by gives the route.
+    Embedding the query for the lookup also warms the query embedding cache
+    that routing and retrieval use on a miss. Vector retrieval then starts
+    before the router has decided, so a medical query does not pay for
+    classification and retrieval one after the other; the retrieved documents
+    are discarded for general queries. Follow-up questions are routed,
+    retrieved and answered together with the previous question (the returned
+    query) and bypass the answer cache.
+    """
+    follow_up = _follow_up(conversation)
+    query = f"{conversation.last_question()} {user_input}" if follow_up else user_input
+
+    cache = None if follow_up else await asyncio.to_thread(get_semantic_cache)
+    with span("cache_lookup"):
+        hit = (
+            await asyncio.to_thread(
+                cache.lookup,
+                user_input,
+                (MEDLLAMA_MODEL_NAME, llm_instance.model_name),
+            )
+            if cache
+            else None
+        )
+    root.set(cache_hit=hit is not None)
+    if hit:
+        model_name, cached = hit
+        medical = model_name == MEDLLAMA_MODEL_NAME
+        root.set(route="medical" if medical else "general", model=model_name)
+        return medical, model_name, cached, [], query
+
+    retrieval = asyncio.create_task(
+        _aretrieve(qa_chain, query, CONVERSATION_HISTORY_TOKENS if follow_up else 0)
+    )
+    with span("classify"):
+        medical = await asyncio.to_thread(is_medical_query, query)
+    model_name = MEDLLAMA_MODEL_NAME if medical else llm_instance.model_name
+    root.set(route="medical" if medical else "general", model=model_name)
+
+    if not medical:
+        _discard(retrieval)
+        root.set(speculative_retrieval="discarded")
+        return medical, model_name, None, [], query
+    root.set(speculative_retrieval="used")
+    return medical, model_name, None, await retrieval, query
+
+
+async def aprocess_query(
+    qa_chain: RetrievalQA,
+    user_input: str,
+    llm_instance: OllamaLLM,
+    session_id: Optional[str] = None,
 ) -> Dict[str, Any]:
 
     logger.info(f"Processing question: {user_input}")
 
-    if is_medical_query(user_input):
-        logger.info("Query classified as medical. Using QA chain with LlamaMedLLM.")
-        result = qa_chain.invoke({"query": user_input})
-        answer = result["result"]
-        sources = result.get("sources", []) or result.get("source_documents", [])
-    else:
-        logger.info(
-            f"Query classified as general. Using direct call with OllamaLLM ({DEFAULT_MODEL_NAME})."
+    conversation = _conversation(session_id)
+    with span("process_query") as root:
+        medical, model_name, cached, docs, query = await _aroute(
+            qa_chain, user_input, llm_instance, root, conversation
+        )
+        if cached:
+            _record_cached_turn(conversation, user_input, cached, model_name)
+            return cached
+
+        if medical:
+            logger.info("Query classified as medical. Using QA chain with LlamaMedLLM.")
+            with span("qa_chain"):
+                answer = await qa_chain.combine_documents_chain.llm_chain.llm.ainvoke(
+                    format_medical_prompt(qa_chain, query, docs),
+                    session_id=session_id,
+                )
+            sources = docs if qa_chain.return_source_documents else []
+        else:
+            logger.info(
+                f"Query classified as general. Using direct call with OllamaLLM ({DEFAULT_MODEL_NAME})."
+            )
+            answer = await llm_instance._acall(prompt=user_input, session_id=session_id)
+            sources = []
+
+        await asyncio.to_thread(
+            _record_turn, conversation, user_input, answer, model_name, sources
         )
-        answer = llm_instance._call(prompt=user_input)
-        sources = []
+        return {"answer": answer, "sources": sources}
 
-    return {"answer": answer, "sources": sources}
+
+def process_query(
+    qa_chain: Any,
+    user_input: str,
+    llm_instance: OllamaLLM,
+    session_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Synchronous entry point; runs ``aprocess_query`` on the shared event loop."""
+    return aio.run(aprocess_query(qa_chain, user_input, llm_instance, session_id))
+
+
+def format_medical_prompt(
+    qa_chain: RetrievalQA, user_input: str, docs: List[Document]
+) -> str:
+    """Render the "stuff" prompt the QA chain would send for ``docs``."""
+    combine = qa_chain.combine_documents_chain
+    context = combine.document_separator.join(
+        format_document(doc, combine.document_prompt) for doc in docs
+    )
+    return combine.llm_chain.prompt.format(
+        **{combine.document_variable_name: context, "question": user_input}
+    )
+
+
+def stream_query(
+    qa_chain: Any,
+    user_input: str,
+    llm_instance: OllamaLLM,
+    session_id: Optional[str] = None,
+) -> Iterator[str]:
+    """Like ``process_query`` but yields the answer text as it is generated."""
+
+    logger.info(f"Processing question (streaming): {user_input}")
+
+    conversation = _conversation(session_id)
+    with span("stream_query") as root:
+        medical, model_name, cached, docs, query = aio.run(
+            _aroute(qa_chain, user_input, llm_instance, root, conversation)
+        )
+        if cached:
+            _record_cached_turn(conversation, user_input, cached, model_name)
+            yield cached["answer"]
+            return
+
+        if medical:
+            logger.info("Query classified as medical. Streaming from LlamaMedLLM.")
+            prompt = format_medical_prompt(qa_chain, query, docs)
+            chunks = qa_chain.combine_documents_chain.llm_chain.llm.stream(
+                prompt, session_id=session_id
+            )
+        else:
+            logger.info(
+                f"Query classified as general. Streaming from OllamaLLM ({DEFAULT_MODEL_NAME})."
+            )
+            chunks = llm_instance.stream(user_input, session_id=session_id)
+
+        parts: List[str] = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+
+        _record_turn(conversation, user_input, "".join(parts), model_name)
+
+
+async def astream_query(
+    qa_chain: RetrievalQA,
+    user_input: str,
+    llm_instance: OllamaLLM,
+    session_id: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Async variant of ``stream_query`` for callers running their own event loop."""
+
+    logger.info(f"Processing question (streaming): {user_input}")
+
+    conversation = _conversation(session_id)
+    with span("stream_query") as root:
+        medical, model_name, cached, docs, query = await _aroute(
+            qa_chain, user_input, llm_instance, root, conversation
+        )
+        if cached:
+            _record_cached_turn(conversation, user_input, cached, model_name)
+            yield cached["answer"]
+            return
+
+        if medical:
+            prompt = format_medical_prompt(qa_chain, query, docs)
+            chunks = qa_chain.combine_documents_chain.llm_chain.llm.astream(
+                prompt, session_id=session_id
+            )
+        else:
+            chunks = llm_instance.astream(user_input, session_id=session_id)
+
+        parts: List[str] = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+
+        await asyncio.to_thread(
+            _record_turn, conversation, user_input, "".join(parts), model_name
+        )
@@ -0,0 +1,138 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from components.config import (
+    PARTITION_FETCH_K,
+    PARTITION_PROTOTYPES,
+    PARTITION_ROUTER_MARGIN,
+    ROUTER_CACHE_SIZE,
+    ROUTER_FALLBACK_MARGIN,
+    ROUTER_PROTOTYPES,
+    ZERO_SHOT_LABELS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def prototype_centroids(
+    embeddings: Embeddings, prototypes: Dict[str, List[str]]
+) -> np.ndarray:
+    """One normalised mean embedding per label, in ``prototypes`` order."""
+    rows = []
+    for examples in prototypes.values():
+        vectors = np.asarray(embeddings.embed_documents(examples))
+        rows.append(_normalize(_normalize(vectors).mean(axis=0)))
+    return np.vstack(rows)
+
+
+class EmbeddingRouter:
+    """Classifies queries by cosine similarity to per-label prototype centroids.
+
+    Prototypes are embedded once with the vector store's embedding model, so a
+    decision costs a single query embedding (usually cached) and a dot product.
+    Decisions whose margin falls below ``fallback_margin`` are delegated to
+    ``fallback`` when one is given.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        prototypes: Dict[str, List[str]] = ROUTER_PROTOTYPES,
+        fallback: Optional[Callable[[str], bool]] = None,
+        fallback_margin: float = ROUTER_FALLBACK_MARGIN,
+        cache_size: int = ROUTER_CACHE_SIZE,
+    ):
+        self.embeddings = embeddings
+        self.prototypes = prototypes
+        self.fallback = fallback
+        self.fallback_margin = fallback_margin
+        self.cache_size = cache_size
+        self._labels: List[str] = list(prototypes)
+        self._centroids: Optional[np.ndarray] = None
+        self._cache: "OrderedDict[str, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.fallback_calls = 0
+
+    @property
+    def centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            self._centroids = prototype_centroids(self.embeddings, self.prototypes)
+        return self._centroids
+
+    def scores(self, query: str) -> Dict[str, float]:
+        vector = _normalize(np.asarray(self.embeddings.embed_query(query)))
+        return dict(zip(self._labels, (self.centroids @ vector).tolist()))
+
+    def classify(self, query: str) -> Tuple[str, float]:
+        """Return the best label and its margin over the runner-up."""
+        ranked = sorted(self.scores(query).items(), key=lambda x: x[1], reverse=True)
+        return ranked[0][0], ranked[0][1] - ranked[1][1]
+
+    def is_medical(self, query: str) -> bool:
+        key = query.strip().lower()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        label, margin = self.classify(query)
+        if margin < self.fallback_margin and self.fallback:
+            logger.info(f"Router margin {margin:.3f} below threshold, using fallback")
+            self.fallback_calls += 1
+            decision = self.fallback(query)
+        else:
+            decision = label == ZERO_SHOT_LABELS[0]
+
+        with self._lock:
+            self._cache[key] = decision
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return decision
+
+
+class PartitionRouter:
+    """Chooses the source partitions a medical query searches, and how deeply.
+
+    The query vector the retriever already has is scored against per-partition
+    prototype centroids. A partition that wins by ``margin`` is searched alone
+    with the retriever's full k; otherwise every partition in ``fetch_k`` is
+    searched with its own k.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        prototypes: Dict[str, List[str]] = PARTITION_PROTOTYPES,
+        fetch_k: Dict[str, int] = PARTITION_FETCH_K,
+        margin: float = PARTITION_ROUTER_MARGIN,
+    ):
+        self.embeddings = embeddings
+        self.prototypes = prototypes
+        self.fetch_k = fetch_k
+        self.margin = margin
+        self._labels: List[str] = list(prototypes)
+        self._centroids: Optional[np.ndarray] = None
+
+    @property
+    def centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            self._centroids = prototype_centroids(self.embeddings, self.prototypes)
+        return self._centroids
+
+    def route(self, query_vector: List[float], k: int) -> Dict[str, int]:
+        """``{partition: k}`` for each partition to search."""
+        scores = self.centroids @ _normalize(np.asarray(query_vector, dtype=float))
+        ranked = np.argsort(scores)[::-1]
+        if len(ranked) == 1 or scores[ranked[0]] - scores[ranked[1]] >= self.margin:
+            return {self._labels[ranked[0]]: k}
+        return dict(self.fetch_k)
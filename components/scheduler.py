@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    Optional,
+    Union,
+)
+
+from components.config import (
+    OLLAMA_KEEP_ALIVE,
+    SCHEDULER_ENABLED,
+    SCHEDULER_MAX_BATCH,
+    SCHEDULER_MAX_CONCURRENT,
+    SCHEDULER_MAX_WAIT,
+    SCHEDULER_RESIDENT_MODELS,
+)
+from components.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+KeepAlive = Union[str, int]
+
+
+@dataclass
+class _Ticket:
+    model: str
+    enqueued: float
+    granted: threading.Event = field(default_factory=threading.Event)
+    keep_alive: KeepAlive = OLLAMA_KEEP_ALIVE
+    on_grant: Optional[Callable[[], None]] = None
+
+    def grant(self) -> None:
+        self.granted.set()
+        if self.on_grant:
+            self.on_grant()
+
+
+class ModelScheduler:
+    """Orders Ollama generations so requests for the same model run back to back.
+
+    At most ``resident_models`` models are active at a time. An active model
+    keeps being served while it has queued requests, up to ``max_batch`` per
+    turn, and yields once it is idle or a request for another model has waited
+    ``max_wait`` seconds. A model that yields is drained (no new requests
+    start) before the next one is admitted, so the Ollama host never needs more
+    than ``resident_models`` models loaded. The last request of a turn is sent
+    with ``keep_alive=0`` so its model is unloaded as soon as it finishes.
+    """
+
+    def __init__(
+        self,
+        resident_models: int = SCHEDULER_RESIDENT_MODELS,
+        max_concurrent: int = SCHEDULER_MAX_CONCURRENT,
+        max_batch: int = SCHEDULER_MAX_BATCH,
+        max_wait: float = SCHEDULER_MAX_WAIT,
+        keep_alive: KeepAlive = OLLAMA_KEEP_ALIVE,
+        enabled: bool = SCHEDULER_ENABLED,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.resident_models = resident_models
+        self.max_concurrent = max_concurrent
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.keep_alive = keep_alive
+        self.enabled = enabled
+        self.clock = clock
+        self.switches = 0
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[_Ticket]] = defaultdict(deque)
+        # Active models and the number of requests started in their current turn
+        self._active: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = defaultdict(int)
+
+    def _oldest_waiting(self) -> Optional[str]:
+        waiting = [
+            model
+            for model, queue in self._queues.items()
+            if queue and model not in self._active
+        ]
+        return min(waiting, key=lambda m: self._queues[m][0].enqueued, default=None)
+
+    def _should_yield(self, model: str, now: float) -> bool:
+        waiting = self._oldest_waiting()
+        if waiting is None:
+            return False
+        if not self._queues[model]:
+            return True
+        served = self._active[model]
+        # A freshly admitted model always serves at least one request
+        return served > 0 and (
+            served >= self.max_batch
+            or now - self._queues[waiting][0].enqueued >= self.max_wait
+        )
+
+    def _dispatch(self) -> None:
+        now = self.clock()
+        changed = True
+        while changed:
+            changed = False
+            for model in list(self._active):
+                if not self._in_flight[model] and self._should_yield(model, now):
+                    del self._active[model]
+                    changed = True
+            while len(self._active) < self.resident_models:
+                model = self._oldest_waiting()
+                if model is None:
+                    break
+                self._active[model] = 0
+                self.switches += 1
+                registry.inc("scheduler_model_switches_total", model=model)
+                changed = True
+
+        for model in self._active:
+            queue = self._queues[model]
+            while (
+                queue
+                and self._in_flight[model] < self.max_concurrent
+                and not self._should_yield(model, now)
+            ):
+                ticket = queue.popleft()
+                self._active[model] += 1
+                self._in_flight[model] += 1
+                if self._should_yield(model, now):
+                    ticket.keep_alive = 0
+                ticket.grant()
+
+    def _release(self, model: str) -> None:
+        with self._lock:
+            self._in_flight[model] -= 1
+            self._dispatch()
+
+    def _enqueue(
+        self, model: str, on_grant: Optional[Callable[[], None]] = None
+    ) -> _Ticket:
+        ticket = _Ticket(model, self.clock(), keep_alive=self.keep_alive)
+        ticket.on_grant = on_grant
+        with self._lock:
+            self._queues[model].append(ticket)
+            self._dispatch()
+        return ticket
+
+    def _abandon(self, ticket: _Ticket) -> None:
+        with self._lock:
+            if not ticket.granted.is_set():
+                self._queues[ticket.model].remove(ticket)
+                return
+        self._release(ticket.model)
+
+    def _granted(self, ticket: _Ticket) -> KeepAlive:
+        registry.observe(
+            "scheduler_wait_seconds",
+            self.clock() - ticket.enqueued,
+            model=ticket.model,
+        )
+        return ticket.keep_alive
+
+    @contextmanager
+    def slot(self, model: str) -> Iterator[KeepAlive]:
+        """Wait for this model's turn, yielding the ``keep_alive`` to send."""
+        if not self.enabled:
+            yield self.keep_alive
+            return
+
+        ticket = self._enqueue(model)
+        try:
+            ticket.granted.wait()
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        try:
+            yield self._granted(ticket)
+        finally:
+            self._release(model)
+
+    @asynccontextmanager
+    async def aslot(self, model: str) -> AsyncIterator[KeepAlive]:
+        """Async variant of ``slot`` that waits without blocking the event loop."""
+        if not self.enabled:
+            yield self.keep_alive
+            return
+
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake() -> None:
+            if not granted.done():
+                granted.set_result(None)
+
+        ticket = self._enqueue(model, lambda: loop.call_soon_threadsafe(wake))
+        try:
+            await granted
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        try:
+            yield self._granted(ticket)
+        finally:
+            self._release(model)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active": list(self._active),
+                "queued": {m: len(q) for m, q in self._queues.items() if q},
+                "in_flight": {m: n for m, n in self._in_flight.items() if n},
+                "switches": self.switches,
+            }
+
+
+scheduler = ModelScheduler()
@@ -0,0 +1,238 @@
+"""Headless HTTP API for the query path, with admission control.
+
+python -m components.service
+curl -N localhost:8000/query/stream -d '{"query": "What is metformin?"}'
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.types import Receive, Scope, Send
+
+from components.config import (
+    INDEX_SNAPSHOT,
+    LOGGING_FORMAT,
+    LOGGING_LEVEL,
+    SERVICE_HOST,
+    SERVICE_MAX_CONCURRENT,
+    SERVICE_MAX_QUEUE,
+    SERVICE_PORT,
+    SERVICE_PRIORITIES,
+    SERVICE_QUEUE_TIMEOUT,
+)
+from components.metrics import registry
+from components.warmup import readiness, start_warmup
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; maps to HTTP 503."""
+
+
+class AdmissionController:
+    """Bounds concurrent queries and queues the rest by priority.
+
+    Up to ``max_concurrent`` requests run at once. Further requests wait in a
+    priority queue (lower priority value first, FIFO within a class) of at
+    most ``max_queue`` entries; a full queue or a wait longer than
+    ``queue_timeout`` seconds rejects the request with ``Overloaded``.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = SERVICE_MAX_CONCURRENT,
+        max_queue: int = SERVICE_MAX_QUEUE,
+        queue_timeout: float = SERVICE_QUEUE_TIMEOUT,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.rejected = 0
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(not future.done() for _, _, future in self._waiting)
+
+    async def acquire(self, priority: int = 0) -> None:
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+            return
+        if self.queued >= self.max_queue:
+            self._reject("queue_full")
+            raise Overloaded("request queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._order), future))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._reject("queue_timeout")
+                raise Overloaded("timed out waiting in the request queue")
+        except asyncio.CancelledError:
+            if not future.cancel():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.active -= 1
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+                break
+
+    def _reject(self, reason: str) -> None:
+        self.rejected += 1
+        registry.inc("service_rejected_total", reason=reason)
+
+    @asynccontextmanager
+    async def admit(self, priority: int = 0) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"active": self.active, "queued": self.queued, "rejected": self.rejected}
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """Streaming response that releases its admission slot once it is done.
+
+    The slot is released however the response ends, including when the
+    client disconnects before the body generator is first iterated (and so
+    before any ``finally`` in it could run).
+    """
+
+    def __init__(
+        self, content: AsyncIterator[str], release: Callable[[], None], **kwargs: Any
+    ):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+
+class QueryRequest(BaseModel):
+    query: str
+    priority: str = "interactive"
+    # Continues the conversation of an earlier request with the same id
+    session_id: Optional[str] = None
+
+
+def _priority(request: QueryRequest) -> int:
+    if request.priority not in SERVICE_PRIORITIES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"priority must be one of {sorted(SERVICE_PRIORITIES)}",
+        )
+    return SERVICE_PRIORITIES[request.priority]
+
+
+async def _qa_chain() -> Any:
+    from components.qa_chain import init_qa_chain
+
+    return await asyncio.to_thread(init_qa_chain)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    start_warmup()
+    yield
+
+
+def create_app(controller: Optional[AdmissionController] = None) -> FastAPI:
+    app = FastAPI(title="Medical RAG query service", lifespan=lifespan)
+    app.state.admission = controller or AdmissionController()
+
+    @app.exception_handler(Overloaded)
+    async def overloaded(request: Request, exc: Overloaded) -> JSONResponse:
+        return JSONResponse(
+            {"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"}
+        )
+
+    @app.get("/health")
+    async def health() -> Dict[str, Any]:
+        health = {
+            "state": readiness.state,
+            "startup": readiness.timings,
+            "admission": app.state.admission.stats(),
+        }
+        if INDEX_SNAPSHOT:
+            from components.snapshots import serving
+
+            health["index_snapshot"] = serving.info and serving.info.name
+        return health
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> str:
+        return registry.render_prometheus()
+
+    @app.post("/query")
+    async def query(request: QueryRequest) -> Dict[str, Any]:
+        from components.llm import OllamaLLM
+        from components.qa_chain import aprocess_query
+
+        async with app.state.admission.admit(_priority(request)):
+            response = await aprocess_query(
+                await _qa_chain(), request.query, OllamaLLM(), request.session_id
+            )
+        return {
+            "answer": response["answer"],
+            "sources": [
+                getattr(doc, "metadata", doc) for doc in response.get("sources", [])
+            ],
+        }
+
+    @app.post("/query/stream")
+    async def query_stream(request: QueryRequest) -> StreamingResponse:
+        from components.llm import OllamaLLM
+        from components.qa_chain import astream_query
+
+        admission = app.state.admission
+        # Admit before responding so rejections still get a 503 status
+        await admission.acquire(_priority(request))
+        try:
+            qa_chain = await _qa_chain()
+        except BaseException:
+            admission.release()
+            raise
+
+        return AdmittedStreamingResponse(
+            astream_query(qa_chain, request.query, OllamaLLM(), request.session_id),
+            admission.release,
+            media_type="text/plain; charset=utf-8",
+        )
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    logging.basicConfig(
+        level=LOGGING_LEVEL, format=LOGGING_FORMAT, handlers=[logging.StreamHandler()]
+    )
+    uvicorn.run(app, host=SERVICE_HOST, port=SERVICE_PORT)
@@ -0,0 +1,454 @@
+"""Versioned, prebuilt index snapshots served read-only and swapped atomically.
+
+    python -m components.snapshots build [--name NAME] [--base NAME] [--activate]
+    python -m components.snapshots list
+    python -m components.snapshots activate NAME
+
+A snapshot is a directory under ``SNAPSHOT_DIR`` holding the Chroma data, the
+index manifest with its BM25 and MinHash side files, and ``snapshot.json``
+(embedding model, document count and a SHA-256 of every file). ``CURRENT``
+names the snapshot that ``INDEX_SNAPSHOT=current`` serves. Servers open a
+private copy of a snapshot's Chroma data (``.serving-*``), because Chroma
+rewrites its index files when it replays its log on open.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+import chromadb
+from chromadb.config import Settings
+from langchain_community.vectorstores import Chroma
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+from components.metrics import registry
+from components.vectorstore import get_embeddings, index_version, load_manifest
+from components.config import (
+    SNAPSHOT_DIR,
+    SNAPSHOT_POLL_INTERVAL,
+    VECTORSTORE_COLLECTION_NAME,
+    VECTORSTORE_MODEL_NAME,
+)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "snapshot.json"
+CURRENT_FILE = "CURRENT"
+CHROMA_DIR = "chroma"
+MANIFEST_FILE = "index_manifest.json"
+SERVING_PREFIX = ".serving-"
+
+
+class SnapshotError(Exception):
+    """Raised for missing, incomplete or incompatible snapshots."""
+
+
+@dataclass
+class SnapshotInfo:
+    name: str
+    path: str
+    created: float
+    embedding_model: str
+    collection: str
+    documents: int
+    checksums: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def chroma_path(self) -> str:
+        return os.path.join(self.path, CHROMA_DIR)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST_FILE)
+
+
+def _checksums(directory: str) -> Dict[str, str]:
+    checksums = {}
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            relpath = os.path.relpath(path, directory)
+            if relpath == SNAPSHOT_FILE:
+                continue
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            checksums[relpath] = digest.hexdigest()
+    return checksums
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _client(path: str, allow_reset: bool = False) -> chromadb.ClientAPI:
+    return chromadb.PersistentClient(
+        path=path,
+        settings=Settings(anonymized_telemetry=False, allow_reset=allow_reset),
+    )
+
+
+def _release(client: chromadb.ClientAPI, path: str) -> None:
+    """Close a serving copy's Chroma client and delete the copy."""
+    try:
+        client.reset()
+    except Exception as e:
+        logger.warning(f"Could not reset Chroma client for {path}: {str(e)}")
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _remove_stale_copies(root: str) -> None:
+    """Delete serving copies left behind by server processes that have exited."""
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        if not name.startswith(SERVING_PREFIX):
+            continue
+        try:
+            os.kill(int(name.split("-")[1]), 0)
+        except (IndexError, ValueError, ProcessLookupError):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        except PermissionError:
+            pass
+
+
+def read_snapshot(name: str, root: str = SNAPSHOT_DIR) -> SnapshotInfo:
+    path = os.path.join(root, name)
+    try:
+        with open(os.path.join(path, SNAPSHOT_FILE), encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        raise SnapshotError(f"No snapshot named {name!r} in {root}")
+    return SnapshotInfo(path=path, **data)
+
+
+def verify_snapshot(name: str, root: str = SNAPSHOT_DIR) -> SnapshotInfo:
+    """Snapshot ``name`` after checking its embedding model and file checksums."""
+    info = read_snapshot(name, root)
+    if info.embedding_model != VECTORSTORE_MODEL_NAME:
+        raise SnapshotError(
+            f"Snapshot {name} was embedded with {info.embedding_model}, "
+            f"not {VECTORSTORE_MODEL_NAME}"
+        )
+    checksums = _checksums(info.path)
+    if checksums != info.checksums:
+        changed = sorted(
+            set(checksums.items()).symmetric_difference(info.checksums.items())
+        )
+        raise SnapshotError(
+            f"Snapshot {name} is corrupt or was modified: {changed[0][0]}"
+        )
+    return info
+
+
+def list_snapshots(root: str = SNAPSHOT_DIR) -> List[SnapshotInfo]:
+    if not os.path.isdir(root):
+        return []
+    snapshots = []
+    for name in os.listdir(root):
+        if os.path.isfile(os.path.join(root, name, SNAPSHOT_FILE)):
+            snapshots.append(read_snapshot(name, root))
+    return sorted(snapshots, key=lambda info: info.created)
+
+
+def current_snapshot(root: str = SNAPSHOT_DIR) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def activate_snapshot(name: str, root: str = SNAPSHOT_DIR) -> SnapshotInfo:
+    """Point ``CURRENT`` at ``name``; servers following it swap on their next poll."""
+    info = verify_snapshot(name, root)
+    _write_atomic(os.path.join(root, CURRENT_FILE), name)
+    logger.info(f"Activated index snapshot {name}")
+    return info
+
+
+def build_snapshot(
+    documents: Iterable[Any],
+    name: Optional[str] = None,
+    base: Optional[str] = None,
+    root: str = SNAPSHOT_DIR,
+    embeddings: Optional[Embeddings] = None,
+    failed: Optional[Set[str]] = None,
+) -> SnapshotInfo:
+    """Index ``documents`` into a new snapshot, starting from a copy of ``base``.
+
+    The snapshot is built in a hidden staging directory and renamed into place
+    only once it is complete, so a failed build never leaves a snapshot that
+    could be activated. With a ``base`` only new or changed documents are
+    embedded. Documents from the ``failed`` source URLs are not pruned.
+    """
+    from components.pipeline import IngestionPipeline
+
+    name = name or time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(root, name)
+    if os.path.exists(path):
+        raise SnapshotError(f"Snapshot {name} already exists")
+    staging = os.path.join(root, f".build-{name}")
+    shutil.rmtree(staging, ignore_errors=True)
+    if base:
+        shutil.copytree(
+            read_snapshot(base, root).path,
+            staging,
+            ignore=shutil.ignore_patterns(SNAPSHOT_FILE),
+        )
+    os.makedirs(staging, exist_ok=True)
+
+    vectorstore = Chroma(
+        client=_client(os.path.join(staging, CHROMA_DIR)),
+        collection_name=VECTORSTORE_COLLECTION_NAME,
+        embedding_function=embeddings or get_embeddings(),
+    )
+    manifest = load_manifest(vectorstore, os.path.join(staging, MANIFEST_FILE))
+    IngestionPipeline(vectorstore, manifest).run(documents, failed=failed)
+    manifest.save()
+    count = vectorstore._collection.count()
+
+    info = SnapshotInfo(
+        name=name,
+        path=path,
+        created=time.time(),
+        embedding_model=VECTORSTORE_MODEL_NAME,
+        collection=VECTORSTORE_COLLECTION_NAME,
+        documents=count,
+        checksums=_checksums(staging),
+    )
+    data = {k: v for k, v in asdict(info).items() if k != "path"}
+    _write_atomic(os.path.join(staging, SNAPSHOT_FILE), json.dumps(data, indent=2))
+    os.rename(staging, path)
+    logger.info(f"Built index snapshot {name} with {info.documents} documents")
+    return info
+
+
+class SwappableRetriever(BaseRetriever):
+    """Delegates to a replaceable retriever.
+
+    Each query reads ``current`` once, so a swap never affects queries that
+    are already running: they finish on the index they started with. The
+    replaced retriever's ``close`` callback runs once the last of them is done.
+    """
+
+    current: BaseRetriever
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _in_flight: Dict[int, int] = PrivateAttr(default_factory=dict)
+    _closing: Dict[int, Callable[[], None]] = PrivateAttr(default_factory=dict)
+
+    def swap(self, retriever: BaseRetriever, close: Callable[[], None]) -> None:
+        """Serve ``retriever`` and run ``close`` once the previous one is idle."""
+        with self._lock:
+            previous, self.current = self.current, retriever
+            if self._in_flight.get(id(previous)):
+                self._closing[id(previous)] = close
+                return
+        close()
+
+    @contextmanager
+    def _lease(self) -> Iterator[BaseRetriever]:
+        with self._lock:
+            retriever = self.current
+            key = id(retriever)
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        try:
+            yield retriever
+        finally:
+            close = None
+            with self._lock:
+                self._in_flight[key] -= 1
+                if not self._in_flight[key]:
+                    del self._in_flight[key]
+                    close = self._closing.pop(key, None)
+            if close is not None:
+                close()
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        with self._lease() as retriever:
+            return retriever.invoke(
+                query, config={"callbacks": run_manager.get_child()}, **kwargs
+            )
+
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun,
+        **kwargs: Any,
+    ) -> List[Document]:
+        with self._lease() as retriever:
+            return await retriever.ainvoke(
+                query, config={"callbacks": run_manager.get_child()}, **kwargs
+            )
+
+
+class ServingIndex:
+    """The snapshot being served, with blue/green swaps to newer snapshots.
+
+    A swap verifies the new snapshot, opens a private copy of it and builds
+    its retriever while the old one keeps serving, then replaces the
+    retriever in one assignment. The old copy is closed and deleted once its
+    in-flight queries have finished.
+    """
+
+    def __init__(self, root: str = SNAPSHOT_DIR):
+        self.root = root
+        self.info: Optional[SnapshotInfo] = None
+        self.retriever: Optional[SwappableRetriever] = None
+        self._build_retriever: Optional[Callable[[Any, str], BaseRetriever]] = None
+        self._close: Callable[[], None] = lambda: None
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+
+    def _resolve(self, name: str) -> str:
+        if name != "current":
+            return name
+        current = current_snapshot(self.root)
+        if current is None:
+            raise SnapshotError(f"No snapshot has been activated in {self.root}")
+        return current
+
+    def load(
+        self, name: str, build_retriever: Callable[[Any, str], BaseRetriever]
+    ) -> SwappableRetriever:
+        """Serve snapshot ``name`` (or ``"current"``) through the returned retriever.
+
+        ``build_retriever(vectorstore, manifest_path)`` creates the retriever for
+        each snapshot that is loaded.
+        """
+        self._build_retriever = build_retriever
+        _remove_stale_copies(self.root)
+        self.swap(self._resolve(name))
+        return self.retriever
+
+    def swap(self, name: str) -> SnapshotInfo:
+        with self._lock:
+            started = time.perf_counter()
+            info = verify_snapshot(name, self.root)
+            path = tempfile.mkdtemp(
+                prefix=f"{SERVING_PREFIX}{os.getpid()}-{name}-", dir=self.root
+            )
+            shutil.copytree(info.chroma_path, path, dirs_exist_ok=True)
+            client = _client(path, allow_reset=True)
+            try:
+                vectorstore = Chroma(
+                    client=client,
+                    collection_name=info.collection,
+                    embedding_function=get_embeddings(),
+                )
+                retriever = self._build_retriever(vectorstore, info.manifest_path)
+            except Exception:
+                _release(client, path)
+                raise
+            if self.retriever is None:
+                self.retriever = SwappableRetriever(current=retriever)
+            else:
+                self.retriever.swap(retriever, self._close)
+            self._close = lambda: _release(client, path)
+            previous, self.info = self.info, info
+            registry.inc("index_swaps_total")
+            logger.info(
+                f"Serving index snapshot {name} ({info.documents} documents"
+                + (f", was {previous.name}" if previous else "")
+                + f") after {time.perf_counter() - started:.2f}s"
+            )
+            return info
+
+    def poll(self) -> None:
+        """Swap to the ``CURRENT`` snapshot if it changed."""
+        name = current_snapshot(self.root)
+        if name and self.info and name != self.info.name:
+            try:
+                self.swap(name)
+            except Exception as e:
+                logger.error(f"Could not swap to index snapshot {name}: {str(e)}")
+
+    def watch(self, interval: float = SNAPSHOT_POLL_INTERVAL) -> None:
+        if self._watcher is not None:
+            return
+
+        def run() -> None:
+            while True:
+                time.sleep(interval)
+                self.poll()
+
+        self._watcher = threading.Thread(
+            target=run, name="snapshot-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def version(self) -> int:
+        """Changes whenever a different snapshot (or the live index) is served."""
+        if self.info is None:
+            return index_version()
+        return index_version(self.info.manifest_path)
+
+
+serving = ServingIndex()
+
+
+def main() -> None:
+    from components.config import LOGGING_FORMAT, LOGGING_LEVEL
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="fetch, index and save a snapshot")
+    build.add_argument("--name")
+    build.add_argument("--base", help="snapshot to start from (default: CURRENT)")
+    build.add_argument("--activate", action="store_true")
+    commands.add_parser("list")
+    activate = commands.add_parser("activate")
+    activate.add_argument("name")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=LOGGING_LEVEL, format=LOGGING_FORMAT)
+    if args.command == "build":
+        from components.data_loader import iter_medical_data
+
+        failed: Set[str] = set()
+        info = build_snapshot(
+            iter_medical_data(parse=False, failed=failed),
+            name=args.name,
+            base=args.base or current_snapshot(),
+            failed=failed,
+        )
+        if args.activate:
+            activate_snapshot(info.name)
+    elif args.command == "list":
+        current = current_snapshot()
+        for info in list_snapshots():
+            marker = "*" if info.name == current else " "
+            print(
+                f"{marker} {info.name}  {info.documents:>8} documents  "
+                f"{info.embedding_model}"
+            )
+    else:
+        activate_snapshot(args.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,28 @@
+import hashlib
+import json
 import logging
-from typing import Dict, List
+import os
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import Embeddings
 import streamlit as st
+from components.bm25 import BM25Index
+from components.chunking import chunk_documents, parent_id
+from components.dedup import MinHashIndex
+from components.embeddings import CachedEmbeddings
 from components.config import (
+    BM25_INDEX_FILENAME,
+    DEDUP_ENABLED,
+    DEDUP_INDEX_FILENAME,
+    DEFAULT_PARTITION,
+    HYBRID_RETRIEVAL_ENABLED,
+    MODEL_SERVER_ADDRESS,
+    SOURCE_PARTITIONS,
     VECTORSTORE_CACHE_FOLDER,
     VECTORSTORE_COLLECTION_NAME,
+    VECTORSTORE_MANIFEST_PATH,
     VECTORSTORE_MODEL_NAME,
     VECTORSTORE_PERSIST_DIR,
 )
@@ -13,22 +30,119 @@ from components.config import (
 logger = logging.getLogger(__name__)
 
 
-@st.cache_resource(show_spinner=False)
-def init_vectorstore() -> Chroma:
-    logger.info("Initializing vector store")
+def document_id(document: Dict[str, Dict[str, str]]) -> str:
+    """Deterministic ID built from the source URL plus a hash of the text."""
+    content_hash = hashlib.sha256(document["text"].encode("utf-8")).hexdigest()[:16]
+    return f"{parent_id(document['metadata']['source'])}-{content_hash}"
+
+
+def partition_metadata(source: str) -> Dict[str, str]:
+    """``partition`` and ``doc_type`` metadata for a document from ``source``."""
+    return SOURCE_PARTITIONS.get(urlparse(source).netloc, DEFAULT_PARTITION)
+
+
+class IndexManifest:
+    """Records which document IDs (and their sources) are in the collection.
+
+    ``duplicates`` maps near-duplicate documents that were not indexed to
+    their canonical document and source. The BM25 index for hybrid retrieval
+    and the MinHash signatures for deduplication live next to the manifest and
+    are updated and saved together with it. ``partitioned`` is false for
+    collections indexed before documents carried partition metadata.
+    """
+
+    def __init__(self, path: str = VECTORSTORE_MANIFEST_PATH):
+        self.path = path
+        self.entries: Dict[str, str] = {}
+        self.duplicates: Dict[str, Dict[str, str]] = {}
+        self.version = 0
+        self.partitioned = True
+        directory = os.path.dirname(path)
+        self.lexical_path = os.path.join(directory, BM25_INDEX_FILENAME)
+        self.signatures_path = os.path.join(directory, DEDUP_INDEX_FILENAME)
+        self._lexical: Optional[BM25Index] = None
+        self._signatures: Optional[MinHashIndex] = None
+
+    @property
+    def lexical(self) -> BM25Index:
+        if self._lexical is None:
+            self._lexical = BM25Index.load(self.lexical_path)
+        return self._lexical
+
+    @property
+    def signatures(self) -> MinHashIndex:
+        if self._signatures is None:
+            self._signatures = MinHashIndex.load(self.signatures_path)
+        return self._signatures
+
+    @classmethod
+    def load(cls, path: str = VECTORSTORE_MANIFEST_PATH) -> "IndexManifest":
+        manifest = cls(path)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            manifest.entries = data.get("entries", {})
+            manifest.duplicates = data.get("duplicates", {})
+            manifest.version = data.get("version", 0)
+            manifest.partitioned = data.get("partitioned", False)
+        return manifest
+
+    def save(self) -> None:
+        if self._lexical is not None and (
+            self._lexical.dirty or not os.path.exists(self.lexical_path)
+        ):
+            self._lexical.save(self.lexical_path)
+        if self._signatures is not None and (
+            self._signatures.dirty or not os.path.exists(self.signatures_path)
+        ):
+            self._signatures.save(self.signatures_path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": self.version,
+                    "entries": self.entries,
+                    "duplicates": self.duplicates,
+                    "partitioned": self.partitioned,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.path)
+
+
+def index_version(path: str = VECTORSTORE_MANIFEST_PATH) -> int:
+    """Cheap change marker for the collection: the manifest's modification time."""
     try:
-        embeddings = HuggingFaceEmbeddings(
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def load_embeddings() -> CachedEmbeddings:
+    return CachedEmbeddings(
+        HuggingFaceEmbeddings(
             model_name=VECTORSTORE_MODEL_NAME, cache_folder=VECTORSTORE_CACHE_FOLDER
-        )
+        ),
+        VECTORSTORE_MODEL_NAME,
+    )
 
-        logger.info("Clearing existing data in the vector store...")
-        Chroma(
-            collection_name=VECTORSTORE_COLLECTION_NAME,
-            embedding_function=embeddings,
-            persist_directory=VECTORSTORE_PERSIST_DIR,
-        ).delete_collection()
 
-        logger.info("Vector store initialized successfully and data cleared")
+@st.cache_resource(show_spinner=False)
+def get_embeddings() -> Embeddings:
+    if MODEL_SERVER_ADDRESS:
+        from components.model_server import ModelClient, RemoteEmbeddings
+
+        logger.info(f"Using embeddings from model server at {MODEL_SERVER_ADDRESS}")
+        return RemoteEmbeddings(ModelClient(MODEL_SERVER_ADDRESS))
+    return load_embeddings()
+
+
+@st.cache_resource(show_spinner=False)
+def init_vectorstore() -> Chroma:
+    logger.info("Initializing vector store")
+    try:
+        embeddings = get_embeddings()
 
         vectorstore = Chroma(
             collection_name=VECTORSTORE_COLLECTION_NAME,
@@ -36,6 +150,7 @@ def init_vectorstore() -> Chroma:
             persist_directory=VECTORSTORE_PERSIST_DIR,
         )
 
+        logger.info("Vector store initialized successfully")
         return vectorstore
 
     except Exception as e:
@@ -43,14 +158,280 @@ def init_vectorstore() -> Chroma:
         raise
 
 
-def index_data(vectorstore: Chroma, documents: List[Dict[str, Dict[str, str]]]) -> None:
+def load_manifest(
+    vectorstore: Chroma, path: str = VECTORSTORE_MANIFEST_PATH
+) -> IndexManifest:
+    manifest = IndexManifest.load(path)
+    if manifest.entries and vectorstore._collection.count() == 0:
+        logger.warning("Collection is empty but manifest is not, reindexing all")
+        manifest.entries = {}
+    manifest.duplicates = {
+        doc_id: duplicate
+        for doc_id, duplicate in manifest.duplicates.items()
+        if duplicate["canonical"] in manifest.entries
+    }
+    if HYBRID_RETRIEVAL_ENABLED and len(manifest.lexical) != len(manifest.entries):
+        rebuild_lexical_index(vectorstore, manifest)
+    if DEDUP_ENABLED and _signatures_stale(manifest):
+        rebuild_signatures(vectorstore, manifest)
+    if not manifest.partitioned:
+        tag_partitions(vectorstore, manifest)
+    return manifest
+
+
+def _signatures_stale(manifest: IndexManifest) -> bool:
+    # Short documents have no signature, so the counts need not match
+    if manifest.entries and not os.path.exists(manifest.signatures_path):
+        return True
+    return any(
+        doc_id not in manifest.entries
+        for doc_id in manifest.signatures.doc_ids
+        if doc_id
+    )
+
+
+def _stored_texts(
+    vectorstore: Chroma, ids: List[str], batch_size: int = 1000
+) -> Iterator[Tuple[List[str], List[str]]]:
+    for start in range(0, len(ids), batch_size):
+        found = vectorstore.get(
+            ids=ids[start : start + batch_size], include=["documents"]
+        )
+        yield found["ids"], found["documents"]
+
+
+def rebuild_lexical_index(vectorstore: Chroma, manifest: IndexManifest) -> None:
+    """Rebuild the BM25 index from the texts stored in the collection."""
+    logger.info(f"Rebuilding BM25 index for {len(manifest.entries)} documents")
+    manifest._lexical = BM25Index()
+    for ids, texts in _stored_texts(vectorstore, list(manifest.entries)):
+        manifest.lexical.add(ids, texts)
+    manifest.save()
+
+
+def rebuild_signatures(vectorstore: Chroma, manifest: IndexManifest) -> None:
+    """Rebuild the MinHash signatures from the texts stored in the collection."""
+    logger.info(f"Rebuilding MinHash signatures for {len(manifest.entries)} documents")
+    manifest._signatures = MinHashIndex()
+    for ids, texts in _stored_texts(vectorstore, list(manifest.entries)):
+        for doc_id, text in zip(ids, texts):
+            signature = manifest.signatures.signature(text)
+            if signature is not None:
+                manifest.signatures.add(doc_id, signature)
+    manifest.save()
+
+
+def tag_partitions(
+    vectorstore: Chroma, manifest: IndexManifest, batch_size: int = 1000
+) -> None:
+    """Add partition metadata to documents indexed before it was written."""
+    logger.info(f"Tagging {len(manifest.entries)} documents with their partition")
+    ids = list(manifest.entries)
+    for start in range(0, len(ids), batch_size):
+        found = vectorstore._collection.get(
+            ids=ids[start : start + batch_size], include=["metadatas"]
+        )
+        metadatas = [
+            {**metadata, **partition_metadata(metadata["source"])}
+            for metadata in found["metadatas"]
+        ]
+        if metadatas:
+            vectorstore._collection.update(ids=found["ids"], metadatas=metadatas)
+    manifest.partitioned = True
+    manifest.save()
+
+
+def find_duplicates(
+    manifest: IndexManifest, documents: List[Tuple[str, Dict]]
+) -> List[Tuple[str, Dict, Optional[str]]]:
+    """Pair each ``(id, document)`` with the canonical ID it nearly duplicates.
+
+    Documents without a near-duplicate (canonical ``None``) are added to the
+    signature index, so later documents in the same run dedupe against them.
+    Chunks of the same source are never duplicates of each other.
+    """
+    if not DEDUP_ENABLED:
+        return [(doc_id, doc, None) for doc_id, doc in documents]
+    return [
+        (
+            doc_id,
+            doc,
+            manifest.signatures.find_or_add(
+                doc_id, doc["text"], ignore_prefix=doc_id.split("-")[0]
+            ),
+        )
+        for doc_id, doc in documents
+    ]
+
+
+def merge_duplicates(
+    vectorstore: Chroma,
+    manifest: IndexManifest,
+    duplicates: List[Tuple[str, Dict, str]],
+    save: bool = True,
+) -> None:
+    """Record skipped duplicates and add their sources to the canonical metadata.
+
+    The canonical documents must already be in the collection. Their
+    ``sources`` metadata lists every source URL of the text, space-separated.
+    With ``save=False`` the caller is responsible for saving the manifest.
+    """
+    if not duplicates:
+        return
+    merged: Dict[str, List[str]] = {}
+    for doc_id, doc, canonical in duplicates:
+        source = doc["metadata"]["source"]
+        manifest.duplicates[doc_id] = {"canonical": canonical, "source": source}
+        merged.setdefault(canonical, []).append(source)
+
+    found = vectorstore._collection.get(ids=list(merged), include=["metadatas"])
+    metadatas = []
+    for canonical, metadata in zip(found["ids"], found["metadatas"]):
+        sources = (metadata.get("sources") or metadata["source"]).split()
+        sources += [s for s in dict.fromkeys(merged[canonical]) if s not in sources]
+        metadatas.append({**metadata, "sources": " ".join(sources)})
+    if metadatas:
+        vectorstore._collection.update(ids=found["ids"], metadatas=metadatas)
+    manifest.version += 1
+    if save:
+        manifest.save()
+
+
+def upsert_documents(
+    vectorstore: Chroma,
+    manifest: IndexManifest,
+    ids: List[str],
+    documents: List[Dict[str, Dict[str, str]]],
+    embeddings: Optional[List[List[float]]] = None,
+    save: bool = True,
+) -> None:
+    """Write documents (optionally pre-embedded) and record them in the manifest.
+
+    Each document's metadata gains the ``partition`` and ``doc_type`` of its
+    source, which routed retrieval filters on. With ``save=False`` the caller
+    is responsible for saving the manifest.
+    """
+    texts = [doc["text"] for doc in documents]
+    metadatas = [
+        {**doc["metadata"], **partition_metadata(doc["metadata"]["source"])}
+        for doc in documents
+    ]
+    if embeddings is None:
+        vectorstore.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+    else:
+        vectorstore._collection.upsert(
+            ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas
+        )
+
+    if HYBRID_RETRIEVAL_ENABLED:
+        manifest.lexical.add(ids, texts)
+    for doc_id, doc in zip(ids, documents):
+        manifest.entries[doc_id] = doc["metadata"]["source"]
+    manifest.version += 1
+    if save:
+        manifest.save()
+
+
+def _prunable(source: str, hosts: Set[str], failed: Set[str]) -> bool:
+    parts = urlparse(source)
+    root = f"{parts.scheme}://{parts.netloc}/"
+    return parts.netloc in hosts and source not in failed and root not in failed
+
+
+def prune_documents(
+    vectorstore: Chroma,
+    manifest: IndexManifest,
+    current_ids: Set[str],
+    hosts: Set[str],
+    failed: Optional[Set[str]] = None,
+) -> List[str]:
+    """Delete indexed documents from ``hosts`` that are not in ``current_ids``.
+
+    Restricting to hosts seen in this run keeps a source that failed to fetch
+    from wiping its previously indexed documents. Likewise documents whose
+    source URL is in ``failed`` (a transient error, a block or a circuit
+    breaker skip) are kept; a failed host root (``https://host/``) keeps
+    every document from that host.
+    """
+    failed = failed or set()
+    vanished = [
+        doc_id
+        for doc_id, source in manifest.entries.items()
+        if doc_id not in current_ids and _prunable(source, hosts, failed)
+    ]
+    if vanished:
+        vectorstore.delete(ids=vanished)
+        if HYBRID_RETRIEVAL_ENABLED:
+            manifest.lexical.delete(vanished)
+        if DEDUP_ENABLED:
+            manifest.signatures.remove(vanished)
+        for doc_id in vanished:
+            del manifest.entries[doc_id]
+
+    # Duplicates of a deleted canonical are indexed again on the next run
+    stale = [
+        doc_id
+        for doc_id, duplicate in manifest.duplicates.items()
+        if duplicate["canonical"] not in manifest.entries
+        or (doc_id not in current_ids and _prunable(duplicate["source"], hosts, failed))
+    ]
+    for doc_id in stale:
+        del manifest.duplicates[doc_id]
+    if vanished or stale:
+        manifest.version += 1
+        manifest.save()
+    return vanished
+
+
+def index_data(
+    vectorstore: Chroma,
+    documents: List[Dict[str, Dict[str, str]]],
+    manifest: Optional[IndexManifest] = None,
+    prune: bool = True,
+    failed: Optional[Set[str]] = None,
+) -> None:
+    """Upsert new or changed documents and, if ``prune``, delete vanished ones.
+
+    Articles (documents with ``sections``) are chunked first. Documents from
+    the source URLs in ``failed`` (pages that could not be fetched or parsed,
+    see ``fetch_medical_data``) are not pruned.
+    """
     logger.info("Indexing data into vector store")
     try:
-        texts: List[str] = [doc["text"] for doc in documents]
-        metadatas: List[Dict[str, str]] = [doc["metadata"] for doc in documents]
+        manifest = manifest or load_manifest(vectorstore)
 
-        vectorstore.add_texts(texts=texts, metadatas=metadatas)
-        logger.info(f"Successfully indexed {len(texts)} documents")
+        current: Dict[str, Dict[str, Dict[str, str]]] = {}
+        for doc in chunk_documents(documents):
+            current.setdefault(document_id(doc), doc)
+
+        new_ids = [
+            doc_id
+            for doc_id in current
+            if doc_id not in manifest.entries and doc_id not in manifest.duplicates
+        ]
+        checked = find_duplicates(manifest, [(i, current[i]) for i in new_ids])
+        kept = [(doc_id, doc) for doc_id, doc, canonical in checked if not canonical]
+        if kept:
+            upsert_documents(
+                vectorstore, manifest, [i for i, _ in kept], [d for _, d in kept]
+            )
+        duplicates = [item for item in checked if item[2]]
+        merge_duplicates(vectorstore, manifest, duplicates)
+
+        vanished: List[str] = []
+        if prune and current:
+            hosts = {
+                urlparse(doc["metadata"]["source"]).netloc for doc in current.values()
+            }
+            vanished = prune_documents(
+                vectorstore, manifest, set(current), hosts, failed
+            )
+
+        logger.info(
+            f"Successfully indexed {len(kept)} documents "
+            f"({len(current) - len(new_ids)} unchanged, "
+            f"{len(duplicates)} near-duplicates, {len(vanished)} deleted)"
+        )
 
     except Exception as e:
         logger.error(f"Error indexing data: {str(e)}")
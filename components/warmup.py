@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from components.config import (
+    DEFAULT_MODEL_NAME,
+    INDEX_SNAPSHOT,
+    MEDLLAMA_MODEL_NAME,
+    MODEL_SERVER_ADDRESS,
+    QUERY_ROUTER,
+    ROUTER_BART_FALLBACK,
+    SCHEDULER_RESIDENT_MODELS,
+    WARMUP_ENABLED,
+)
+from components.metrics import registry
+from components.scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Readiness:
+    """Startup progress shared between the warm-up thread and the UI.
+
+    ``state`` is one of starting, warming, ready, degraded or lazy (warm-up
+    disabled: the service is ready and loads models on the first query).
+    """
+
+    state: str = "starting"
+    current_step: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state in ("ready", "degraded", "lazy")
+
+    def summary(self) -> str:
+        steps = ", ".join(f"{k} {v:.2f}s" for k, v in self.timings.items())
+        return f"{self.state} ({steps})" if steps else self.state
+
+
+readiness = Readiness()
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def _load_modules() -> None:
+    import components.qa_chain  # noqa: F401 - pulls in langchain, chromadb
+
+
+def _warm_embedder() -> None:
+    from components.vectorstore import get_embeddings
+
+    get_embeddings().embed_query("warm-up")
+
+
+def _warm_router() -> None:
+    from components.qa_chain import get_query_router, get_zero_shot_classifier
+
+    if MODEL_SERVER_ADDRESS:
+        get_query_router().is_medical("warm-up")
+        return
+    if QUERY_ROUTER == "zero_shot" or ROUTER_BART_FALLBACK:
+        get_zero_shot_classifier()
+    if QUERY_ROUTER != "zero_shot":
+        get_query_router().centroids
+
+
+def _warm_vectorstore() -> None:
+    from components.qa_chain import init_qa_chain
+    from components.vectorstore import init_vectorstore
+
+    if not INDEX_SNAPSHOT:
+        init_vectorstore()._collection.count()
+    init_qa_chain()
+
+
+def loaded_models() -> List[str]:
+    import ollama
+
+    return [model.model for model in ollama.ps().models]
+
+
+def preload_model(model: str) -> None:
+    """Load ``model`` into Ollama's memory unless it is already resident."""
+    import ollama
+
+    if model in loaded_models():
+        logger.info(f"Ollama model {model} already loaded")
+        return
+    with scheduler.slot(model) as keep_alive:
+        ollama.generate(model=model, prompt="", keep_alive=keep_alive)
+
+
+def warmup_steps() -> List[Tuple[str, Callable[[], None]]]:
+    # Preloading more models than the host can hold would only evict them again
+    models = [MEDLLAMA_MODEL_NAME, DEFAULT_MODEL_NAME][:SCHEDULER_RESIDENT_MODELS]
+    return [
+        ("imports", _load_modules),
+        ("embedder", _warm_embedder),
+        ("router", _warm_router),
+        ("vectorstore", _warm_vectorstore),
+    ] + [(f"ollama:{model}", partial(preload_model, model)) for model in models]
+
+
+def run_warmup(state: Readiness = readiness) -> Readiness:
+    state.state = "warming"
+    for name, step in warmup_steps():
+        state.current_step = name
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.error(f"Warm-up step {name} failed: {str(e)}")
+            state.errors[name] = str(e)
+        state.timings[name] = time.perf_counter() - started
+        registry.observe("startup_step_seconds", state.timings[name], step=name)
+
+    state.current_step = None
+    state.finished = time.perf_counter()
+    state.state = "degraded" if state.errors else "ready"
+    logger.info(
+        f"Warm-up finished in {state.finished - state.started:.2f}s: {state.summary()}"
+    )
+    return state
+
+
+def start_warmup() -> Readiness:
+    """Start the background warm-up once per process and return its readiness."""
+    global _thread
+    with _lock:
+        if not WARMUP_ENABLED:
+            if readiness.state == "starting":
+                readiness.state = "lazy"
+                readiness.finished = time.perf_counter()
+        elif _thread is None:
+            _thread = threading.Thread(target=run_warmup, name="warmup", daemon=True)
+            _thread.start()
+    return readiness
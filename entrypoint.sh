@@ -6,10 +6,14 @@ python -m pytest -s -v --durations=0
 
 echo "Formatting Python code with Black and checking with Flake8..."
 black .
-flake8 --max-line-length=88 --ignore=E501,F841,W291,F401 .
+flake8 --max-line-length=88 --ignore=E501,F841,W291,F401,E203,W503 .
 
-echo "Fetching and indexing medical data before starting Streamlit..."
-python -c "from components.data_loader import fetch_medical_data; data = fetch_medical_data(); print(f'Fetched {len(data)} records.')"
+# With a query service the index belongs to it (and the ingest service that
+# runs before it); only index here when queries are answered in-process.
+if [ -z "$QUERY_SERVICE_URL" ]; then
+    echo "Fetching and indexing medical data before starting Streamlit..."
+    python -m components.pipeline
+fi
 
 export STREAMLIT_EMAIL=""
 
@@ -1,10 +1,18 @@
 import logging
+import uuid
+from typing import Iterator
 
+import requests
 import streamlit as st
 
-from components.qa_chain import init_qa_chain, process_query
-from components.llm import OllamaLLM
-from components.config import LOGGING_FORMAT, LOGGING_LEVEL
+from components.config import (
+    LOGGING_FORMAT,
+    LOGGING_LEVEL,
+    QUERY_SERVICE_URL,
+    REQUEST_TIMEOUT,
+)
+from components.metrics import start_metrics_server
+from components.warmup import Readiness, start_warmup
 
 logging.basicConfig(
     level=LOGGING_LEVEL, format=LOGGING_FORMAT, handlers=[logging.StreamHandler()]
@@ -25,12 +33,44 @@ st.markdown(
 )
 
 
-def display_response(answer: str) -> None:
-
-    st.chat_message("ai").write(answer)
+def show_readiness(readiness: Readiness) -> None:
+    with st.sidebar:
+        if not readiness.ready:
+            step = readiness.current_step or "starting"
+            st.info(f"Warming up models ({step})...")
+        elif readiness.errors:
+            st.warning(f"Started with errors in: {', '.join(readiness.errors)}")
+        for step, seconds in readiness.timings.items():
+            st.caption(f"{step}: {seconds:.2f}s")
+
+
+def stream_from_service(user_input: str, session_id: str) -> Iterator[str]:
+    """Stream an answer from the query service (``python -m components.service``)."""
+    with requests.post(
+        f"{QUERY_SERVICE_URL}/query/stream",
+        json={"query": user_input, "priority": "interactive", "session_id": session_id},
+        stream=True,
+        timeout=REQUEST_TIMEOUT,
+    ) as response:
+        if response.status_code == 503:
+            yield "The service is busy right now, please try again in a moment."
+            return
+        response.raise_for_status()
+        yield from response.iter_content(chunk_size=None, decode_unicode=True)
+
+
+def stream_in_process(user_input: str, session_id: str) -> Iterator[str]:
+    from components.llm import OllamaLLM
+    from components.qa_chain import init_qa_chain, stream_query
+
+    with st.spinner("Generating response..."):
+        qa_chain = init_qa_chain()
+    yield from stream_query(qa_chain, user_input, OllamaLLM(), session_id)
 
 
 def main() -> None:
+    if not QUERY_SERVICE_URL:
+        show_readiness(start_warmup())
     st.markdown(
         "<h1 style='text-align: center; color: white;'>Medical RAG Chat System</h1>",
         unsafe_allow_html=True,
@@ -38,6 +78,8 @@ def main() -> None:
 
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
 
     for message in st.session_state.messages:
         st.chat_message(message["role"]).write(message["content"])
@@ -48,20 +90,19 @@ def main() -> None:
         st.chat_message("human").write(user_input)
         st.session_state.messages.append({"role": "human", "content": user_input})
 
-        qa_chain = init_qa_chain()
-        llm_instance = OllamaLLM()
-        with st.spinner("Generating response..."):
-            try:
-                response = process_query(qa_chain, user_input, llm_instance)
-                display_response(response["answer"])
-                st.session_state.messages.append(
-                    {"role": "ai", "content": response["answer"]}
-                )
-            except Exception as e:
-                logger.error(f"Error generating response: {str(e)}")
-                st.error("Error generating response")
+        stream = stream_from_service if QUERY_SERVICE_URL else stream_in_process
+        try:
+            answer = st.chat_message("ai").write_stream(
+                stream(user_input, st.session_state.session_id)
+            )
+            st.session_state.messages.append({"role": "ai", "content": answer})
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            st.error("Error generating response")
 
 
 if __name__ == "__main__":
     logger.info("Starting application")
+    if not QUERY_SERVICE_URL:
+        start_metrics_server()
     main()
@@ -18,3 +18,17 @@ def sample_documents():
         {"text": "Sample text 1", "metadata": {"source": "doc1", "page": "1"}},
         {"text": "Sample text 2", "metadata": {"source": "doc2", "page": "2"}},
     ]
+
+
+@pytest.fixture(autouse=True)
+def trace_path(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr("components.metrics.METRICS_TRACE_PATH", str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def http_cache_path(tmp_path, monkeypatch):
+    path = tmp_path / "http_cache.sqlite"
+    monkeypatch.setattr("components.data_loader.HTTP_CACHE_PATH", str(path))
+    return path
@@ -0,0 +1,191 @@
+import asyncio
+import time
+import ollama
+import pytest
+from typing import List
+from unittest.mock import patch
+from langchain.chains import RetrievalQA
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.retrievers import BaseRetriever
+from benchmarks.fake_ollama import FakeOllamaServer
+from components import aio
+from components.llm import LlamaMedLLM, OllamaLLM
+from components.metrics import span
+from components.config import CONVERSATION_HISTORY_TOKENS
+from components.conversation import Turn, conversations
+from components.qa_chain import (
+    SemanticCache,
+    aprocess_query,
+    format_medical_prompt,
+    process_query,
+)
+
+
+class SlowRetriever(BaseRetriever):
+    delay: float = 0.2
+    calls: int = 0
+    history_tokens: List[int] = []
+
+    def _get_relevant_documents(self, query: str, **kwargs) -> List[Document]:
+        self.calls += 1
+        self.history_tokens.append(kwargs.get("history_tokens", 0))
+        time.sleep(self.delay)
+        return [Document(page_content="Metformin is used for type 2 diabetes.")]
+
+
+def slow_classifier(medical: bool, delay: float = 0.2):
+    def is_medical_query(query: str) -> bool:
+        time.sleep(delay)
+        return medical
+
+    return is_medical_query
+
+
+@pytest.fixture
+def fake_ollama():
+    with FakeOllamaServer(
+        tokens_per_sec=10_000, prompt_tokens_per_sec=100_000, answer_tokens=3
+    ) as fake:
+        with (
+            patch(
+                "components.llm.get_async_client",
+                return_value=ollama.AsyncClient(host=fake.url),
+            ),
+            patch("components.qa_chain.get_semantic_cache", return_value=None),
+        ):
+            yield fake
+
+
+@pytest.fixture
+def qa_chain():
+    return RetrievalQA.from_chain_type(
+        llm=LlamaMedLLM(), chain_type="stuff", retriever=SlowRetriever()
+    )
+
+
+class TestProcessQuery:
+    def test_retrieval_overlaps_classification(self, fake_ollama, qa_chain):
+        with patch("components.qa_chain.is_medical_query", slow_classifier(True)):
+            started = time.perf_counter()
+            response = process_query(qa_chain, "Metformin dose?", OllamaLLM())
+            elapsed = time.perf_counter() - started
+
+        assert response == {"answer": "token0 token1 token2", "sources": []}
+        assert list(fake_ollama.loaded) == ["medllama2:latest"]
+        assert elapsed < 0.35
+
+    def test_general_query_discards_retrieval(self, fake_ollama, qa_chain):
+        with patch("components.qa_chain.is_medical_query", slow_classifier(False)):
+            response = process_query(qa_chain, "Hello", OllamaLLM())
+
+        assert response["answer"] == "token0 token1 token2"
+        assert list(fake_ollama.loaded) == ["deepseek-r1:latest"]
+
+    def test_concurrent_queries_do_not_serialize(self, fake_ollama, qa_chain):
+        async def run_all():
+            return await asyncio.gather(
+                *(aprocess_query(qa_chain, f"q{i}", OllamaLLM()) for i in range(4))
+            )
+
+        with patch("components.qa_chain.is_medical_query", slow_classifier(False)):
+            started = time.perf_counter()
+            responses = aio.run(run_all())
+            elapsed = time.perf_counter() - started
+
+        assert len(responses) == 4
+        assert elapsed < 0.6
+
+    def test_spans_attach_to_caller_context(self, fake_ollama, qa_chain):
+        with (
+            patch("components.qa_chain.is_medical_query", slow_classifier(True, 0)),
+            span("request") as root,
+        ):
+            process_query(qa_chain, "Metformin dose?", OllamaLLM())
+
+        (query,) = root.children
+        names = {child.name for child in query.children}
+        assert {"retrieve", "classify", "qa_chain"} <= names
+        assert query.attributes["speculative_retrieval"] == "used"
+
+    def test_cache_hit_skips_routing_and_retrieval(self, fake_ollama, qa_chain):
+        cache = SemanticCache(DeterministicFakeEmbedding(size=16), version_fn=lambda: 0)
+        classify = patch(
+            "components.qa_chain.is_medical_query", wraps=slow_classifier(True, 0)
+        )
+        with (
+            classify as is_medical_query,
+            patch("components.qa_chain.get_semantic_cache", return_value=cache),
+            span("request") as root,
+        ):
+            first = process_query(qa_chain, "Metformin dose?", OllamaLLM())
+            second = process_query(qa_chain, "Metformin dose?", OllamaLLM())
+
+        assert second == first
+        assert is_medical_query.call_count == 1
+        assert qa_chain.retriever.calls == 1
+        hit = root.children[1]
+        assert hit.attributes["cache_hit"] and hit.attributes["route"] == "medical"
+        assert {child.name for child in hit.children} == {"cache_lookup"}
+
+    def test_follow_up_routes_with_previous_question(self, fake_ollama, qa_chain):
+        routed = []
+
+        def is_medical_query(query):
+            routed.append(query)
+            return True
+
+        with (
+            patch("components.qa_chain.is_medical_query", is_medical_query),
+            patch(
+                "components.qa_chain.format_medical_prompt", wraps=format_medical_prompt
+            ) as prompt,
+        ):
+            process_query(qa_chain, "Metformin?", OllamaLLM(), session_id="follow")
+            process_query(qa_chain, "Its dose?", OllamaLLM(), session_id="follow")
+
+        assert routed == ["Metformin?", "Metformin? Its dose?"]
+        assert [c.args[1] for c in prompt.call_args_list] == routed
+        assert qa_chain.retriever.history_tokens == [0, CONVERSATION_HISTORY_TOKENS]
+        assert fake_ollama.prompt_eval_counts[1] < fake_ollama.prompt_eval_counts[0]
+
+    def test_cache_hit_is_remembered_for_follow_ups(self, fake_ollama, qa_chain):
+        cache = SemanticCache(DeterministicFakeEmbedding(size=16), version_fn=lambda: 0)
+        routed = []
+
+        def is_medical_query(query):
+            routed.append(query)
+            return True
+
+        with (
+            patch("components.qa_chain.is_medical_query", is_medical_query),
+            patch("components.qa_chain.get_semantic_cache", return_value=cache),
+        ):
+            first = process_query(qa_chain, "Metformin dose?", OllamaLLM(), "a")
+            hit = process_query(qa_chain, "Metformin dose?", OllamaLLM(), "b")
+            process_query(qa_chain, "Its side effects?", OllamaLLM(), "b")
+
+        assert hit == first
+        assert routed == ["Metformin dose?", "Metformin dose? Its side effects?"]
+        assert conversations.get("b").turns[0] == Turn(
+            "Metformin dose?", first["answer"]
+        )
+        assert cache.stats()["size"] == 1
+
+    def test_run_rejects_calls_from_the_shared_loop(self):
+        async def nested():
+            aio.run(asyncio.sleep(0))
+
+        with pytest.raises(RuntimeError):
+            aio.run(nested())
+
+
+class TestAsyncStream:
+    def test_astream_filters_think_tags(self, fake_ollama):
+        async def collect():
+            return [chunk async for chunk in OllamaLLM().astream("Hello")]
+
+        chunks = aio.run(collect())
+
+        assert "".join(chunks) == "token0 token1 token2"
+        assert len(chunks) > 1
@@ -0,0 +1,97 @@
+import numpy as np
+from unittest.mock import patch
+from components.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def build_index():
+    index = BM25Index()
+    index.add(
+        ["a", "b", "c"],
+        [
+            "Metformin is a first-line treatment for type 2 diabetes.",
+            "Type 2 diabetes is managed with diet, exercise and medication.",
+            "Empagliflozin is an SGLT2 inhibitor used in type 2 diabetes.",
+        ],
+    )
+    return index
+
+
+class TestTokenize:
+    def test_lowercases_and_drops_stopwords(self):
+        assert tokenize("What is the dose of Co-Trimoxazole?") == [
+            "dose",
+            "co-trimoxazole",
+        ]
+
+
+class TestBM25Index:
+    def test_rare_term_ranks_first(self):
+        hits = build_index().search("empagliflozin dose", k=2)
+
+        assert [doc_id for doc_id, _ in hits] == ["c"]
+
+    def test_common_terms_rank_shorter_documents_higher(self):
+        hits = build_index().search("type 2 diabetes", k=3)
+
+        assert len(hits) == 3
+        assert hits[0][1] >= hits[1][1] >= hits[2][1]
+
+    def test_update_replaces_and_deletes(self):
+        index = build_index()
+        index.add(["a"], ["Insulin therapy"])
+        index.delete(["c"])
+
+        assert len(index) == 2
+        assert index.search("metformin", k=3) == []
+        assert index.search("empagliflozin", k=3) == []
+        assert [doc_id for doc_id, _ in index.search("insulin", k=3)] == ["a"]
+
+    def test_postings_are_compact_arrays(self):
+        index = build_index()
+
+        assert len(index) == 3
+        assert len(index.postings) > 0
+        assert index.postings.dtype == np.int32
+        assert index.frequencies.dtype == np.uint16
+        assert index.offsets[-1] == len(index.postings)
+
+    def test_buffers_updates_into_few_merges(self):
+        index = BM25Index(merge_docs=10)
+        with patch.object(index, "_rebuild", wraps=index._rebuild) as rebuild:
+            for i in range(100):
+                index.add([str(i)], [f"document {i} about insulin"])
+            merges = rebuild.call_count
+            index.delete(["99"])
+            index.add(["5"], ["metformin"])
+
+            assert merges < 10
+            assert len(index) == 99
+            assert [doc_id for doc_id, _ in index.search("metformin", k=3)] == ["5"]
+            assert "99" not in index
+
+    def test_save_clears_dirty(self, tmp_path):
+        index = build_index()
+        assert index.dirty
+
+        index.save(str(tmp_path / "bm25.npz"))
+
+        assert not index.dirty
+
+    def test_save_and_load(self, tmp_path):
+        index = build_index()
+        path = str(tmp_path / "bm25.npz")
+        index.save(path)
+
+        loaded = BM25Index.load(path)
+
+        assert loaded.search("metformin diabetes", k=3) == index.search(
+            "metformin diabetes", k=3
+        )
+        assert BM25Index.load(str(tmp_path / "missing.npz")).search("x", 1) == []
+
+
+class TestReciprocalRankFusion:
+    def test_rewards_agreement(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+
+        assert [key for key, _ in fused] == ["a", "c", "b"]
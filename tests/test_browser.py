@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+from unittest.mock import Mock
+from components.browser import BrowserPool
+from components.crawler import BlockedFetchError
+from components.data_loader import WebScraper
+
+
+class FakeDriver:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.pages = 0
+        self.closed = False
+        self.broken = False
+
+    @property
+    def current_url(self):
+        if self.broken:
+            raise RuntimeError("session deleted")
+        return "about:blank"
+
+    def get(self, url):
+        if self.broken:
+            raise RuntimeError("session deleted")
+        time.sleep(self.delay)
+        self.pages += 1
+        self.page_source = f"<html>{url}</html>"
+
+    def quit(self):
+        self.closed = True
+
+
+@pytest.fixture
+def drivers():
+    return []
+
+
+def make_pool(drivers, delay=0.0, **kwargs):
+    def factory():
+        drivers.append(FakeDriver(delay))
+        return drivers[-1]
+
+    return BrowserPool(factory=factory, **kwargs)
+
+
+class TestBrowserPool:
+    def test_reuses_sessions(self, drivers):
+        pool = make_pool(drivers, size=2)
+
+        for i in range(5):
+            assert pool.fetch(f"http://a/{i}") == f"<html>http://a/{i}</html>"
+
+        assert len(drivers) == 1
+        assert drivers[0].pages == 5
+
+    def test_bounds_concurrent_sessions(self, drivers):
+        pool = make_pool(drivers, delay=0.05, size=2)
+
+        threads = [
+            threading.Thread(target=pool.fetch, args=(f"http://a/{i}",))
+            for i in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(drivers) == 2
+        assert sum(driver.pages for driver in drivers) == 6
+
+    def test_recycles_after_max_pages(self, drivers):
+        pool = make_pool(drivers, max_pages=2)
+
+        for i in range(5):
+            pool.fetch(f"http://a/{i}")
+
+        assert [driver.pages for driver in drivers] == [2, 2, 1]
+        assert drivers[0].closed and drivers[1].closed
+
+    def test_replaces_unhealthy_and_failed_sessions(self, drivers):
+        pool = make_pool(drivers)
+        pool.fetch("http://a/1")
+        drivers[0].broken = True
+
+        pool.fetch("http://a/2")
+
+        assert drivers[0].closed
+        drivers[1].get = Mock(side_effect=RuntimeError("tab crashed"))
+        with pytest.raises(RuntimeError):
+            pool.fetch("http://a/3")
+        assert drivers[1].closed
+        pool.fetch("http://a/4")
+        assert len(drivers) == 3
+
+    def test_times_out_when_exhausted(self, drivers):
+        pool = make_pool(drivers, size=1, acquire_timeout=0.01)
+
+        with pool.session():
+            with pytest.raises(TimeoutError):
+                pool.fetch("http://a/1")
+
+
+class TestWebScraperFallback:
+    def test_403_goes_through_pool(self):
+        browsers = Mock()
+        browsers.fetch.return_value = "<html>rendered</html>"
+        scraper = WebScraper(browsers)
+        scraper.session.get = Mock(return_value=Mock(status_code=403))
+
+        with pytest.raises(BlockedFetchError):
+            scraper._fetch("http://a/1")
+        assert scraper.fetch_content("http://a/1") == "<html>rendered</html>"
+
+    def test_failed_fallback_is_blocked(self):
+        browsers = Mock()
+        browsers.fetch.side_effect = TimeoutError("No browser session available")
+        scraper = WebScraper(browsers)
+        scraper.session.get = Mock(return_value=Mock(status_code=403))
+
+        with pytest.raises(BlockedFetchError):
+            scraper._fallback("http://a/1")
@@ -1,6 +1,13 @@
 import pytest
 from unittest.mock import Mock, patch
-from components.vectorstore import init_vectorstore
+from components.embeddings import CachedEmbeddings
+from components.vectorstore import (
+    IndexManifest,
+    get_embeddings,
+    index_data,
+    init_vectorstore,
+    load_manifest,
+)
 from components.config import (
     VECTORSTORE_CACHE_FOLDER,
     VECTORSTORE_MODEL_NAME,
@@ -35,6 +42,7 @@ def sample_documents():
 
 class TestVectorstore:
     def test_init_vectorstore_success(self, mock_embeddings, mock_chroma):
+        get_embeddings.clear()
         mock_chroma_instance = mock_chroma.return_value
 
         result = init_vectorstore()
@@ -43,11 +51,153 @@ class TestVectorstore:
             model_name=VECTORSTORE_MODEL_NAME, cache_folder=VECTORSTORE_CACHE_FOLDER
         )
 
-        mock_chroma.assert_any_call(
-            collection_name=VECTORSTORE_COLLECTION_NAME,
-            embedding_function=mock_embeddings.return_value,
-            persist_directory=VECTORSTORE_PERSIST_DIR,
+        mock_chroma.assert_called_once()
+        kwargs = mock_chroma.call_args.kwargs
+        assert kwargs["collection_name"] == VECTORSTORE_COLLECTION_NAME
+        assert kwargs["persist_directory"] == VECTORSTORE_PERSIST_DIR
+        assert isinstance(kwargs["embedding_function"], CachedEmbeddings)
+        assert kwargs["embedding_function"].underlying == mock_embeddings.return_value
+        mock_chroma_instance.delete_collection.assert_not_called()
+        assert result == mock_chroma_instance
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return IndexManifest(str(tmp_path / "manifest.json"))
+
+
+class TestIndexData:
+    def test_adds_with_deterministic_ids(
+        self, mock_vectorstore, manifest, sample_documents
+    ):
+        index_data(mock_vectorstore, sample_documents, manifest)
+        first_ids = mock_vectorstore.add_texts.call_args.kwargs["ids"]
+
+        reloaded = IndexManifest.load(manifest.path)
+        assert set(reloaded.entries) == set(first_ids)
+        assert reloaded.version == 1
+
+        mock_vectorstore.reset_mock()
+        index_data(mock_vectorstore, sample_documents, reloaded)
+
+        mock_vectorstore.add_texts.assert_not_called()
+        mock_vectorstore.delete.assert_not_called()
+        assert reloaded.version == 1
+
+    def test_upserts_changed_and_deletes_vanished(
+        self, mock_vectorstore, manifest, sample_documents
+    ):
+        index_data(mock_vectorstore, sample_documents, manifest)
+        old_ids = mock_vectorstore.add_texts.call_args.kwargs["ids"]
+        mock_vectorstore.reset_mock()
+
+        changed = [{"text": "Updated text 1", "metadata": {"source": "doc1"}}]
+        index_data(mock_vectorstore, changed, manifest)
+
+        assert mock_vectorstore.add_texts.call_args.kwargs["texts"] == [
+            "Updated text 1"
+        ]
+        assert sorted(mock_vectorstore.delete.call_args.kwargs["ids"]) == sorted(
+            old_ids
         )
+        assert list(manifest.entries.values()) == ["doc1"]
 
-        assert mock_chroma.call_count == 2
-        assert result == mock_chroma_instance
+    def test_empty_fetch_does_not_prune(
+        self, mock_vectorstore, manifest, sample_documents
+    ):
+        index_data(mock_vectorstore, sample_documents, manifest)
+        mock_vectorstore.reset_mock()
+
+        index_data(mock_vectorstore, [], manifest)
+
+        mock_vectorstore.delete.assert_not_called()
+        assert len(manifest.entries) == 2
+
+    def test_does_not_prune_failed_sources(self, mock_vectorstore, manifest):
+        documents = [
+            {"text": "Metformin", "metadata": {"source": "https://www.drugs.com/a"}},
+            {"text": "Ibuprofen", "metadata": {"source": "https://www.drugs.com/b"}},
+        ]
+        index_data(mock_vectorstore, documents, manifest)
+        mock_vectorstore.reset_mock()
+
+        index_data(
+            mock_vectorstore,
+            documents[:1],
+            manifest,
+            failed={"https://www.drugs.com/b"},
+        )
+
+        mock_vectorstore.delete.assert_not_called()
+        assert len(manifest.entries) == 2
+
+    def test_keeps_bm25_index_in_sync(self, mock_vectorstore, manifest):
+        documents = [
+            {"text": "Metformin lowers glucose", "metadata": {"source": "doc1"}},
+            {"text": "Ibuprofen relieves pain", "metadata": {"source": "doc2"}},
+        ]
+        index_data(mock_vectorstore, documents, manifest)
+        index_data(mock_vectorstore, documents[1:], manifest)
+
+        lexical = IndexManifest.load(manifest.path).lexical
+        assert len(lexical) == 1
+        assert lexical.search("metformin", k=5) == []
+        assert [doc_id for doc_id, _ in lexical.search("ibuprofen", k=5)] == list(
+            manifest.entries
+        )
+
+    def test_unchanged_lexical_index_is_not_rewritten(
+        self, mock_vectorstore, manifest, sample_documents
+    ):
+        index_data(mock_vectorstore, sample_documents, manifest)
+        with patch.object(manifest.lexical, "save") as save:
+            manifest.save()
+
+        save.assert_not_called()
+
+    def test_tags_documents_with_their_partition(self, mock_vectorstore, manifest):
+        documents = [
+            {"text": "Metformin", "metadata": {"source": "https://www.drugs.com/a"}},
+            {
+                "text": "Abstract",
+                "metadata": {"source": "https://pubmed.ncbi.nlm.nih.gov/1/"},
+            },
+            {"text": "Other", "metadata": {"source": "https://example.org/"}},
+        ]
+
+        index_data(mock_vectorstore, documents, manifest)
+
+        metadatas = mock_vectorstore.add_texts.call_args.kwargs["metadatas"]
+        assert [(m["partition"], m["doc_type"]) for m in metadatas] == [
+            ("drugs", "drug_monograph"),
+            ("pubmed", "abstract"),
+            ("other", "web_page"),
+        ]
+
+    def test_backfills_partitions_of_older_indexes(self, mock_vectorstore, manifest):
+        manifest.entries = {"a-1": "https://www.drugs.com/a"}
+        manifest.partitioned = False
+        manifest.save()
+        mock_vectorstore._collection.count.return_value = 1
+        mock_vectorstore._collection.get.return_value = {
+            "ids": ["a-1"],
+            "metadatas": [{"source": "https://www.drugs.com/a"}],
+        }
+
+        with (
+            patch("components.vectorstore.HYBRID_RETRIEVAL_ENABLED", False),
+            patch("components.vectorstore.DEDUP_ENABLED", False),
+        ):
+            loaded = load_manifest(mock_vectorstore, manifest.path)
+
+        mock_vectorstore._collection.update.assert_called_once_with(
+            ids=["a-1"],
+            metadatas=[
+                {
+                    "source": "https://www.drugs.com/a",
+                    "partition": "drugs",
+                    "doc_type": "drug_monograph",
+                }
+            ],
+        )
+        assert IndexManifest.load(loaded.path).partitioned
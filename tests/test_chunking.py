@@ -0,0 +1,108 @@
+from components.chunking import (
+    Section,
+    chunk_article,
+    chunk_sections,
+    split_sentences,
+)
+from components.context import estimate_tokens
+from components.data_loader import WebScraper
+
+DRUG_PAGE = """
+<html><body>
+<div class="ddc-sidebar"><p>Interactions Checker</p></div>
+<div class="ddc-main-content">
+<h1>Metformin</h1>
+<p>Generic name: metformin</p>
+<h2>Warnings</h2>
+<p>Do not use metformin with severe kidney disease.</p>
+<ul><li>Stop before contrast imaging.</li></ul>
+<h2>Dosage</h2>
+<p>Initial dose: 500 mg twice a day.</p>
+</div>
+</body></html>
+"""
+
+ABSTRACT_PAGE = """
+<html><body>
+<h1>Metformin and outcomes</h1>
+<div class="abstract-content">
+<p><strong class="sub-title">Background:</strong> Metformin is first-line.</p>
+<p><strong class="sub-title">Results:</strong> Fewer events.</p>
+</div>
+</body></html>
+"""
+
+
+class TestExtractSections:
+    def test_drug_page_headings(self):
+        article = WebScraper().parse_article(DRUG_PAGE, "https://www.drugs.com/m")
+
+        assert article["title"] == "Metformin"
+        assert [(s.heading, s.text) for s in article["sections"]] == [
+            ("", "Generic name: metformin"),
+            (
+                "Warnings",
+                "Do not use metformin with severe kidney disease. "
+                "Stop before contrast imaging.",
+            ),
+            ("Dosage", "Initial dose: 500 mg twice a day."),
+        ]
+        assert "Interactions Checker" not in article["text"]
+
+    def test_structured_abstract_labels(self):
+        article = WebScraper().parse_article(ABSTRACT_PAGE, "https://pubmed/1/")
+
+        assert [(s.heading, s.text) for s in article["sections"]] == [
+            ("Background", "Metformin is first-line."),
+            ("Results", "Fewer events."),
+        ]
+
+
+class TestChunkSections:
+    def test_short_sections_share_a_chunk(self):
+        chunks = chunk_sections([Section("A", "One."), Section("B", "Two.")])
+
+        assert chunks == [("A: One.\nB: Two.", "A", 0)]
+
+    def test_long_section_is_split_with_overlap(self):
+        text = " ".join(f"Sentence number {i} is here." for i in range(60))
+
+        chunks = chunk_sections([Section("Warnings", text)], 64, 12)
+
+        assert len(chunks) > 2
+        for (previous, _, _), (body, heading, overlap) in zip(chunks, chunks[1:]):
+            assert heading == "Warnings"
+            assert body.startswith("Warnings: ")
+            assert overlap > len("Warnings: ")
+            assert previous.endswith(body[len("Warnings: ") : overlap - 1])
+        assert all(estimate_tokens(body) <= 64 for body, _, _ in chunks)
+
+    def test_section_that_does_not_fit_starts_a_new_chunk(self):
+        chunks = chunk_sections(
+            [Section("A", "First. " * 20), Section("B", "Second. " * 20)], 64, 0
+        )
+
+        assert [heading for _, heading, _ in chunks] == ["A", "B"]
+
+    def test_oversized_sentence_is_split_at_words(self):
+        pieces = split_sentences("word " * 200, max_tokens=20)
+
+        assert len(pieces) > 1
+        assert all(estimate_tokens(piece) <= 20 for piece in pieces)
+
+
+class TestChunkArticle:
+    def test_metadata(self):
+        article = {
+            "title": "Metformin",
+            "sections": [Section("Uses", "Treats diabetes. " * 100)],
+            "metadata": {"source": "https://www.drugs.com/m"},
+        }
+
+        chunks = chunk_article(article)
+
+        assert len(chunks) > 1
+        assert all(c["text"].startswith("Title: Metformin\n") for c in chunks)
+        assert [c["metadata"]["chunk"] for c in chunks] == list(range(len(chunks)))
+        assert len({c["metadata"]["parent_id"] for c in chunks}) == 1
+        assert chunks[0]["metadata"]["source"] == "https://www.drugs.com/m"
@@ -0,0 +1,245 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from langchain_core.documents import Document
+from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.vectorstores import VectorStore
+from components.bm25 import BM25Index
+from components.context import (
+    ContextPackingRetriever,
+    HybridRetriever,
+    collapse_neighbours,
+    estimate_tokens,
+    pack_documents,
+)
+from components.router import PartitionRouter
+
+
+@pytest.fixture
+def docs():
+    return [
+        Document(page_content="a" * 35, metadata={"source": "1"}),
+        Document(page_content="a" * 35, metadata={"source": "1-copy"}),
+        Document(page_content="b" * 350, metadata={"source": "2"}),
+        Document(page_content="c" * 35, metadata={"source": "3"}),
+    ]
+
+
+@pytest.fixture
+def doc_vectors():
+    return np.array(
+        [[1.0, 0.0, 0.0], [1.0, 0.01, 0.0], [0.9, 0.4, 0.0], [0.6, 0.0, 0.8]]
+    )
+
+
+class TestPackDocuments:
+    def test_drops_duplicates_and_respects_budget(self, docs, doc_vectors):
+        packed = pack_documents(
+            np.array([1.0, 0.0, 0.0]), docs, doc_vectors, token_budget=25
+        )
+
+        assert [d.metadata["source"] for d in packed] == ["1", "3"]
+        assert sum(estimate_tokens(d.page_content) for d in packed) <= 25
+
+    def test_relevance_order_without_mmr(self, docs, doc_vectors):
+        packed = pack_documents(
+            np.array([1.0, 0.0, 0.0]),
+            docs,
+            doc_vectors,
+            token_budget=1000,
+            mmr_lambda=1.0,
+        )
+
+        assert [d.metadata["source"] for d in packed] == ["1", "2", "3"]
+
+    def test_max_docs(self, docs, doc_vectors):
+        packed = pack_documents(
+            np.array([1.0, 0.0, 0.0]), docs, doc_vectors, 1000, max_docs=1
+        )
+
+        assert len(packed) == 1
+
+
+class TestCollapseNeighbours:
+    def test_merges_adjacent_chunks_without_overlap(self):
+        def chunk(i, body, overlap=0, parent="p"):
+            return Document(
+                page_content=f"Title: T\n{body}",
+                metadata={"parent_id": parent, "chunk": i, "overlap": overlap},
+            )
+
+        other = Document(page_content="Unchunked", metadata={"source": "x"})
+        docs = [
+            chunk(2, "Dose: Two. Three.", overlap=11),
+            other,
+            chunk(1, "Dose: One. Two."),
+            chunk(5, "Side effects: Rash."),
+        ]
+
+        collapsed = collapse_neighbours(docs)
+
+        assert [d.page_content for d in collapsed] == [
+            "Title: T\nDose: One. Two. Three.",
+            "Unchunked",
+            "Title: T\nSide effects: Rash.",
+        ]
+        assert collapsed[0].metadata["chunk_end"] == 2
+
+
+class TestContextPackingRetriever:
+    def test_packs_candidates_within_context_window(self, docs, doc_vectors):
+        vectorstore = Mock(spec=VectorStore)
+        vectorstore.similarity_search_by_vector.return_value = docs
+        embeddings = Mock(spec=Embeddings)
+        embeddings.embed_query.return_value = [1.0, 0.0, 0.0]
+        embeddings.embed_documents.return_value = doc_vectors.tolist()
+
+        retriever = ContextPackingRetriever(
+            vectorstore=vectorstore,
+            embeddings=embeddings,
+            num_ctx=200,
+            answer_reserve=20,
+            system_prompt="",
+        )
+        result = retriever.invoke("q")
+
+        assert retriever.token_budget("q") == 99
+        assert retriever.token_budget("q", history_tokens=50) == 49
+        assert [d.metadata["source"] for d in result] == ["1", "3"]
+        vectorstore.similarity_search_by_vector.assert_called_once_with(
+            [1.0, 0.0, 0.0], k=retriever.fetch_k
+        )
+
+    def test_searches_routed_partitions_and_merges(self, docs, doc_vectors):
+        vectorstore = Mock(spec=Chroma)
+        vectorstore.similarity_search_by_vector_with_relevance_scores.side_effect = [
+            [(docs[0], 0.1), (docs[2], 0.5)],
+            [(docs[3], 0.3)],
+        ]
+        embeddings = Mock(spec=Embeddings)
+        embeddings.embed_query.return_value = [1.0, 0.0, 0.0]
+        embeddings.embed_documents.return_value = doc_vectors[[0, 3, 2]].tolist()
+        router = Mock(spec=PartitionRouter)
+        router.route.return_value = {"drugs": 2, "pubmed": 1}
+
+        retriever = ContextPackingRetriever(
+            vectorstore=vectorstore,
+            embeddings=embeddings,
+            partition_router=router,
+            mmr_lambda=1.0,
+        )
+        result = retriever.invoke("q")
+
+        assert [d.metadata["source"] for d in result] == ["1", "2", "3"]
+        search = vectorstore.similarity_search_by_vector_with_relevance_scores
+        assert [call.kwargs for call in search.call_args_list] == [
+            {"k": 2, "filter": {"partition": "drugs"}},
+            {"k": 1, "filter": {"partition": "pubmed"}},
+        ]
+        vectorstore.similarity_search_by_vector.assert_not_called()
+
+    @pytest.mark.parametrize("routed", [None, {"drugs": 2, "pubmed": 2}])
+    def test_reads_candidate_embeddings_from_chroma(self, tmp_path, routed):
+        fake = DeterministicFakeEmbedding(size=16)
+        vectorstore = Chroma(
+            collection_name="test",
+            embedding_function=fake,
+            persist_directory=str(tmp_path),
+        )
+        vectorstore.add_texts(
+            [f"Passage {i}" for i in range(6)],
+            metadatas=[
+                {"source": str(i), "partition": "drugs" if i % 2 else "pubmed"}
+                for i in range(6)
+            ],
+            ids=[f"id-{i}" for i in range(6)],
+        )
+        embeddings = Mock(spec=Embeddings, wraps=fake)
+        router = Mock(spec=PartitionRouter) if routed else None
+        if router:
+            router.route.return_value = routed
+
+        retriever = ContextPackingRetriever(
+            vectorstore=vectorstore,
+            embeddings=embeddings,
+            partition_router=router,
+            fetch_k=4,
+            max_docs=3,
+        )
+        result = retriever.invoke("Passage 3")
+
+        assert result[0].metadata["source"] == "3"
+        assert len(result) == 3
+        embeddings.embed_documents.assert_not_called()
+
+
+class TestHybridRetriever:
+    def test_exact_term_match_is_packed_at_small_k(self, tmp_path):
+        lexical = BM25Index()
+        lexical.add(["rare"], ["Empagliflozin dosing: 10 mg once daily."])
+        lexical.save(str(tmp_path / "bm25.npz"))
+
+        vector_docs = [
+            Document(page_content=f"Diabetes overview {i}", metadata={"source": str(i)})
+            for i in range(3)
+        ]
+        vectorstore = Mock(spec=VectorStore)
+        vectorstore.similarity_search_by_vector.return_value = vector_docs
+        vectorstore.get = Mock(
+            side_effect=lambda ids, include: {
+                "ids": ["rare"],
+                "documents": ["Empagliflozin dosing: 10 mg once daily."],
+                "metadatas": [{"source": "rare"}],
+                # The exact match embeds far from the query, as rare drug names do
+                "embeddings": [[0.0, 1.0]],
+            }
+        )
+        embeddings = Mock(spec=Embeddings)
+        embeddings.embed_query.return_value = [1.0, 0.0]
+        embeddings.embed_documents.return_value = [[1.0, 0.0], [0.9, 0.1], [0.8, 0.3]]
+
+        retriever = HybridRetriever(
+            vectorstore=vectorstore,
+            embeddings=embeddings,
+            lexical_path=str(tmp_path / "bm25.npz"),
+            max_docs=2,
+            mmr_lambda=1.0,
+        )
+        result = retriever.invoke("empagliflozin dose")
+
+        assert result[0].metadata["source"] == "rare"
+        assert len(result) == 2
+        assert [call.kwargs for call in vectorstore.get.call_args_list] == [
+            {"ids": ["rare"], "include": ["documents", "metadatas"]},
+            {"ids": ["rare"], "include": ["embeddings"]},
+        ]
+        embeddings.embed_documents.assert_called_once_with(
+            [doc.page_content for doc in vector_docs]
+        )
+
+    def test_lexical_hits_are_restricted_to_routed_partitions(self, tmp_path):
+        lexical = BM25Index()
+        lexical.add(["rare"], ["Empagliflozin dosing: 10 mg once daily."])
+        lexical.save(str(tmp_path / "bm25.npz"))
+        vectorstore = Mock(spec=Chroma)
+        vectorstore.similarity_search_by_vector_with_relevance_scores.return_value = []
+        vectorstore.get.return_value = {"ids": [], "documents": [], "metadatas": []}
+        embeddings = Mock(spec=Embeddings)
+        embeddings.embed_query.return_value = [1.0, 0.0]
+        router = Mock(spec=PartitionRouter)
+        router.route.return_value = {"pubmed": 20}
+
+        retriever = HybridRetriever(
+            vectorstore=vectorstore,
+            embeddings=embeddings,
+            lexical_path=str(tmp_path / "bm25.npz"),
+            partition_router=router,
+        )
+
+        assert retriever.invoke("empagliflozin dose") == []
+        vectorstore.get.assert_called_once_with(
+            ids=["rare"],
+            include=["documents", "metadatas"],
+            where={"partition": {"$in": ["pubmed"]}},
+        )
@@ -0,0 +1,104 @@
+import ollama
+import pytest
+from unittest.mock import patch
+from benchmarks.fake_ollama import FakeOllamaServer
+from components.conversation import Conversation, ConversationStore
+from components.llm import LlamaMedLLM, OllamaLLM
+
+
+@pytest.fixture
+def store():
+    store = ConversationStore(ttl=60, max_sessions=2)
+    with patch("components.llm.conversations", store):
+        yield store
+
+
+@pytest.fixture
+def fake_ollama():
+    with FakeOllamaServer(
+        tokens_per_sec=10_000, prompt_tokens_per_sec=100_000, answer_tokens=5
+    ) as fake:
+        with patch.object(ollama, "generate", ollama.Client(host=fake.url).generate):
+            yield fake
+
+
+class TestConversation:
+    def test_history_keeps_newest_turns_within_budget(self):
+        conversation = Conversation("s")
+        for i in range(5):
+            conversation.add_turn(f"question {i} " * 10, f"answer {i} " * 10)
+
+        history = conversation.history(token_budget=150)
+
+        assert history.startswith("Previous conversation:")
+        assert "question 4" in history and "question 3" in history
+        assert "question 0" not in history
+        assert history.index("question 3") < history.index("question 4")
+
+    def test_history_empty_when_nothing_fits(self):
+        conversation = Conversation("s")
+        conversation.add_turn("q" * 400, "a" * 400)
+
+        assert conversation.history(token_budget=10) == ""
+
+    def test_turn_drops_other_models_context(self):
+        conversation = Conversation("s", contexts={"a": [1], "b": [2]})
+
+        conversation.add_turn("q", "answer", "a")
+
+        assert conversation.contexts == {"a": [1]}
+
+
+class TestConversationStore:
+    def test_evicts_idle_sessions(self, store):
+        store.get("old").last_used -= 120
+        store.get("new")
+
+        assert len(store) == 1
+        assert store.get("new").session_id == "new"
+
+    def test_evicts_least_recently_used(self, store):
+        first = store.get("a")
+        store.get("b")
+        store.get("a")
+        store.get("c")
+
+        assert len(store) == 2
+        assert store.get("a") is first
+        assert store.get("b").turns == []
+
+
+class TestContextReuse:
+    def test_prefill_stays_flat_across_turns(self, store, fake_ollama):
+        llm = LlamaMedLLM()
+        for i in range(4):
+            llm._call(f"Follow-up question number {i}?", session_id="s")
+            store.get("s").add_turn(f"question {i}", "answer", llm.model_name)
+
+        first, *rest = fake_ollama.prompt_eval_counts
+        assert len(set(rest)) == 1
+        assert rest[0] < first
+        assert len(store.get("s").contexts[llm.model_name]) > first
+
+    def test_stream_keeps_context(self, store, fake_ollama):
+        llm = OllamaLLM()
+        "".join(llm.stream("Hello", session_id="s"))
+
+        assert store.get("s").contexts[llm.model_name]
+
+    def test_full_context_falls_back_to_history(self, store):
+        llm = LlamaMedLLM()
+        conversation = store.get("s")
+        conversation.add_turn("What is metformin?", "A diabetes drug.", llm.model_name)
+        conversation.contexts[llm.model_name] = list(range(4000))
+
+        request = llm._conversation_request("And its dose?", "s")
+
+        assert "context" not in request
+        assert request["prompt"].startswith("Previous conversation:")
+        assert request["prompt"].endswith("And its dose?")
+        assert llm.model_name not in conversation.contexts
+
+    def test_without_session_sends_prompt_only(self, store):
+        assert OllamaLLM()._conversation_request("Hi", None) == {"prompt": "Hi"}
+        assert len(store) == 0
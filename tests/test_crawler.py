@@ -0,0 +1,191 @@
+import threading
+import time
+
+import pytest
+from unittest.mock import Mock
+from components.crawler import (
+    BlockedFetchError,
+    CrawlerEngine,
+    FetchStats,
+    HostCircuitBreaker,
+    HostRateLimiter,
+    RetryableFetchError,
+)
+
+
+@pytest.fixture
+def no_rate_limit():
+    return HostRateLimiter(rates={}, default_rate=0)
+
+
+class TestCrawlerEngine:
+    def test_fetches_each_url_once(self, no_rate_limit):
+        fetch = Mock(side_effect=lambda url: f"<html>{url}</html>")
+        engine = CrawlerEngine(fetch, max_in_flight=4, rate_limiter=no_rate_limit)
+
+        urls = ["http://a/1", "http://a/2", "http://a/1", "http://b/3"]
+        results = dict(engine.fetch_all(urls, "test"))
+
+        assert set(results) == {"http://a/1", "http://a/2", "http://b/3"}
+        assert fetch.call_count == 3
+        assert engine.stats["test"].fetched == 3
+
+    def test_retries_retryable_errors(self, no_rate_limit):
+        fetch = Mock(side_effect=[RetryableFetchError("HTTP 503"), "ok"])
+        engine = CrawlerEngine(
+            fetch, max_retries=2, backoff_base=0, rate_limiter=no_rate_limit
+        )
+
+        results = list(engine.fetch_all(["http://a/1"], "test"))
+
+        assert results == [("http://a/1", "ok")]
+        assert engine.stats["test"].retries == 1
+
+    def test_gives_up_after_max_retries(self, no_rate_limit):
+        fetch = Mock(side_effect=RetryableFetchError("HTTP 429"))
+        engine = CrawlerEngine(
+            fetch, max_retries=1, backoff_base=0, rate_limiter=no_rate_limit
+        )
+
+        results = list(engine.fetch_all(["http://a/1"], "test"))
+
+        assert results == [("http://a/1", None)]
+        assert fetch.call_count == 2
+        assert engine.stats["test"].failed == 1
+        assert engine.failed == {"http://a/1"}
+
+    def test_skips_host_after_repeated_blocks(self, no_rate_limit):
+        def fetch(url):
+            if url.startswith("http://a/"):
+                raise BlockedFetchError("HTTP 403")
+            return "ok"
+
+        engine = CrawlerEngine(
+            Mock(side_effect=fetch),
+            max_in_flight=1,
+            rate_limiter=no_rate_limit,
+            breaker=HostCircuitBreaker(threshold=2, cooldown=60),
+        )
+        urls = [f"http://a/{i}" for i in range(5)] + ["http://b/1"]
+
+        results = dict(engine.fetch_all(urls, "test"))
+
+        assert engine.fetch.call_count == 3
+        assert results["http://b/1"] == "ok"
+        assert engine.stats["test"].blocked == 2
+        assert engine.stats["test"].skipped == 3
+
+    def test_open_circuit_sends_only_the_probe_to_fallback(
+        self, no_rate_limit, monkeypatch
+    ):
+        observed = []
+        monkeypatch.setattr(
+            "components.crawler.registry.observe",
+            lambda name, value, **labels: observed.append(name),
+        )
+        fallback = Mock(side_effect=lambda url: f"<html>{url}</html>")
+        engine = CrawlerEngine(
+            Mock(side_effect=BlockedFetchError("HTTP 403")),
+            max_in_flight=1,
+            rate_limiter=no_rate_limit,
+            breaker=HostCircuitBreaker(threshold=2, cooldown=0.05),
+            fallback=fallback,
+        )
+
+        results = dict(engine.fetch_all([f"http://a/{i}" for i in range(4)], "test"))
+
+        assert results["http://a/0"] == "<html>http://a/0</html>"
+        assert fallback.call_count == 2
+        assert engine.failed == {"http://a/2", "http://a/3"}
+        assert "fetch_seconds" not in observed
+
+        time.sleep(0.05)
+        results = dict(engine.fetch_all(["http://a/4", "http://a/5"], "test"))
+
+        assert results == {"http://a/4": "<html>http://a/4</html>", "http://a/5": None}
+        assert engine.fetch.call_count == fallback.call_count == 3
+        assert engine.stats["test"].rescued == 3
+        assert engine.stats["test"].blocked == 0
+        assert engine.stats["test"].skipped == 3
+
+    def test_counts_blocks_only_when_fallback_fails(self, no_rate_limit):
+        engine = CrawlerEngine(
+            Mock(side_effect=BlockedFetchError("HTTP 403")),
+            max_in_flight=1,
+            rate_limiter=no_rate_limit,
+            breaker=HostCircuitBreaker(threshold=2, cooldown=60),
+            fallback=Mock(side_effect=RuntimeError("browser crashed")),
+        )
+
+        results = dict(engine.fetch_all([f"http://a/{i}" for i in range(4)], "test"))
+
+        assert set(results.values()) == {None}
+        assert engine.fallback.call_count == 2
+        assert engine.stats["test"].blocked == 2
+        assert engine.stats["test"].skipped == 2
+        assert len(engine.failed) == 4
+
+    def test_counts_cached_pages_from_all_workers(self, no_rate_limit):
+        fetch = Mock()
+        engine = CrawlerEngine(
+            fetch, max_in_flight=8, rate_limiter=no_rate_limit, cached=lambda url: url
+        )
+
+        results = dict(engine.fetch_all([f"http://a/{i}" for i in range(200)], "t"))
+
+        assert len(results) == 200
+        assert engine.stats["t"].cached == engine.stats["t"].fetched == 200
+        fetch.assert_not_called()
+
+
+class TestFetchStats:
+    def test_concurrent_adds_are_not_lost(self):
+        stats = FetchStats("test")
+
+        def count():
+            for _ in range(10_000):
+                stats.add(retries=1, bytes=2)
+
+        threads = [threading.Thread(target=count) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert (stats.retries, stats.bytes) == (40_000, 80_000)
+
+
+class TestHostCircuitBreaker:
+    def test_half_open_probe(self, monkeypatch):
+        now = [0.0]
+        monkeypatch.setattr("components.crawler.time.monotonic", lambda: now[0])
+        breaker = HostCircuitBreaker(threshold=2, cooldown=10)
+        breaker.record("http://a/1", blocked=True)
+        assert breaker.allow("http://a/2")
+        breaker.record("http://a/2", blocked=True)
+        assert not breaker.allow("http://a/3")
+
+        now[0] = 11
+        assert breaker.allow("http://a/4")
+        assert not breaker.allow("http://a/5")
+        breaker.record("http://a/4", blocked=True)
+        assert not breaker.allow("http://a/6")
+
+        now[0] = 22
+        assert breaker.allow("http://a/7")
+        breaker.record("http://a/7", blocked=False)
+        assert breaker.allow("http://a/8") and breaker.allow("http://a/9")
+
+
+class TestHostRateLimiter:
+    def test_spaces_requests_per_host(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr("components.crawler.time.sleep", sleeps.append)
+        limiter = HostRateLimiter(rates={"a": 2.0}, default_rate=0)
+
+        limiter.acquire("http://a/1")
+        limiter.acquire("http://a/2")
+        limiter.acquire("http://b/1")
+
+        assert len(sleeps) == 1
+        assert sleeps[0] == pytest.approx(0.5, abs=0.05)
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+from components.dedup import MinHashIndex
+from components.vectorstore import IndexManifest, index_data
+
+TEXT = (
+    "Metformin is a first line medication for the treatment of type 2 diabetes, "
+    "particularly in people who are overweight. It lowers blood glucose by "
+    "decreasing glucose production in the liver and increasing insulin sensitivity. "
+    "Common side effects include diarrhea, nausea and abdominal pain, and it has a "
+    "low risk of causing hypoglycemia when used on its own."
+)
+MIRRORED = TEXT.replace("particularly", "especially")
+OTHER = (
+    "Ibuprofen is a nonsteroidal anti-inflammatory drug used for treating pain, "
+    "fever and inflammation, including painful menstrual periods, migraines and "
+    "rheumatoid arthritis. It can be taken by mouth or intravenously."
+)
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return IndexManifest(str(tmp_path / "manifest.json"))
+
+
+class TestMinHashIndex:
+    def test_signature_similarity_tracks_overlap(self):
+        index = MinHashIndex()
+        base = index.signature(TEXT)
+
+        assert np.mean(base == index.signature(MIRRORED)) >= 0.8
+        assert np.mean(base == index.signature(OTHER)) < 0.2
+
+    def test_short_text_has_no_signature(self):
+        assert MinHashIndex().signature("Aspirin thins blood") is None
+
+    def test_find_or_add(self):
+        index = MinHashIndex()
+
+        assert index.find_or_add("a", TEXT) is None
+        assert index.find_or_add("b", OTHER) is None
+        assert index.find_or_add("c", MIRRORED) == "a"
+        assert index.find_or_add("c", MIRRORED, ignore_prefix="a") is None
+        assert len(index) == 3
+
+    def test_remove(self):
+        index = MinHashIndex()
+        index.find_or_add("a", TEXT)
+        index.remove(["a"])
+
+        assert "a" not in index
+        assert index.find_or_add("b", MIRRORED) is None
+
+    def test_save_and_load(self, tmp_path):
+        index = MinHashIndex()
+        index.find_or_add("a", TEXT)
+        index.find_or_add("b", OTHER)
+        index.remove(["b"])
+        path = str(tmp_path / "minhash.npz")
+
+        index.save(path)
+        loaded = MinHashIndex.load(path)
+
+        assert len(loaded) == 1
+        assert loaded.query(loaded.signature(MIRRORED))[0] == "a"
+        assert not index.dirty and not loaded.dirty
+
+    def test_unchanged_signatures_are_not_rewritten(self, manifest):
+        manifest.signatures.find_or_add("a", TEXT)
+        manifest.save()
+
+        with patch.object(manifest.signatures, "save") as save:
+            signatures = manifest.signatures
+            assert signatures.query(signatures.signature(MIRRORED))[0] == "a"
+            manifest.save()
+            save.assert_not_called()
+
+            manifest.signatures.find_or_add("b", OTHER)
+            manifest.save()
+            save.assert_called_once()
+
+
+class TestIndexDataDedup:
+    def test_merges_sources_into_canonical(self, mock_vectorstore, manifest):
+        mock_vectorstore._collection.get.side_effect = lambda ids, include: {
+            "ids": ids,
+            "metadatas": [{"source": "https://a.org/metformin"}],
+        }
+        documents = [
+            {"text": TEXT, "metadata": {"source": "https://a.org/metformin"}},
+            {"text": MIRRORED, "metadata": {"source": "https://b.org/metformin"}},
+        ]
+
+        index_data(mock_vectorstore, documents, manifest)
+
+        assert mock_vectorstore.add_texts.call_args.kwargs["texts"] == [TEXT]
+        (canonical,) = manifest.entries
+        update = mock_vectorstore._collection.update.call_args.kwargs
+        assert update["ids"] == [canonical]
+        assert update["metadatas"][0]["sources"] == (
+            "https://a.org/metformin https://b.org/metformin"
+        )
+        reloaded = IndexManifest.load(manifest.path)
+        (duplicate,) = reloaded.duplicates.values()
+        assert duplicate["canonical"] == canonical
+        assert canonical in reloaded.signatures
+
+    def test_incremental_run_dedupes_against_corpus(self, manifest):
+        vectorstore = Mock()
+        vectorstore._collection.get.return_value = {"ids": [], "metadatas": []}
+        index_data(
+            vectorstore,
+            [{"text": TEXT, "metadata": {"source": "https://a.org/metformin"}}],
+            manifest,
+        )
+        vectorstore.reset_mock()
+
+        index_data(
+            vectorstore,
+            [{"text": MIRRORED, "metadata": {"source": "https://b.org/metformin"}}],
+            IndexManifest.load(manifest.path),
+        )
+
+        vectorstore.add_texts.assert_not_called()
+        vectorstore.delete.assert_not_called()
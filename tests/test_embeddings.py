@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+from unittest.mock import Mock
+from components.embeddings import CachedEmbeddings, EmbeddingStore
+
+
+@pytest.fixture
+def underlying():
+    model = Mock()
+    model.embed_documents.side_effect = lambda texts: [
+        [float(len(text)), 1.0] for text in texts
+    ]
+    model.embed_query.side_effect = lambda text: [float(len(text)), 0.0]
+    return model
+
+
+class TestCachedEmbeddings:
+    def test_embeds_only_unseen_texts(self, underlying, tmp_path):
+        embeddings = CachedEmbeddings(underlying, "test-model", str(tmp_path))
+
+        first = embeddings.embed_documents(["a", "bb", "a"])
+        second = embeddings.embed_documents(["bb", "ccc"])
+
+        assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+        assert second == [[2.0, 1.0], [3.0, 1.0]]
+        assert underlying.embed_documents.call_args_list[0].args == (["a", "bb"],)
+        assert underlying.embed_documents.call_args_list[1].args == (["ccc"],)
+
+    def test_persists_across_instances(self, underlying, tmp_path):
+        CachedEmbeddings(underlying, "test-model", str(tmp_path)).embed_documents(
+            ["a", "bb"]
+        )
+        underlying.reset_mock()
+
+        reloaded = CachedEmbeddings(underlying, "test-model", str(tmp_path))
+
+        assert reloaded.embed_documents(["bb", "a"]) == [[2.0, 1.0], [1.0, 1.0]]
+        underlying.embed_documents.assert_not_called()
+
+    def test_keys_include_model_name(self, underlying, tmp_path):
+        CachedEmbeddings(underlying, "model-a", str(tmp_path)).embed_documents(["a"])
+        CachedEmbeddings(underlying, "model-b", str(tmp_path)).embed_documents(["a"])
+
+        assert underlying.embed_documents.call_count == 2
+
+    def test_query_cache_evicts_least_recently_used(self, underlying, tmp_path):
+        embeddings = CachedEmbeddings(
+            underlying, "test-model", str(tmp_path), query_cache_size=2
+        )
+
+        for query in ["q1", "q2", "q1", "q3", "q1", "q2"]:
+            embeddings.embed_query(query)
+
+        called = [c.args[0] for c in underlying.embed_query.call_args_list]
+        assert called == ["q1", "q2", "q3", "q2"]
+
+    def test_embed_queries_batches_misses(self, underlying, tmp_path):
+        embeddings = CachedEmbeddings(underlying, "test-model", str(tmp_path))
+        embeddings.embed_query("q1")
+
+        vectors = embeddings.embed_queries(["q1", "q22", "q333"])
+
+        assert vectors == [[2.0, 0.0], [3.0, 1.0], [4.0, 1.0]]
+        underlying.embed_documents.assert_called_once_with(["q22", "q333"])
+
+
+class TestEmbeddingStore:
+    def test_concurrent_writers_get_distinct_rows(self, tmp_path):
+        stores = [EmbeddingStore(str(tmp_path)) for _ in range(2)]
+
+        def write(store, offset):
+            for i in range(offset, 200, 2):
+                store.put_many({f"k{i}": [float(i), float(-i)]})
+
+        threads = [
+            threading.Thread(target=write, args=(store, n))
+            for n, store in enumerate(stores)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        found = EmbeddingStore(str(tmp_path)).get_many([f"k{i}" for i in range(200)])
+        assert found == {f"k{i}": [float(i), float(-i)] for i in range(200)}
+
+    def test_overwrites_rows_of_an_uncommitted_write(self, tmp_path):
+        store = EmbeddingStore(str(tmp_path))
+        store.put_many({"a": [1.0, 2.0]})
+        with open(store.vectors_path, "ab") as f:
+            f.write(b"\0" * 7)
+
+        store.put_many({"b": [3.0, 4.0]})
+
+        assert EmbeddingStore(str(tmp_path)).get_many(["a", "b"]) == {
+            "a": [1.0, 2.0],
+            "b": [3.0, 4.0],
+        }
@@ -0,0 +1,34 @@
+import ollama
+import pytest
+from unittest.mock import patch
+from benchmarks.fake_ollama import FakeOllamaServer
+from components.llm import LlamaMedLLM, OllamaLLM
+
+
+@pytest.fixture
+def fake_ollama():
+    with FakeOllamaServer(
+        tokens_per_sec=10_000, prompt_tokens_per_sec=100_000, answer_tokens=5
+    ) as fake:
+        with patch.object(ollama, "generate", ollama.Client(host=fake.url).generate):
+            yield fake
+
+
+class TestFakeOllamaServer:
+    def test_call_round_trip(self, fake_ollama):
+        assert LlamaMedLLM()._call("Hello") == "token0 token1 token2 token3 token4"
+
+    def test_stream_filters_think_tags(self, fake_ollama):
+        chunks = list(OllamaLLM().stream("Hello"))
+
+        assert "".join(chunks) == "token0 token1 token2 token3 token4"
+        assert len(chunks) > 1
+
+    def test_counts_model_loads(self, fake_ollama):
+        fake_ollama.max_loaded_models = 1
+        LlamaMedLLM()._call("a")
+        OllamaLLM()._call("b")
+        LlamaMedLLM()._call("c")
+
+        assert fake_ollama.model_loads == 3
+        assert fake_ollama.requests == 3
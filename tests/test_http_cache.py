@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+from unittest.mock import Mock
+from benchmarks.fixture_server import FixtureServer
+from components.crawler import CrawlerEngine, HostRateLimiter
+from components.data_loader import WebScraper
+from components.http_cache import HttpCache
+
+
+@pytest.fixture
+def server():
+    with FixtureServer(pages=3, latency=0) as server:
+        yield server
+
+
+class TestHttpCache:
+    def test_stores_compressed_body_and_validators(self, tmp_path):
+        cache = HttpCache(str(tmp_path / "cache.sqlite"))
+        body = "<html>" + "metformin " * 500 + "</html>"
+
+        cache.put("http://a/1", body, '"v1"', "Mon, 01 Jan 2024 00:00:00 GMT")
+
+        cached = cache.get("http://a/1")
+        assert cached.body == body
+        assert cached.validators() == {
+            "If-None-Match": '"v1"',
+            "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+        }
+        (stored,) = sqlite3.connect(cache.path).execute("SELECT body FROM responses")
+        assert len(stored[0]) < len(body) / 10
+
+    def test_fresh_within_ttl_or_offline(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite")
+        HttpCache(path).put("http://a/1", "body")
+
+        assert HttpCache(path, ttl=60).fresh("http://a/1").body == "body"
+        assert HttpCache(path, ttl=0).fresh("http://a/1") is None
+        assert HttpCache(path, ttl=0, mode="offline").fresh("http://a/1")
+
+    def test_rejects_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            HttpCache(str(tmp_path / "cache.sqlite"), mode="sometimes")
+
+
+class TestCachedScraper:
+    def test_revalidates_with_etag(self, server, tmp_path):
+        cache = HttpCache(str(tmp_path / "cache.sqlite"), ttl=0)
+        scraper = WebScraper(Mock(), cache)
+        url = f"{server.url}/drug-1.html"
+
+        first = scraper.fetch_content(url)
+        second = scraper.fetch_content(url)
+
+        assert first == second
+        assert "drug-1" in first
+        assert (server.requests, server.not_modified) == (2, 1)
+
+    def test_fresh_page_needs_no_request(self, server, tmp_path):
+        scraper = WebScraper(Mock(), HttpCache(str(tmp_path / "cache.sqlite")))
+        url = f"{server.url}/drug-1.html"
+
+        scraper.fetch_content(url)
+        scraper.fetch_content(url)
+
+        assert server.requests == 1
+
+    def test_offline_mode_serves_cache_only(self, server, tmp_path):
+        path = str(tmp_path / "cache.sqlite")
+        url = f"{server.url}/drug-1.html"
+        WebScraper(Mock(), HttpCache(path)).fetch_content(url)
+        offline = WebScraper(Mock(), HttpCache(path, ttl=0, mode="offline"))
+
+        assert "drug-1" in offline.fetch_content(url)
+        assert offline.fetch_content(f"{server.url}/drug-2.html") is None
+        assert server.requests == 1
+
+    def test_engine_skips_rate_limit_for_cached_pages(self, tmp_path):
+        scraper = WebScraper(Mock(), HttpCache(str(tmp_path / "cache.sqlite")))
+        scraper.cache.put("http://a/1", "cached")
+        rate_limiter = Mock(spec=HostRateLimiter)
+        fetch = Mock(return_value="fetched")
+        engine = CrawlerEngine(fetch, rate_limiter=rate_limiter, cached=scraper.cached)
+
+        results = dict(engine.fetch_all(["http://a/1", "http://a/2"], "test"))
+
+        assert results == {"http://a/1": "cached", "http://a/2": "fetched"}
+        fetch.assert_called_once_with("http://a/2")
+        rate_limiter.acquire.assert_called_once_with("http://a/2")
+        assert engine.stats["test"].cached == 1
@@ -0,0 +1,64 @@
+import json
+import pytest
+from unittest.mock import patch
+from components.llm import OllamaLLM
+from components.metrics import MetricsRegistry, registry, span
+
+
+class TestMetricsRegistry:
+    def test_renders_prometheus_histograms_and_counters(self):
+        metrics = MetricsRegistry(prefix="test")
+        metrics.observe("latency_seconds", 0.2, stage="retrieve")
+        metrics.observe("latency_seconds", 3.0, stage="retrieve")
+        metrics.inc("requests_total", route="medical")
+
+        text = metrics.render_prometheus()
+
+        assert "# TYPE test_latency_seconds histogram" in text
+        assert 'test_latency_seconds_bucket{stage="retrieve",le="0.25"} 1' in text
+        assert 'test_latency_seconds_bucket{stage="retrieve",le="+Inf"} 2' in text
+        assert 'test_latency_seconds_count{stage="retrieve"} 2' in text
+        assert 'test_requests_total{route="medical"} 1' in text
+        assert (
+            metrics.histogram("latency_seconds", stage="retrieve").quantile(0.5) == 0.25
+        )
+
+
+class TestSpans:
+    def test_writes_one_span_tree_per_request(self, trace_path):
+        with span("process_query", route="medical"):
+            with span("classify"):
+                pass
+            with span("retrieve"):
+                with span("vector_search"):
+                    pass
+
+        lines = trace_path.read_text().splitlines()
+        assert len(lines) == 1
+        tree = json.loads(lines[0])
+        assert tree["name"] == "process_query"
+        assert tree["attributes"] == {"route": "medical"}
+        assert [c["name"] for c in tree["children"]] == ["classify", "retrieve"]
+        assert tree["children"][1]["children"][0]["name"] == "vector_search"
+
+    @patch("ollama.generate")
+    def test_call_records_ollama_timings(self, mock_generate, trace_path):
+        mock_generate.return_value = {
+            "response": "Hi",
+            "prompt_eval_count": 12,
+            "prompt_eval_duration": 300_000_000,
+            "eval_count": 5,
+            "eval_duration": 100_000_000,
+        }
+        before = registry.counter("ollama_prompt_eval_tokens_total", model="m")
+
+        OllamaLLM(model_name="m")._call("Hello")
+
+        tree = json.loads(trace_path.read_text().splitlines()[-1])
+        assert tree["name"] == "ollama_generate"
+        assert tree["attributes"]["prompt_eval_duration"] == 300_000_000
+        assert (
+            registry.counter("ollama_prompt_eval_tokens_total", model="m")
+            == before + 12
+        )
+        assert registry.histogram("ollama_eval_duration_seconds", model="m").count >= 1
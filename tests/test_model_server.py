@@ -0,0 +1,96 @@
+import threading
+import numpy as np
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from components.embeddings import CachedEmbeddings
+from components.model_server import (
+    MicroBatcher,
+    ModelClient,
+    ModelServer,
+    RemoteEmbeddings,
+    RemoteRouter,
+)
+
+
+class TestMicroBatcher:
+    def test_merges_concurrent_calls(self):
+        batches = []
+
+        def double(items):
+            batches.append(len(items))
+            time.sleep(0.01)
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(double, max_batch=64, max_wait=0.05)
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda i: batcher([i, i + 100]), range(8)))
+
+        assert results == [[2 * i, 2 * (i + 100)] for i in range(8)]
+        assert sum(batches) == 16
+        assert len(batches) < 8
+
+    def test_error_reaches_every_caller(self):
+        batcher = MicroBatcher(lambda items: 1 / 0, max_wait=0.01)
+
+        with pytest.raises(ZeroDivisionError):
+            batcher(["a"])
+
+
+@pytest.fixture(params=["unix", "http"])
+def model_server(request, tmp_path):
+    embeddings = CachedEmbeddings(
+        DeterministicFakeEmbedding(size=16), "fake", str(tmp_path / "cache")
+    )
+    server = ModelServer(embeddings, zero_shot=lambda queries: [True] * len(queries))
+    listen = (
+        f"unix://{tmp_path / 'models.sock'}"
+        if request.param == "unix"
+        else "http://127.0.0.1:0"
+    )
+    httpd = server.serve(listen)
+    if request.param == "http":
+        listen = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield embeddings, ModelClient(listen)
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestModelServer:
+    def test_remote_embeddings_match_local(self, model_server):
+        local, client = model_server
+        remote = RemoteEmbeddings(client)
+
+        expected = local.embed_documents(["a", "b"])
+        assert np.allclose(remote.embed_documents(["a", "b"]), expected)
+        assert np.allclose(remote.embed_query("q"), local.embed_query("q"))
+
+    def test_remote_embeddings_cache_queries(self, model_server, monkeypatch):
+        _, client = model_server
+        post = Mock(wraps=client.post)
+        monkeypatch.setattr(client, "post", post)
+        remote = RemoteEmbeddings(client, query_cache_size=2)
+
+        first = remote.embed_query("q1")
+        assert remote.embed_query("q1") == first
+        assert post.call_count == 1
+
+        remote.embed_query("q2")
+        remote.embed_query("q3")
+        remote.embed_query("q1")
+        assert post.call_count == 4
+
+    def test_remote_router(self, model_server):
+        _, client = model_server
+
+        assert isinstance(RemoteRouter(client).is_medical("metformin dose"), bool)
+
+    def test_unknown_endpoint(self, model_server):
+        _, client = model_server
+
+        with pytest.raises(RuntimeError):
+            client.post("/nope", {})
@@ -1,6 +1,8 @@
+import re
+
 import pytest
 from unittest.mock import patch
-from components.llm import BaseLLM, OllamaLLM, LlamaMedLLM
+from components.llm import BaseLLM, OllamaLLM, LlamaMedLLM, ThinkTagFilter
 from components.config import (
     DEESEEK_SYSTEM_PROMPT,
     DEFAULT_MODEL_NAME,
@@ -13,6 +15,17 @@ from components.config import (
 )
 
 
+def regex_filter(text):
+    """The batch filter ``BaseLLM._filter_response`` used before streaming."""
+    text = re.sub(
+        r"<(think|thinking|thought)>.*?</(think|thinking|thought)>",
+        "",
+        text,
+        flags=re.DOTALL,
+    )
+    return re.sub(r"\n\s*\n", "\n", text).strip()
+
+
 @pytest.fixture
 def base_llm():
     class TestLLM(BaseLLM):
@@ -64,6 +77,53 @@ class TestBaseLLM:
 
         assert result == "I cannot provide an answer at this time."
 
+    @patch("ollama.generate")
+    def test_stream_filters_think_blocks(self, mock_generate, base_llm):
+        mock_generate.return_value = iter(
+            {"response": part}
+            for part in ["<thi", "nk>hidden</th", "ink>\n\nHel", "lo", "\n\n\nworld\n"]
+        )
+
+        chunks = list(base_llm.stream("Test prompt"))
+
+        assert "".join(chunks) == "Hello\nworld"
+        assert mock_generate.call_args.kwargs["stream"] is True
+
+    @patch("ollama.generate")
+    def test_stream_error(self, mock_generate, base_llm):
+        mock_generate.side_effect = Exception("Test error")
+
+        assert list(base_llm.stream("Test prompt")) == [
+            "I cannot provide an answer at this time."
+        ]
+
+
+class TestThinkTagFilter:
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "<think>internal thought</think>Hello",
+            "<thinking>a < b</thinking>\n\nResult < 5 and <b>bold</b>\n \n done ",
+            "  Plain\n\n\ntext with <thought>x</thought> tags <thin",
+        ],
+    )
+    def test_matches_batch_filter_for_any_chunking(self, base_llm, text):
+        expected = regex_filter(text)
+        assert base_llm._filter_response(text) == expected
+
+        for size in range(1, len(text) + 1):
+            think_filter = ThinkTagFilter()
+            output = "".join(
+                think_filter.feed(text[i : i + size]) for i in range(0, len(text), size)
+            )
+            assert output + think_filter.flush() == expected
+
+    def test_drops_unclosed_block(self, base_llm):
+        text = "Answer first.\n<think>cut off mid-thought"
+
+        assert regex_filter(text) == text
+        assert base_llm._filter_response(text) == "Answer first."
+
 
 class TestOllamaLLM:
     def test_default_values(self, ollama_llm):
@@ -0,0 +1,73 @@
+from benchmarks.fixture_server import load_fixture
+from components.parsing import Page, parse_article, parse_drug_links, parse_pages
+
+DRUG_URL = "https://www.drugs.com/metformin.html"
+PUBMED_URL = "https://pubmed.ncbi.nlm.nih.gov/1/"
+
+
+class TestParseArticle:
+    def test_keeps_only_title_and_content(self):
+        html = (
+            "<html><head><script>var title = 'Ad';</script></head><body>"
+            "<nav><h2>Menu</h2><p>Sign in</p></nav>"
+            "<h1>Metformin</h1>"
+            '<div class="ddc-main-content"><h2>Uses</h2><p>Type 2 diabetes.</p></div>'
+            "<footer><p>Copyright</p></footer></body></html>"
+        )
+
+        document = parse_article(html, DRUG_URL)
+
+        assert document["title"] == "Metformin"
+        assert document["text"] == "Title: Metformin\nContent: Uses: Type 2 diabetes."
+
+    def test_fixture_pages(self):
+        drug = parse_article(load_fixture("drug_page.html"), DRUG_URL)
+        abstract = parse_article(load_fixture("pubmed_article.html"), PUBMED_URL)
+
+        assert drug["title"] == "Metformin"
+        assert drug["sections"]
+        assert abstract["title"].startswith("Metformin and cardiovascular outcomes")
+        assert abstract["metadata"] == {"source": PUBMED_URL}
+
+    def test_drug_links(self):
+        links = parse_drug_links(load_fixture("drug_information.html"))
+
+        assert links and all(link.startswith("/") for link in links)
+
+
+class TestParsePages:
+    def pages(self, n):
+        return [
+            Page(f"{DRUG_URL}?{i}", load_fixture("drug_page.html")) for i in range(n)
+        ]
+
+    def test_parses_pages_and_passes_documents_through(self):
+        document = {"text": "Abstract", "metadata": {"source": PUBMED_URL}}
+
+        items = list(parse_pages([document] + self.pages(3), workers=1, batch_size=2))
+
+        assert items[0] is document
+        assert [item["metadata"]["source"] for item in items[1:]] == [
+            f"{DRUG_URL}?{i}" for i in range(3)
+        ]
+
+    def test_process_pool(self):
+        items = list(parse_pages(self.pages(10), workers=2, batch_size=3))
+
+        assert sorted(item["metadata"]["source"] for item in items) == sorted(
+            f"{DRUG_URL}?{i}" for i in range(10)
+        )
+        assert all(item["title"] == "Metformin" for item in items)
+
+    def test_reparses_failed_batches_in_process(self):
+        class LocalPage(Page):
+            """Cannot be pickled into a worker, so its batch fails in the pool."""
+
+        pages = [LocalPage(DRUG_URL, load_fixture("drug_page.html"))]
+        pages.append(LocalPage(f"{DRUG_URL}?broken", None))
+        failed = set()
+
+        items = list(parse_pages(pages, workers=2, batch_size=2, failed=failed))
+
+        assert [item["metadata"]["source"] for item in items] == [DRUG_URL]
+        assert failed == {f"{DRUG_URL}?broken"}
@@ -0,0 +1,172 @@
+import pytest
+import requests
+from unittest.mock import Mock, patch
+from components.chunking import Section
+from components.config import PUBMED_URL_ARTICLE
+from components.data_loader import MedicalDataFetcher, iter_medical_data
+from components.pipeline import IngestionPipeline, Pipeline
+from components.pubmed import PubMedClient, PubMedRecord
+from components.vectorstore import IndexManifest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return IndexManifest(str(tmp_path / "manifest.json"))
+
+
+@pytest.fixture
+def embedding_vectorstore(mock_vectorstore):
+    mock_vectorstore.embeddings.embed_documents.side_effect = lambda texts: [
+        [float(len(text))] for text in texts
+    ]
+    return mock_vectorstore
+
+
+def make_documents(n):
+    return (
+        {"text": f"Text {i}", "metadata": {"source": f"https://example.org/{i}"}}
+        for i in range(n)
+    )
+
+
+class TestPipeline:
+    def test_runs_stages_in_order(self):
+        pipeline = Pipeline(
+            [
+                ("double", lambda items: (item * 2 for item in items)),
+                ("inc", lambda items: (item + 1 for item in items)),
+            ],
+            queue_size=2,
+        )
+
+        assert list(pipeline.run(range(5))) == [1, 3, 5, 7, 9]
+        assert pipeline.stats["inc"].items_out == 5
+
+    def test_propagates_stage_errors(self):
+        def failing(items):
+            for item in items:
+                if item == 3:
+                    raise ValueError("boom")
+                yield item
+
+        pipeline = Pipeline([("failing", failing)], queue_size=1)
+
+        with pytest.raises(ValueError, match="boom"):
+            list(pipeline.run(range(100)))
+
+
+class TestIngestionPipeline:
+    def test_upserts_in_fixed_size_batches(self, embedding_vectorstore, manifest):
+        pipeline = IngestionPipeline(embedding_vectorstore, manifest, batch_size=4)
+
+        assert pipeline.run(make_documents(10)) == 10
+
+        upserts = embedding_vectorstore._collection.upsert.call_args_list
+        assert [len(c.kwargs["ids"]) for c in upserts] == [4, 4, 2]
+        assert len(manifest.entries) == 10
+
+    def test_checkpoints_manifest_instead_of_saving_every_batch(
+        self, embedding_vectorstore, manifest, monkeypatch
+    ):
+        save = Mock(wraps=manifest.save)
+        monkeypatch.setattr(manifest, "save", save)
+        pipeline = IngestionPipeline(
+            embedding_vectorstore, manifest, batch_size=2, checkpoint_batches=3
+        )
+
+        pipeline.run(make_documents(14))
+
+        # 7 batches: checkpoints after the 3rd and 6th, then once at the end
+        assert save.call_count == 3
+        assert len(IndexManifest.load(manifest.path).entries) == 14
+
+    def test_skips_unchanged_and_prunes_vanished(self, embedding_vectorstore, manifest):
+        IngestionPipeline(embedding_vectorstore, manifest, batch_size=4).run(
+            make_documents(10)
+        )
+        embedding_vectorstore.reset_mock()
+
+        pipeline = IngestionPipeline(embedding_vectorstore, manifest, batch_size=4)
+        assert pipeline.run(make_documents(8)) == 0
+
+        embedding_vectorstore.embeddings.embed_documents.assert_not_called()
+        assert len(embedding_vectorstore.delete.call_args.kwargs["ids"]) == 2
+        assert pipeline.skipped == 8
+
+    def test_keeps_documents_that_failed_to_fetch(
+        self, embedding_vectorstore, manifest
+    ):
+        IngestionPipeline(embedding_vectorstore, manifest, batch_size=4).run(
+            make_documents(10)
+        )
+        embedding_vectorstore.reset_mock()
+        failed = set()
+
+        def crawl():
+            yield from make_documents(8)
+            failed.add("https://example.org/8")
+
+        IngestionPipeline(embedding_vectorstore, manifest, batch_size=4).run(
+            crawl(), failed=failed
+        )
+
+        assert len(embedding_vectorstore.delete.call_args.kwargs["ids"]) == 1
+        assert "https://example.org/8" in manifest.entries.values()
+        assert "https://example.org/9" not in manifest.entries.values()
+
+        embedding_vectorstore.reset_mock()
+        IngestionPipeline(embedding_vectorstore, manifest, batch_size=4).run(
+            make_documents(2), failed={"https://example.org/"}
+        )
+        embedding_vectorstore.delete.assert_not_called()
+
+    def test_keeps_sources_that_fail_mid_stream(self, embedding_vectorstore, manifest):
+        records = [
+            PubMedRecord(str(i), f"Title {i}", f"Abstract {i}", [Section("", "x")])
+            for i in range(3)
+        ]
+
+        def iter_articles(self):
+            yield from records
+            if len(records) < 3:
+                raise requests.ConnectionError("connection reset")
+
+        def ingest():
+            failed = set()
+            with (
+                patch.object(PubMedClient, "iter_articles", iter_articles),
+                patch.object(MedicalDataFetcher, "iter_drug_pages", lambda s: []),
+            ):
+                IngestionPipeline(embedding_vectorstore, manifest).run(
+                    iter_medical_data(parse=False, failed=failed), failed=failed
+                )
+            return failed
+
+        ingest()
+        assert len(manifest.entries) == 3
+        embedding_vectorstore.reset_mock()
+
+        del records[1:]
+        assert PUBMED_URL_ARTICLE in ingest()
+        embedding_vectorstore.delete.assert_not_called()
+        assert len(manifest.entries) == 3
+
+    def test_chunks_articles_before_embedding(self, embedding_vectorstore, manifest):
+        article = {
+            "text": "Title: Metformin\nContent: ...",
+            "title": "Metformin",
+            "sections": [
+                Section("Uses", "Metformin treats type 2 diabetes. " * 40),
+                Section("Dosage", "Start with 500 mg twice daily. " * 40),
+            ],
+            "metadata": {"source": "https://www.drugs.com/metformin.html"},
+        }
+        pipeline = IngestionPipeline(embedding_vectorstore, manifest, batch_size=64)
+
+        indexed = pipeline.run([article])
+
+        (upsert,) = embedding_vectorstore._collection.upsert.call_args_list
+        metadatas = upsert.kwargs["metadatas"]
+        assert indexed == len(metadatas) > 2
+        assert [m["chunk"] for m in metadatas] == list(range(indexed))
+        assert len({m["parent_id"] for m in metadatas}) == 1
@@ -0,0 +1,121 @@
+import io
+import json
+import pytest
+from pathlib import Path
+from unittest.mock import Mock
+from urllib.parse import parse_qs, urlparse
+from components.crawler import CrawlerEngine, HostRateLimiter
+from components.pubmed import PubMedClient, parse_efetch
+
+FIXTURE = Path(__file__).parent / "fixtures" / "pubmed_efetch.xml"
+
+
+@pytest.fixture
+def efetch_xml():
+    return FIXTURE.read_bytes()
+
+
+def response(status_code, content=b""):
+    mock = Mock(status_code=status_code)
+    mock.iter_content.side_effect = lambda chunk_size: iter(
+        [content[:100], content[100:]]
+    )
+    return mock
+
+
+SEARCH_RESULT = json.dumps(
+    {"esearchresult": {"count": "1200", "webenv": "MCID_1", "querykey": "1"}}
+).encode()
+
+
+@pytest.fixture
+def mock_session(efetch_xml):
+    session = Mock()
+
+    def get(url, timeout=None, stream=False):
+        return response(200, SEARCH_RESULT if "esearch" in url else efetch_xml)
+
+    session.get.side_effect = get
+    return session
+
+
+@pytest.fixture
+def engine():
+    return CrawlerEngine(
+        lambda url: None,
+        backoff_base=0,
+        rate_limiter=HostRateLimiter(rates={}, default_rate=0),
+    )
+
+
+class TestParseEfetch:
+    def test_parses_structured_abstracts(self, efetch_xml):
+        records = list(parse_efetch(io.BytesIO(efetch_xml)))
+
+        assert [r.pmid for r in records] == ["38000001", "38000002", "38000003"]
+        assert records[0].abstract == (
+            "BACKGROUND: Metformin is first-line therapy for type 2 diabetes.\n"
+            "RESULTS: Metformin use was associated with fewer cardiovascular events."
+        )
+        assert [s.heading for s in records[0].sections] == ["BACKGROUND", "RESULTS"]
+        assert records[1].title == "Ibuprofen dosing in children."
+        assert records[2].abstract == ""
+
+
+class TestPubMedClient:
+    def test_pages_through_history_server(self, mock_session, engine):
+        client = PubMedClient(mock_session, batch_size=500, engine=engine)
+        engine.fetch = client._fetch_xml
+
+        records = list(client.iter_articles(retmax=1100))
+
+        efetch_urls = [
+            c.args[0] for c in mock_session.get.call_args_list if "efetch" in c.args[0]
+        ]
+        queries = [parse_qs(urlparse(url).query) for url in efetch_urls]
+        assert sorted(int(q["retstart"][0]) for q in queries) == [0, 500, 1000]
+        assert sorted(int(q["retmax"][0]) for q in queries) == [100, 500, 500]
+        assert all(q["WebEnv"] == ["MCID_1"] for q in queries)
+        assert len(records) == 9
+
+    def test_retries_search_through_the_engine(self, engine):
+        session = Mock()
+        session.get.side_effect = [response(503), response(200, SEARCH_RESULT)]
+        client = PubMedClient(session, engine=engine)
+        engine.fetch = client._fetch_xml
+
+        assert client.search()["webenv"] == "MCID_1"
+        assert engine.stats["pubmed-search"].retries == 1
+
+    def test_failed_search_is_recorded(self, engine):
+        session = Mock()
+        session.get.return_value = response(500)
+        client = PubMedClient(session, engine=engine)
+        engine.fetch = client._fetch_xml
+        engine.max_retries = 0
+
+        assert list(client.iter_articles()) == []
+        assert len(engine.failed) == 1
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            b"<eFetchResult><ERROR>Unable to obtain query #1</ERROR></eFetchResult>",
+            None,
+        ],
+    )
+    def test_unusable_batch_is_recorded(self, efetch_xml, engine, body):
+        def get(url, timeout=None, stream=False):
+            if "esearch" in url:
+                return response(200, SEARCH_RESULT)
+            # A 200 with an <ERROR> payload, or a body cut off mid-article
+            return response(200, body or efetch_xml[: len(efetch_xml) // 2])
+
+        session = Mock()
+        session.get.side_effect = get
+        client = PubMedClient(session, batch_size=500, engine=engine)
+        engine.fetch = client._fetch_xml
+
+        list(client.iter_articles(retmax=1000))
+
+        assert len(engine.failed) == 2
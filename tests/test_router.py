@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import Mock
+from components.router import EmbeddingRouter, PartitionRouter
+
+MEDICAL_WORDS = {"dose", "pain", "drug", "fever"}
+GENERAL_WORDS = {"hello", "joke", "weather", "python"}
+
+
+class KeywordEmbeddings:
+    def __init__(self):
+        self.queries = 0
+
+    def _embed(self, text):
+        words = set(text.lower().replace("?", "").split())
+        return [
+            float(len(words & MEDICAL_WORDS)),
+            float(len(words & GENERAL_WORDS)),
+            0.1,
+        ]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        self.queries += 1
+        return self._embed(text)
+
+
+@pytest.fixture
+def prototypes():
+    return {
+        "medical": ["drug dose", "fever pain"],
+        "general": ["hello joke", "weather python"],
+    }
+
+
+class TestEmbeddingRouter:
+    def test_classifies_by_prototype_similarity(self, prototypes):
+        router = EmbeddingRouter(KeywordEmbeddings(), prototypes)
+
+        assert router.is_medical("What drug dose for fever?")
+        assert not router.is_medical("Tell me a joke about the weather")
+
+    def test_caches_decisions(self, prototypes):
+        embeddings = KeywordEmbeddings()
+        router = EmbeddingRouter(embeddings, prototypes, cache_size=1)
+
+        router.is_medical("drug dose")
+        router.is_medical("Drug dose ")
+        router.is_medical("hello")
+        router.is_medical("drug dose")
+
+        assert embeddings.queries == 3
+
+    def test_low_margin_uses_fallback(self, prototypes):
+        fallback = Mock(return_value=True)
+        router = EmbeddingRouter(
+            KeywordEmbeddings(), prototypes, fallback=fallback, fallback_margin=0.05
+        )
+
+        assert router.is_medical("something unrelated")
+        assert not router.is_medical("python joke")
+
+        fallback.assert_called_once_with("something unrelated")
+        assert router.fallback_calls == 1
+
+
+class TestPartitionRouter:
+    @pytest.fixture
+    def router(self):
+        return PartitionRouter(
+            KeywordEmbeddings(),
+            {"drugs": ["drug dose"], "pubmed": ["hello weather"]},
+            fetch_k={"drugs": 4, "pubmed": 6},
+            margin=0.2,
+        )
+
+    def test_clear_query_searches_one_partition(self, router):
+        embeddings = KeywordEmbeddings()
+
+        assert router.route(embeddings.embed_query("drug dose"), 20) == {"drugs": 20}
+        assert router.route(embeddings.embed_query("weather"), 20) == {"pubmed": 20}
+
+    def test_ambiguous_query_searches_every_partition(self, router):
+        vector = KeywordEmbeddings().embed_query("drug weather")
+
+        assert router.route(vector, 20) == {"drugs": 4, "pubmed": 6}
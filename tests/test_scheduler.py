@@ -0,0 +1,107 @@
+import threading
+import time
+import ollama
+import pytest
+from unittest.mock import patch
+from benchmarks.fake_ollama import FakeOllamaServer
+from components import llm
+from components.llm import LlamaMedLLM, OllamaLLM
+from components.scheduler import ModelScheduler
+
+
+def run_queued(scheduler, held, models):
+    """Queue ``models`` while ``held`` occupies the scheduler; return grant order."""
+    order, threads = [], []
+
+    def request(model):
+        with scheduler.slot(model):
+            order.append(model)
+
+    with scheduler.slot(held):
+        for model in models:
+            threads.append(threading.Thread(target=request, args=(model,)))
+            threads[-1].start()
+            while sum(scheduler.stats()["queued"].values()) < len(threads):
+                time.sleep(0.001)
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+
+class TestModelScheduler:
+    def test_batches_requests_by_model(self):
+        scheduler = ModelScheduler(resident_models=1, max_concurrent=1, max_wait=60)
+
+        order = run_queued(scheduler, "a", ["b", "a", "b", "a"])
+
+        assert order == ["a", "a", "b", "b"]
+        assert scheduler.switches == 2
+
+    def test_max_batch_yields_to_waiting_model(self):
+        scheduler = ModelScheduler(
+            resident_models=1, max_concurrent=1, max_batch=1, max_wait=60
+        )
+
+        order = run_queued(scheduler, "a", ["b", "a", "b", "a"])
+
+        assert order == ["b", "a", "b", "a"]
+
+    def test_resident_models_run_side_by_side(self):
+        scheduler = ModelScheduler(resident_models=2, max_concurrent=1)
+
+        with scheduler.slot("a"), scheduler.slot("b"):
+            assert scheduler.stats()["in_flight"] == {"a": 1, "b": 1}
+
+    def test_last_request_before_switch_unloads_model(self):
+        scheduler = ModelScheduler(resident_models=1, max_concurrent=2, keep_alive="5m")
+        keep_alives = []
+
+        def request(model):
+            with scheduler.slot(model) as keep_alive:
+                keep_alives.append(keep_alive)
+
+        with scheduler.slot("a") as first:
+            thread = threading.Thread(target=request, args=("b",))
+            thread.start()
+            while not scheduler.stats()["queued"]:
+                time.sleep(0.001)
+            with scheduler.slot("a") as second:
+                assert (first, second) == ("5m", 0)
+        thread.join(timeout=5)
+
+        assert keep_alives == ["5m"]
+
+
+class TestSchedulerWithOllama:
+    @pytest.fixture
+    def fake_ollama(self):
+        with FakeOllamaServer(
+            tokens_per_sec=2_000,
+            prompt_tokens_per_sec=100_000,
+            answer_tokens=5,
+            load_seconds=0.05,
+            max_loaded_models=1,
+        ) as fake:
+            with patch.object(
+                ollama, "generate", ollama.Client(host=fake.url).generate
+            ):
+                yield fake
+
+    @pytest.mark.parametrize("enabled", [True, False])
+    def test_mixed_load_model_swaps(self, fake_ollama, enabled):
+        scheduler = ModelScheduler(resident_models=1, max_wait=60, enabled=enabled)
+        models = [LlamaMedLLM(), OllamaLLM()] * 4
+
+        with patch.object(llm, "scheduler", scheduler):
+            threads = []
+            for model in models:
+                threads.append(threading.Thread(target=model.invoke, args=("Hi",)))
+                threads[-1].start()
+                time.sleep(0.005)
+            for thread in threads:
+                thread.join(timeout=10)
+
+        if enabled:
+            assert fake_ollama.model_loads == 2
+        else:
+            assert fake_ollama.model_loads > 2
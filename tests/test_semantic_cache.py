@@ -0,0 +1,110 @@
+import time
+import pytest
+from unittest.mock import Mock
+from components.qa_chain import SemanticCache
+
+VECTORS = {
+    "ibuprofen dose": [1.0, 0.0, 0.0],
+    "What is the ibuprofen dose?": [0.99, 0.1, 0.0],
+    "what's the dosage of ibuprofen": [0.99, 0.1, 0.0],
+    "ibuprofen 400 mg": [1.0, 0.0, 0.0],
+    "ibuprofen 200 mg": [0.99, 0.1, 0.0],
+    "naproxen dose": [0.99, 0.1, 0.0],
+    "metformin dose": [0.99, 0.1, 0.0],
+    "ibuprofen overdose": [0.99, 0.1, 0.0],
+    "adult ibuprofen dose": [1.0, 0.0, 0.0],
+    "pediatric ibuprofen dose": [0.99, 0.1, 0.0],
+    "capital of france": [0.0, 1.0, 0.0],
+}
+
+
+@pytest.fixture
+def embeddings():
+    mock = Mock()
+    mock.embed_query.side_effect = lambda text: VECTORS[text]
+    return mock
+
+
+@pytest.fixture
+def version():
+    return Mock(return_value=1)
+
+
+@pytest.fixture
+def cache(embeddings, version):
+    return SemanticCache(
+        embeddings, threshold=0.95, ttl=60, max_size=2, version_fn=version
+    )
+
+
+class TestSemanticCache:
+    def test_hits_similar_query_for_same_model(self, cache):
+        response = {"answer": "200-400 mg", "sources": []}
+        cache.put("ibuprofen dose", "medllama2", response)
+
+        assert cache.get("What is the ibuprofen dose?", "medllama2") == response
+        assert cache.get("What is the ibuprofen dose?", "deepseek") is None
+        assert cache.get("capital of france", "medllama2") is None
+        assert cache.stats() == {"hits": 1, "misses": 2, "size": 1}
+
+    def test_paraphrase_with_other_words_hits(self, cache):
+        response = {"answer": "200-400 mg", "sources": []}
+        cache.put("ibuprofen dose", "medllama2", response)
+
+        assert cache.get("what's the dosage of ibuprofen", "medllama2") == response
+
+    def test_near_miss_with_different_key_terms_does_not_hit(self, cache):
+        cache.put("ibuprofen dose", "medllama2", {"answer": "a", "sources": []})
+        cache.put("adult ibuprofen dose", "medllama2", {"answer": "b", "sources": []})
+        cache.put("ibuprofen 400 mg", "medllama2", {"answer": "c", "sources": []})
+
+        assert cache.get("ibuprofen overdose", "medllama2") is None
+        assert cache.get("pediatric ibuprofen dose", "medllama2") is None
+        assert cache.get("ibuprofen 200 mg", "medllama2") is None
+        assert cache.get("metformin dose", "medllama2") is None
+
+    @pytest.mark.parametrize(
+        "rule, hit", [("key_terms", False), ("jaccard", True), ("off", True)]
+    )
+    def test_term_rule_is_configurable(self, embeddings, version, rule, hit):
+        cache = SemanticCache(embeddings, version_fn=version, term_rule=rule)
+        cache.put("adult ibuprofen dose", "medllama2", {"answer": "a", "sources": []})
+
+        assert (cache.get("pediatric ibuprofen dose", "medllama2") is not None) == hit
+
+    def test_lookup_reports_the_model_that_answered(self, cache):
+        response = {"answer": "200-400 mg", "sources": []}
+        cache.put("ibuprofen dose", "medllama2", response)
+
+        assert cache.lookup(
+            "What is the ibuprofen dose?", ["deepseek", "medllama2"]
+        ) == (
+            "medllama2",
+            response,
+        )
+        assert cache.lookup("What is the ibuprofen dose?", ["deepseek"]) is None
+
+    def test_invalidated_when_index_changes(self, cache, version):
+        cache.put("ibuprofen dose", "medllama2", {"answer": "a", "sources": []})
+        version.return_value = 2
+
+        assert cache.get("ibuprofen dose", "medllama2") is None
+        assert cache.stats()["size"] == 0
+
+    def test_expires_entries_after_ttl(self, cache, monkeypatch):
+        cache.put("ibuprofen dose", "medllama2", {"answer": "a", "sources": []})
+        now = time.monotonic()
+        monkeypatch.setattr("components.qa_chain.time.monotonic", lambda: now + 61)
+
+        assert cache.get("ibuprofen dose", "medllama2") is None
+
+    def test_evicts_least_recently_used(self, cache):
+        cache.put("ibuprofen dose", "m", {"answer": "a", "sources": []})
+        cache.put("capital of france", "m", {"answer": "b", "sources": []})
+        cache.get("ibuprofen dose", "m")
+        cache.put(
+            "What is the ibuprofen dose?", "other", {"answer": "c", "sources": []}
+        )
+
+        assert cache.get("ibuprofen dose", "m") == {"answer": "a", "sources": []}
+        assert cache.get("capital of france", "m") is None
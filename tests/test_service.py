@@ -0,0 +1,133 @@
+import asyncio
+import pytest
+from unittest.mock import Mock, patch
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+from components.service import (
+    AdmissionController,
+    AdmittedStreamingResponse,
+    Overloaded,
+    create_app,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestAdmissionController:
+    def test_admits_by_priority_then_fifo(self):
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, queue_timeout=5)
+            order = []
+
+            async def request(name, priority):
+                async with controller.admit(priority):
+                    order.append(name)
+
+            await controller.acquire()
+            tasks = []
+            for name, priority in [("batch", 1), ("first", 0), ("second", 0)]:
+                tasks.append(asyncio.create_task(request(name, priority)))
+                await asyncio.sleep(0)
+            controller.release()
+            await asyncio.gather(*tasks)
+            return order, controller.stats()
+
+        order, stats = run(scenario())
+
+        assert order == ["first", "second", "batch"]
+        assert stats == {"active": 0, "queued": 0, "rejected": 0}
+
+    def test_rejects_when_queue_is_full(self):
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=1)
+            await controller.acquire()
+            waiting = asyncio.create_task(controller.acquire())
+            await asyncio.sleep(0)
+            with pytest.raises(Overloaded):
+                await controller.acquire()
+            waiting.cancel()
+            return controller
+
+        assert run(scenario()).rejected == 1
+
+    def test_rejects_after_queue_timeout(self):
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, queue_timeout=0.01)
+            await controller.acquire()
+            with pytest.raises(Overloaded):
+                await controller.acquire()
+            controller.release()
+            return controller.stats()
+
+        assert run(scenario()) == {"active": 0, "queued": 0, "rejected": 1}
+
+
+class TestAdmittedStreamingResponse:
+    def test_releases_when_client_leaves_before_the_body_starts(self):
+        started = []
+
+        async def body():
+            started.append(True)
+            yield "never sent"
+
+        async def send(message):
+            raise OSError("client disconnected")
+
+        release = Mock()
+        response = AdmittedStreamingResponse(body(), release)
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+
+        with pytest.raises(ClientDisconnect):
+            run(response(scope, None, send))
+
+        release.assert_called_once()
+        assert not started
+
+
+class TestQueryService:
+    @pytest.fixture
+    def client(self):
+        async def astream_query(qa_chain, query, llm, session_id=None):
+            for token in ["Metformin ", "lowers ", "glucose."]:
+                yield token
+
+        async def aprocess_query(qa_chain, query, llm, session_id=None):
+            return {"answer": f"answer to {query}", "sources": []}
+
+        with (
+            patch("components.service.start_warmup"),
+            patch("components.qa_chain.init_qa_chain"),
+            patch("components.qa_chain.astream_query", astream_query),
+            patch("components.qa_chain.aprocess_query", aprocess_query),
+        ):
+            app = create_app(AdmissionController(max_concurrent=1, max_queue=0))
+            with TestClient(app) as client:
+                yield client
+
+    def test_query(self, client):
+        response = client.post("/query", json={"query": "metformin"})
+
+        assert response.status_code == 200
+        assert response.json() == {"answer": "answer to metformin", "sources": []}
+
+    def test_stream(self, client):
+        response = client.post("/query/stream", json={"query": "metformin"})
+
+        assert response.status_code == 200
+        assert response.text == "Metformin lowers glucose."
+        assert client.get("/health").json()["admission"]["active"] == 0
+
+    def test_overloaded_returns_503(self, client):
+        client.app.state.admission.active = 1
+
+        response = client.post("/query", json={"query": "metformin"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+    def test_unknown_priority(self, client):
+        response = client.post("/query", json={"query": "x", "priority": "vip"})
+
+        assert response.status_code == 422
@@ -0,0 +1,186 @@
+import glob
+import json
+import os
+import threading
+from typing import List
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.retrievers import BaseRetriever
+
+from components.snapshots import (
+    ServingIndex,
+    SnapshotError,
+    activate_snapshot,
+    build_snapshot,
+    current_snapshot,
+    list_snapshots,
+    verify_snapshot,
+)
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    monkeypatch.setattr("components.snapshots.get_embeddings", lambda: embeddings)
+    return embeddings
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "snapshots")
+
+
+def serving_copies(root, name):
+    return glob.glob(os.path.join(root, f".serving-*-{name}-*"))
+
+
+def make_documents(n, start=0):
+    return [
+        {
+            "text": f"Document {i} about metformin dosing and renal function",
+            "metadata": {"source": f"https://example.org/{i}"},
+        }
+        for i in range(start, start + n)
+    ]
+
+
+class NamedRetriever(BaseRetriever):
+    """Answers every query with one document naming its snapshot."""
+
+    name: str
+    gate: threading.Event = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager) -> List[Document]:
+        if self.gate is not None:
+            self.gate.wait(5)
+        return [Document(page_content=self.name)]
+
+
+class TestBuildSnapshot:
+    def test_build_and_verify(self, root, embeddings):
+        info = build_snapshot(make_documents(5), name="a", root=root)
+
+        assert info.documents == 5
+        assert not os.path.exists(os.path.join(root, ".build-a"))
+        assert verify_snapshot("a", root).checksums == info.checksums
+        assert [snapshot.name for snapshot in list_snapshots(root)] == ["a"]
+
+    def test_serving_leaves_files_unchanged(self, root, embeddings):
+        build_snapshot(make_documents(5), name="a", root=root)
+        serving = ServingIndex(root)
+        retriever = serving.load("a", lambda vectorstore, _: vectorstore.as_retriever())
+
+        assert retriever.invoke("metformin")
+        verify_snapshot("a", root)
+
+    def test_incremental_from_base(self, root, embeddings):
+        build_snapshot(make_documents(5), name="a", root=root)
+
+        info = build_snapshot(make_documents(7), name="b", base="a", root=root)
+
+        assert info.documents == 7
+        assert verify_snapshot("a", root).documents == 5
+
+    def test_rejects_tampering_and_other_models(self, root, embeddings):
+        info = build_snapshot(make_documents(2), name="a", root=root)
+        with open(info.manifest_path, "a") as f:
+            f.write(" ")
+
+        with pytest.raises(SnapshotError, match="index_manifest.json"):
+            verify_snapshot("a", root)
+
+        build_snapshot(make_documents(2), name="b", root=root)
+        metadata_path = os.path.join(root, "b", "snapshot.json")
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        metadata["embedding_model"] = "other-model"
+        with open(metadata_path, "w") as f:
+            json.dump(metadata, f)
+
+        with pytest.raises(SnapshotError, match="other-model"):
+            verify_snapshot("b", root)
+
+    def test_existing_name(self, root, embeddings):
+        build_snapshot(make_documents(1), name="a", root=root)
+
+        with pytest.raises(SnapshotError):
+            build_snapshot(make_documents(1), name="a", root=root)
+
+
+class TestServingIndex:
+    @pytest.fixture
+    def snapshots(self, root, embeddings):
+        build_snapshot(make_documents(2), name="blue", root=root)
+        build_snapshot(make_documents(2, start=2), name="green", root=root)
+        activate_snapshot("blue", root)
+
+    def test_follows_current(self, root, snapshots):
+        serving = ServingIndex(root)
+        retriever = serving.load("current", lambda _, path: NamedRetriever(name=path))
+
+        assert current_snapshot(root) == "blue"
+        blue_version = serving.version()
+        serving.poll()
+        assert serving.info.name == "blue"
+
+        activate_snapshot("green", root)
+        serving.poll()
+
+        assert serving.info.name == "green"
+        assert "green" in retriever.invoke("q")[0].page_content
+        assert serving.version() != blue_version
+
+    def test_in_flight_queries_finish_on_old_index(self, root, snapshots):
+        gate = threading.Event()
+        serving = ServingIndex(root)
+        retriever = serving.load(
+            "blue", lambda _, path: NamedRetriever(name=path, gate=gate)
+        )
+        results = []
+        query = threading.Thread(target=lambda: results.extend(retriever.invoke("q")))
+        query.start()
+
+        serving.swap("green")
+        assert serving_copies(root, "blue")
+        gate.set()
+        query.join()
+
+        assert "blue" in results[0].page_content
+        assert "green" in retriever.invoke("q")[0].page_content
+        assert not serving_copies(root, "blue")
+        assert len(serving_copies(root, "green")) == 1
+
+    def test_idle_index_is_released_on_swap(self, root, snapshots):
+        serving = ServingIndex(root)
+        serving.load("blue", lambda vectorstore, _: vectorstore.as_retriever())
+        serving.swap("green")
+
+        assert not serving_copies(root, "blue")
+        assert serving.retriever.invoke("metformin")
+        verify_snapshot("blue", root)
+        verify_snapshot("green", root)
+
+    def test_removes_copies_of_exited_servers(self, root, snapshots):
+        stale = os.path.join(root, ".serving-999999999-blue-x")
+        os.makedirs(stale)
+
+        ServingIndex(root).load("blue", lambda _, path: NamedRetriever(name=path))
+
+        assert not os.path.exists(stale)
+
+    def test_failed_swap_keeps_serving(self, root, snapshots):
+        serving = ServingIndex(root)
+        retriever = serving.load("blue", lambda _, path: NamedRetriever(name=path))
+        with open(os.path.join(root, "green", "index_manifest.json"), "a") as f:
+            f.write(" ")
+
+        with pytest.raises(SnapshotError):
+            activate_snapshot("green", root)
+        with open(os.path.join(root, "CURRENT"), "w") as f:
+            f.write("green")
+        serving.poll()
+
+        assert serving.info.name == "blue"
+        assert "blue" in retriever.invoke("q")[0].page_content
@@ -0,0 +1,71 @@
+import ollama
+import pytest
+from unittest.mock import Mock, patch
+from benchmarks.fake_ollama import FakeOllamaServer
+from components import warmup
+from components.warmup import Readiness, preload_model, run_warmup
+
+
+@pytest.fixture
+def fake_ollama():
+    with FakeOllamaServer() as fake:
+        client = ollama.Client(host=fake.url)
+        with (
+            patch.object(ollama, "generate", client.generate),
+            patch.object(ollama, "ps", client.ps),
+        ):
+            yield fake
+
+
+class TestPreloadModel:
+    def test_loads_missing_model_once(self, fake_ollama):
+        preload_model("medllama2")
+        preload_model("medllama2")
+
+        assert fake_ollama.model_loads == 1
+        assert fake_ollama.requests == 1
+        assert warmup.loaded_models() == ["medllama2"]
+
+
+class TestRunWarmup:
+    def test_records_timings_and_ready_state(self):
+        steps = [("a", Mock()), ("b", Mock())]
+        with patch("components.warmup.warmup_steps", return_value=steps):
+            state = run_warmup(Readiness())
+
+        assert state.state == "ready"
+        assert state.ready
+        assert list(state.timings) == ["a", "b"]
+        assert all(step.called for _, step in steps)
+
+    def test_failed_step_degrades_without_stopping(self):
+        later = Mock()
+        steps = [("broken", Mock(side_effect=RuntimeError("no ollama"))), ("b", later)]
+        with patch("components.warmup.warmup_steps", return_value=steps):
+            state = run_warmup(Readiness())
+
+        assert state.state == "degraded"
+        assert state.errors == {"broken": "no ollama"}
+        later.assert_called_once()
+
+    def test_start_warmup_runs_once(self):
+        with (
+            patch.object(warmup, "_thread", None),
+            patch("components.warmup.threading.Thread") as thread,
+        ):
+            first = warmup.start_warmup()
+            second = warmup.start_warmup()
+
+        assert first is second is warmup.readiness
+        thread.return_value.start.assert_called_once()
+
+    def test_disabled_warmup_reports_lazy(self):
+        with (
+            patch.object(warmup, "readiness", Readiness()),
+            patch.object(warmup, "WARMUP_ENABLED", False),
+            patch("components.warmup.threading.Thread") as thread,
+        ):
+            state = warmup.start_warmup()
+
+        assert state.state == "lazy" and state.ready
+        thread.assert_not_called()